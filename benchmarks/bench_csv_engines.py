@@ -0,0 +1,114 @@
+"""Benchmark of the CSV engines for reading the Xetra source files"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..', 'source_code', 'common'))
+
+import boto3
+import pandas as pd
+import pyarrow as pa
+from moto import mock_aws
+
+from benchmarks.synthetic_xetra import xetra_source_files
+from source_code.common.s3 import S3BucketConnector
+
+SRC_BUCKET = 'xetra-bench-src'
+ENDPOINT_URL = 'https://s3.eu-central-1.amazonaws.com'
+SRC_COLUMNS = ['ISIN', 'Mnemonic', 'Date', 'Time', 'StartPrice', 'EndPrice',
+               'MinPrice', 'MaxPrice', 'TradedVolume']
+# Text columns are read as strings by both engines, the numeric columns are inferred
+TEXT_COLUMNS = ['ISIN', 'Mnemonic', 'Date', 'Time']
+
+
+def read_pandas(s3_bucket: S3BucketConnector, keys: list):
+    """
+    Pandas path: reading the source columns of every file with
+    read_csv_to_df and concatenating the DataFrames
+    """
+    dtype = {column: 'str' for column in TEXT_COLUMNS}
+    return pd.concat([s3_bucket.read_csv_to_df(key, columns=SRC_COLUMNS, dtype=dtype)
+                      for key in keys], ignore_index=True)
+
+
+def read_arrow(s3_bucket: S3BucketConnector, keys: list):
+    """
+    Arrow path: reading the source columns of every file with read_csv_to_table,
+    concatenating the tables and converting to pandas once
+    """
+    column_types = {column: pa.string() for column in TEXT_COLUMNS}
+    tables = [s3_bucket.read_csv_to_table(key, columns=SRC_COLUMNS,
+                                          column_types=column_types)
+              for key in keys]
+    return pa.concat_tables(tables).to_pandas()
+
+
+def run_benchmark(days: int, isin_count: int, rows_per_file: int, repeat: int):
+    """
+    Timing both engines of S3BucketConnector on the same synthetic
+    hourly files on a mocked s3
+
+    Args:
+        days (int): number of days of source files
+        isin_count (int): number of ISINs
+        rows_per_file (int): rows per hourly file
+        repeat (int): number of repetitions, the best one is reported
+
+    Returns:
+        results: dictionary with the benchmark parameters and timings
+    """
+    os.environ['AWS_ACCESS_KEY_ID'] = 'bench'
+    os.environ['AWS_SECRET_ACCESS_KEY'] = 'bench'
+    with mock_aws():
+        s3 = boto3.resource(service_name='s3', endpoint_url=ENDPOINT_URL)
+        s3.create_bucket(Bucket=SRC_BUCKET, CreateBucketConfiguration={
+            'LocationConstraint': 'eu-central-1'})
+        src_bucket = s3.Bucket(SRC_BUCKET)
+        keys = []
+        source_bytes = 0
+        for key, body in xetra_source_files('2021-04-15', days, isin_count, rows_per_file):
+            src_bucket.put_object(Body=body, Key=key)
+            keys.append(key)
+            source_bytes += len(body)
+        s3_bucket_src = S3BucketConnector('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY',
+                                          ENDPOINT_URL, SRC_BUCKET)
+        results = {
+            'files': len(keys),
+            'bytes': source_bytes,
+            'rows': len(keys) * rows_per_file,
+            'columns': len(SRC_COLUMNS)
+        }
+        for name, read in [('pandas', read_pandas), ('arrow', read_arrow)]:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                data_frame = read(s3_bucket_src, keys)
+                timings.append(time.perf_counter() - start)
+            results[name] = {
+                'seconds': min(timings),
+                'rows_per_second': len(data_frame) / min(timings),
+                'memory_bytes': int(data_frame.memory_usage(deep=True).sum())
+            }
+    return results
+
+
+def main():
+    """
+        entry point to run the CSV engine benchmark.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the Xetra CSV engines.')
+    parser.add_argument('--days', type=int, default=1, help='Days of hourly source files.')
+    parser.add_argument('--isins', type=int, default=3000, help='Number of ISINs.')
+    parser.add_argument('--rows-per-file', type=int, default=20000,
+                        help='Rows per hourly source file.')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions per engine.')
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.days, args.isins, args.rows_per_file, args.repeat),
+                     indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""Benchmark of the extract, transform and load stages of Xetra_ETL"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..', 'source_code', 'common'))
+
+import boto3
+import pandas as pd
+import pyarrow as pa
+import yaml
+from moto import mock_aws
+
+from benchmarks.synthetic_xetra import XETRA_HOURS, xetra_source_files
+from source_code.common.s3 import S3BucketConnector
+from source_code.transformers.Xetra_transformer import Xetra_ETL, XetraBarsConfig, \
+    XetraSourceConfig, XetraTargetConfig
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', 'configs', 'xetra_report1_config.yaml')
+FIRST_DATE = '2021-04-15'
+SRC_BUCKET = 'xetra-bench-src'
+TRG_BUCKET = 'xetra-bench-trg'
+ENDPOINT_URL = 'https://s3.eu-central-1.amazonaws.com'
+
+
+def rss_mb():
+    """
+    Current resident set size of the current process in MB, read from /proc (Linux)
+    """
+    with open('/proc/self/status') as status_file:
+        for line in status_file:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+
+class PeakRssSampler():
+    """
+    Samples the RSS of the current process on a thread while the context is open and
+    keeps the maximum. Unlike ru_maxrss, the peak of a stage is not the high-water
+    mark of the stages and the setup before it.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Constructor for PeakRssSampler
+
+        Args:
+            interval (float, optional): seconds between two samples
+        """
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while True:
+            self.peak_mb = max(self.peak_mb, rss_mb())
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self):
+        self.peak_mb = rss_mb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join()
+        # Sampling once more after the stage
+        self.peak_mb = max(self.peak_mb, rss_mb())
+        return False
+
+
+def timed(stage: dict, baseline_mb: float, function, *args):
+    """
+    Running a stage and recording its wall time and its peak RSS above the baseline
+
+    Args:
+        stage (dict): dictionary the measurements are added to
+        baseline_mb (float): RSS in MB before the stages, with the source files on the mocked s3
+        function: stage that should be run
+        args: arguments of the stage
+
+    Returns:
+        result: return value of the stage
+    """
+    with PeakRssSampler() as sampler:
+        start = time.perf_counter()
+        result = function(*args)
+        stage['seconds'] = time.perf_counter() - start
+    stage['peak_rss_above_baseline_mb'] = sampler.peak_mb - baseline_mb
+    return result
+
+
+def run_window(days: int, isin_count: int, rows_per_file: int, source_options: dict,
+               target_options: dict):
+    """
+    Running extract, transform_report1, transform_bars and load of one date window on a mocked s3
+
+    Args:
+        days (int): number of days of the window
+        isin_count (int): number of ISINs
+        rows_per_file (int): rows per hourly source file
+        source_options (dict): XetraSourceConfig fields overriding the config file
+        target_options (dict): XetraTargetConfig fields overriding the config file
+
+    Returns:
+        results: dictionary with the measurements per stage
+    """
+    with open(CONFIG_PATH) as config_file:
+        config = yaml.safe_load(config_file)
+    os.environ['AWS_ACCESS_KEY_ID'] = 'bench'
+    os.environ['AWS_SECRET_ACCESS_KEY'] = 'bench'
+    with mock_aws():
+        s3 = boto3.resource(service_name='s3', endpoint_url=ENDPOINT_URL)
+        for bucket in [SRC_BUCKET, TRG_BUCKET]:
+            s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={
+                'LocationConstraint': 'eu-central-1'})
+        src_bucket = s3.Bucket(SRC_BUCKET)
+        source_bytes = 0
+        for key, body in xetra_source_files(FIRST_DATE, days, isin_count, rows_per_file):
+            src_bucket.put_object(Body=body, Key=key)
+            source_bytes += len(body)
+        s3_bucket_src = S3BucketConnector('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY',
+                                          ENDPOINT_URL, SRC_BUCKET)
+        s3_bucket_trg = S3BucketConnector('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY',
+                                          ENDPOINT_URL, TRG_BUCKET)
+        source_config = XetraSourceConfig(**{**config['source'],
+                                             'src_first_extract_date': FIRST_DATE,
+                                             **source_options})
+        target_config = XetraTargetConfig(**{**config['target'], **target_options})
+        # The window of the meta data is fixed to 11 days, the benchmark sets its own
+        start = datetime.strptime(FIRST_DATE, '%Y-%m-%d').date()
+        dates = [(start + timedelta(days=day)).strftime('%Y-%m-%d') for day in range(days)]
+        xetra_etl = Xetra_ETL(s3_bucket_src, s3_bucket_trg, 'meta/bench_meta_file.csv',
+                              source_config, target_config, extract_dates=dates)
+        results = {
+            'days': days,
+            'files': days * len(XETRA_HOURS),
+            'source_bytes': source_bytes,
+            'baseline_rss_mb': rss_mb()
+        }
+        baseline_mb = results['baseline_rss_mb']
+        extract, transform, bars, load = {}, {}, {}, {}
+        data_frame = timed(extract, baseline_mb, xetra_etl.extract)
+        extract['rows_out'] = len(data_frame)
+        transform['rows_in'] = len(data_frame)
+        bars['rows_in'] = len(data_frame)
+        bars['rows_out'] = len(timed(bars, baseline_mb, xetra_etl.transform_bars, data_frame,
+                                     XetraBarsConfig(**(config.get('bars') or {}))))
+        data_frame = timed(transform, baseline_mb, xetra_etl.transform_report1, data_frame)
+        transform['rows_out'] = len(data_frame)
+        timed(load, baseline_mb, xetra_etl.load, data_frame)
+        load['rows_in'] = len(data_frame)
+        extract['rows_per_second'] = extract['rows_out'] / extract['seconds']
+        transform['rows_per_second'] = transform['rows_in'] / transform['seconds']
+        bars['rows_per_second'] = bars['rows_in'] / bars['seconds']
+        load['rows_per_second'] = load['rows_in'] / load['seconds']
+        results.update({'extract': extract, 'transform_report1': transform,
+                        'transform_bars': bars, 'load': load})
+    return results
+
+
+def parse_options(options: list):
+    """
+    Parsing key=value options, the values are read as YAML scalars
+
+    Args:
+        options (list): list of key=value strings
+
+    Returns:
+        parsed: dictionary of the options
+    """
+    parsed = {}
+    for option in options:
+        key, value = option.split('=', 1)
+        parsed[key] = yaml.safe_load(value)
+    return parsed
+
+
+def git_revision():
+    """
+    Git revision of the benchmarked code, None outside of a git checkout
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    """
+        entry point to run the ETL stage benchmark.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the Xetra ETL stages.')
+    parser.add_argument('--windows', type=int, nargs='+', default=[1, 10, 60],
+                        help='Date windows in days.')
+    parser.add_argument('--isins', type=int, default=3000, help='Number of ISINs.')
+    parser.add_argument('--rows-per-file', type=int, default=10000,
+                        help='Rows per hourly source file.')
+    parser.add_argument('--src', action='append', default=[], metavar='KEY=VALUE',
+                        help='XetraSourceConfig field, e.g. src_engine=arrow.')
+    parser.add_argument('--trg', action='append', default=[], metavar='KEY=VALUE',
+                        help='XetraTargetConfig field, e.g. trg_write_mode=partitioned.')
+    parser.add_argument('--output', help='JSON file the results are written to.')
+    args = parser.parse_args()
+    source_options = parse_options(args.src)
+    target_options = parse_options(args.trg)
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'pyarrow': pa.__version__,
+        'isins': args.isins,
+        'rows_per_file': args.rows_per_file,
+        'source_options': source_options,
+        'target_options': target_options,
+        'windows': []
+    }
+    for days in args.windows:
+        # A fresh process per window keeps the peak RSS of the windows apart
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+            results['windows'].append(executor.submit(
+                run_window, days, args.isins, args.rows_per_file, source_options,
+                target_options).result())
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Synthetic Xetra source data for benchmarks"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Columns of the Xetra source files in the order of the original files
+XETRA_COLUMNS = ['ISIN', 'Mnemonic', 'SecurityDesc', 'SecurityType', 'Currency',
+                 'SecurityID', 'Date', 'Time', 'StartPrice', 'MaxPrice', 'MinPrice',
+                 'EndPrice', 'TradedVolume', 'NumberOfTrades']
+# Trading hours of the hourly source files
+XETRA_HOURS = range(8, 17)
+
+
+def xetra_isins(isin_count: int):
+    """
+    Creating a fixed universe of ISINs with mnemonics, descriptions and security ids
+
+    Args:
+        isin_count (int): number of ISINs
+
+    Returns:
+        isins: Pandas DataFrame with one row per ISIN
+    """
+    return pd.DataFrame({
+        'ISIN': [f'DE000{number:07d}' for number in range(isin_count)],
+        'Mnemonic': [f'M{number:04d}' for number in range(isin_count)],
+        'SecurityDesc': [f'SECURITY {number} AG NA O.N.' for number in range(isin_count)],
+        'SecurityType': 'Common stock',
+        'Currency': 'EUR',
+        'SecurityID': np.arange(2504000, 2504000 + isin_count),
+        'BasePrice': np.random.default_rng(isin_count).uniform(1, 500, isin_count)
+    })
+
+
+def xetra_hourly_frame(date: str, hour: int, isins: pd.DataFrame, rows: int, seed: int = 0):
+    """
+    Creating the content of one hourly Xetra source file
+
+    Args:
+        date (str): trading date as YYYY-MM-DD
+        hour (int): trading hour
+        isins (pd.DataFrame): ISIN universe created by xetra_isins
+        rows (int): number of ISIN/minute rows in the file
+        seed (int, optional): seed of the random generator
+
+    Returns:
+        data_frame: Pandas DataFrame with the Xetra source columns
+    """
+    rng = np.random.default_rng(seed)
+    rows = min(rows, len(isins) * 60)
+    # Every row is a distinct ISIN/minute pair, sorted by time like the source files
+    slots = np.sort(rng.choice(len(isins) * 60, rows, replace=False))
+    minutes, isin_index = np.divmod(slots, len(isins))
+    selected = isins.iloc[isin_index].reset_index(drop=True)
+    start_price = (selected['BasePrice'] * rng.uniform(0.98, 1.02, rows)).round(4)
+    end_price = (start_price * rng.uniform(0.99, 1.01, rows)).round(4)
+    data_frame = selected.drop(columns='BasePrice')
+    data_frame['Date'] = date
+    data_frame['Time'] = [f'{hour:02d}:{minute:02d}' for minute in minutes]
+    data_frame['StartPrice'] = start_price
+    data_frame['MaxPrice'] = np.maximum(start_price, end_price) * 1.001
+    data_frame['MinPrice'] = np.minimum(start_price, end_price) * 0.999
+    data_frame['EndPrice'] = end_price
+    data_frame['TradedVolume'] = rng.integers(1, 5000, rows)
+    data_frame['NumberOfTrades'] = rng.integers(1, 20, rows)
+    return data_frame[XETRA_COLUMNS].round({'MaxPrice': 4, 'MinPrice': 4})
+
+
+def xetra_source_files(first_date: str, days: int, isin_count: int = 3000,
+                       rows_per_file: int = 20000):
+    """
+    Creating the hourly Xetra source files of a date window
+
+    Args:
+        first_date (str): first trading date as YYYY-MM-DD
+        days (int): number of days
+        isin_count (int, optional): number of ISINs
+        rows_per_file (int, optional): number of ISIN/minute rows per hourly file
+
+    Returns:
+        files: generator of tuples with the source key and the csv content as bytes
+    """
+    isins = xetra_isins(isin_count)
+    start = datetime.strptime(first_date, '%Y-%m-%d').date()
+    for day in range(days):
+        date = (start + timedelta(days=day)).strftime('%Y-%m-%d')
+        for hour in XETRA_HOURS:
+            data_frame = xetra_hourly_frame(date, hour, isins, rows_per_file,
+                                            seed=day * 100 + hour)
+            yield (f'{date}/{date}_BINS_XETR{hour:02d}.csv',
+                   data_frame.to_csv(index=False).encode('utf-8'))
@@ -5,8 +5,13 @@ import logging.config
 
 import yaml
 
-from source_code.common.s3 import S3BucketConnector
-from source_code.transformers.Xetra_transformer import Xetra_ETL, XetraSourceConfig, XetraTargetConfig
+from source_code.common.cache import LocalObjectCache
+from source_code.common.inventory import S3Inventory
+from source_code.common.metrics import JsonLinesMetricsSink
+from source_code.common.s3 import S3BucketConnector, S3ClientConfig
+from source_code.transformers.Xetra_backfill import Xetra_Backfill, XetraBackfillConfig
+from source_code.transformers.Xetra_transformer import Xetra_ETL, XetraBarsConfig, \
+    XetraSourceConfig, XetraTargetConfig
 
 
 def main():
@@ -16,6 +21,14 @@ def main():
     # Parsing YML file
     parser = argparse.ArgumentParser(description='Run the Xetra ETL Job.')
     parser.add_argument('config', help='A configuration file in YAML format.')
+    parser.add_argument('--backfill', nargs=2, metavar=('START_DATE', 'END_DATE'),
+                        help='Processes all dates from START_DATE till END_DATE (YYYY-MM-DD) '
+                             'that are not processed yet in resumable batches.')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Prints the planned dates without extracting source data or '
+                             'writing to the target. The meta files are read and the source '
+                             'bucket is listed for changed source files (meta_manifest_key) '
+                             'and for the sizes of the backfill batches.')
     args = parser.parse_args()
 
 #    config = 'C:/Daten/xetra_project_old/xetra_1234/configs/xetra_report1_config.yaml'
@@ -27,15 +40,49 @@ def main():
     logging.config.dictConfig(log_config)
     # reading s3 configuration
     s3_config = config['s3']
+    # configuration of the shared s3 clients: connection pool, retries and timeouts
+    client_config = S3ClientConfig(**s3_config.get('client', {}))
+    # creating the optional local cache of the source files
+    cache_config = config.get('cache')
+    cache = LocalObjectCache(cache_config['cache_dir'], cache_config['cache_max_size_mb'])\
+        if cache_config else None
+    # creating the optional local inventory of the source bucket
+    inventory_config = config.get('inventory')
+    inventory = S3Inventory(inventory_config['inventory_path'])\
+        if inventory_config else None
+    # creating the optional sink for the metrics of the ETL stages
+    metrics_config = config.get('metrics')
+    metrics = JsonLinesMetricsSink(metrics_config['metrics_path'])\
+        if metrics_config else None
     # creating the S3BucketConnector classes for source and target
     s3_bucket_src = S3BucketConnector(access_key=s3_config['access_key'],
                                       secret_key=s3_config['secret_key'],
                                       endpoint_url=s3_config['src_endpoint_url'],
-                                      bucket=s3_config['src_bucket'])
+                                      bucket=s3_config['src_bucket'],
+                                      cache=cache,
+                                      metrics=metrics,
+                                      inventory=inventory,
+                                      client_config=client_config)
     s3_bucket_trg = S3BucketConnector(access_key=s3_config['access_key'],
                                       secret_key=s3_config['secret_key'],
                                       endpoint_url=s3_config['trg_endpoint_url'],
-                                      bucket=s3_config['trg_bucket'])
+                                      bucket=s3_config['trg_bucket'],
+                                      metrics=metrics,
+                                      part_size_mb=s3_config.get('part_size_mb', 8),
+                                      max_part_concurrency=s3_config.get(
+                                          'max_part_concurrency', 4),
+                                      client_config=client_config)
+    # creating the optional asyncio connector reading the source files,
+    # aiobotocore is only installed with the async Pipfile category
+    s3_bucket_src_async = None
+    if s3_config.get('src_async'):
+        from source_code.common.async_s3 import AsyncS3BucketConnector
+        s3_bucket_src_async = AsyncS3BucketConnector(access_key=s3_config['access_key'],
+                                                     secret_key=s3_config['secret_key'],
+                                                     endpoint_url=s3_config['src_endpoint_url'],
+                                                     bucket=s3_config['src_bucket'],
+                                                     metrics=metrics,
+                                                     client_config=client_config)
     # reading source configuration
     source_config = XetraSourceConfig(**config['source'])
     # reading target configuration
@@ -45,10 +92,50 @@ def main():
     # creating XetraETL class
     logger = logging.getLogger(__name__)
     logger.info('Xetra ETL job started.')
+    if args.backfill:
+        # running the backfill of report 1 for the given date range
+        backfill_config = XetraBackfillConfig(**config.get('backfill', {}))
+        xetra_backfill = Xetra_Backfill(s3_bucket_src, s3_bucket_trg,
+                                        meta_config['meta_key'], source_config, target_config,
+                                        backfill_config,
+                                        meta_format=meta_config.get('meta_format', 'csv'),
+                                        metrics=metrics,
+                                        last_close_key=meta_config.get('meta_last_close_key'),
+                                        manifest_key=meta_config.get('meta_manifest_key'))
+        if args.dry_run:
+            for batch in xetra_backfill.plan_batches(*args.backfill):
+                print(f'batch: {batch[0]} - {batch[-1]} ({len(batch)} dates)')
+            return
+        xetra_backfill.backfill_report1(*args.backfill)
+        logger.info('Xetra ETL job finished.')
+        return
     xetra_etl = Xetra_ETL(s3_bucket_src, s3_bucket_trg,
-                         meta_config['meta_key'], source_config, target_config)
-    # running etl job for xetra report 1
-    xetra_etl.etl_report1()
+                         meta_config['meta_key'], source_config, target_config,
+                         last_close_key=meta_config.get('meta_last_close_key'),
+                         meta_format=meta_config.get('meta_format', 'csv'),
+                         metrics=metrics,
+                         manifest_key=meta_config.get('meta_manifest_key'),
+                         s3_bucket_src_async=s3_bucket_src_async,
+                         change_lookback_days=meta_config.get('meta_change_lookback_days', 7),
+                         dry_run=args.dry_run)
+    if args.dry_run:
+        # printing the plan, the meta and manifest files are read and with a manifest
+        # the source bucket is listed for the changed dates, nothing is written
+        plan = xetra_etl.plan
+        print(f'extract_date: {plan.extract_date}')
+        print(f'extract_date_list: {", ".join(plan.extract_date_list)}')
+        print(f'meta_update_list: {", ".join(str(date) for date in plan.meta_update_list)}')
+        print(f'changed_dates: {", ".join(plan.changed_dates)}')
+        return
+    bars_config = config.get('bars')
+    if bars_config:
+        # running etl job for xetra report 1 and the bars from one extraction
+        xetra_etl.register_report(xetra_etl.report1())
+        xetra_etl.register_report(xetra_etl.bars_report(XetraBarsConfig(**bars_config)))
+        xetra_etl.etl_reports()
+    else:
+        # running etl job for xetra report 1
+        xetra_etl.etl_report1()
     logger.info('Xetra ETL job finished.')
 
 
@@ -0,0 +1,195 @@
+"""Connector and Methods Accessing S3 with asyncio"""
+
+import logging
+import os
+from io import BytesIO
+from aiobotocore.session import get_session
+from botocore.config import Config
+import pandas as pd
+from custom_exceptions import WrongFormatException
+from constants import S3FileTypes
+from metrics import MetricsSink, StageMetrics
+from s3 import S3ClientConfig
+
+# Counters of the requests and transferred bytes of a connector
+_COUNTERS = ('s3_requests', 'bytes_read', 'bytes_written')
+
+
+class AsyncS3BucketConnector():
+    """
+    Class for interacting with s3 buckets from asyncio, with awaitable variants
+    of the S3BucketConnector methods. Many requests share one event loop thread
+    instead of one thread per request.
+
+    Used as async context manager, which opens the s3 client on the running
+    event loop and closes it on exit:
+
+        async with AsyncS3BucketConnector(...) as s3_bucket:
+            data_frame = await s3_bucket.read_csv_to_df(key)
+    """
+
+    def __init__(self, access_key: str, secret_key: str, endpoint_url: str, bucket: str,
+                 metrics: MetricsSink = None,
+                 client_config: S3ClientConfig = S3ClientConfig()):
+        """
+        Constructor for AsyncS3BucketConnector
+
+        Args:
+            access_key (str): aceess key for accessing s3
+            secret_key (str): secret key for accessing s3
+            endpoint_url (str): endpoint url for s3
+            bucket (str): s3 bucket name
+            metrics (MetricsSink, optional): sink for the metrics of every request
+            client_config (S3ClientConfig, optional): pool size, retries and timeouts of the
+                                                      s3 client, max_pool_connections limits
+                                                      the connections of the event loop
+        """
+        self._logger = logging.getLogger(__name__)
+        self.endpoint_url = endpoint_url
+        self.secret_key = secret_key
+        self.bucket = bucket
+        self._access_key_id = os.environ[access_key]
+        self._secret_access_key = os.environ[secret_key]
+        self.client_config = client_config
+        self.metrics = metrics if metrics is not None else MetricsSink()
+        self.s3_client = None
+        self._client_context = None
+        self._counters = dict.fromkeys(_COUNTERS, 0)
+
+    async def __aenter__(self):
+        self._client_context = get_session().create_client(
+            's3', endpoint_url=self.endpoint_url,
+            aws_access_key_id=self._access_key_id,
+            aws_secret_access_key=self._secret_access_key,
+            config=Config(max_pool_connections=self.client_config.max_pool_connections,
+                          retries={'mode': self.client_config.retry_mode,
+                                   'max_attempts': self.client_config.max_attempts},
+                          connect_timeout=self.client_config.connect_timeout,
+                          read_timeout=self.client_config.read_timeout))
+        self.s3_client = await self._client_context.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        client_context = self._client_context
+        self.s3_client = None
+        self._client_context = None
+        await client_context.__aexit__(exc_type, exc_value, traceback)
+        return False
+
+    def _add_counter(self, counters: dict, name: str, value: int):
+        """
+        Adding a value to the total counter and the counter of one request
+
+        :param counters: counters of the request
+        :param name: name of the counter
+        :param value: value that is added
+        """
+        self._counters[name] += value
+        counters[name] += value
+
+    async def _request(self, counters: dict, operation: str, **kwargs):
+        """
+        Sending one request with the s3 client and counting it
+
+        :param counters: counters of the calling method
+        :param operation: name of the client method, e.g. 'get_object'
+        :param kwargs: parameters of the request, the bucket is added
+
+        returns:
+          response: response of the request
+        """
+        self._add_counter(counters, 's3_requests', 1)
+        return await getattr(self.s3_client, operation)(Bucket=self.bucket, **kwargs)
+
+    def counters(self):
+        """
+        Total number of s3 requests, bytes read and bytes written by this connector
+
+        returns:
+          counters: dictionary with the counter values
+        """
+        return dict(self._counters)
+
+    async def list_files_in_prefix(self, prefix: str):
+        """
+        listing all files with a prefix on the S3 bucket
+
+        :param prefix: prefix on the S3 bucket that should be filtered with
+
+        returns:
+          files: list of all the file names containing the prefix in the key
+        """
+        # Every call counts its own requests, the calls run interleaved on one thread
+        counters = dict.fromkeys(_COUNTERS, 0)
+        with StageMetrics(self.metrics, 'list_files_in_prefix', lambda: counters,
+                          bucket=self.bucket, prefix=prefix) as metrics:
+            files = []
+            kwargs = {'Prefix': prefix}
+            while True:
+                response = await self._request(counters, 'list_objects_v2', **kwargs)
+                files.extend(obj['Key'] for obj in response.get('Contents', []))
+                if not response.get('IsTruncated'):
+                    break
+                kwargs['ContinuationToken'] = response['NextContinuationToken']
+            metrics.record(files=len(files))
+        return files
+
+    async def read_csv_to_df(self, key: str, decoding: str = 'utf-8', sep: str = ',',
+                             columns: list = None, dtype: dict = None):
+        """
+        Reading a CSV file from the S3 bucket and returning a dataframe.
+        The download is awaited, the parsing runs on the event loop.
+
+        Args:
+            key (str): key of the file that should be read
+            decoding (str, optional): encoding of the data inside the csv file
+            sep (str, optional): separator of the csv file
+            columns (list, optional): columns that should be read, all columns if None
+            dtype (dict, optional): data types per column, inferred by pandas if None
+
+        Returns:
+            df: Pandas DataFrame containing the data of the csv file
+        """
+        counters = dict.fromkeys(_COUNTERS, 0)
+        with StageMetrics(self.metrics, 'read_csv_to_df', lambda: counters,
+                          bucket=self.bucket, key=key) as metrics:
+            self._logger.info('Reading file %s/%s/%s', self.endpoint_url, self.bucket, key)
+            response = await self._request(counters, 'get_object', Key=key)
+            async with response['Body'] as body:
+                csv_obj = await body.read()
+            self._add_counter(counters, 'bytes_read', len(csv_obj))
+            data_frame = pd.read_csv(BytesIO(csv_obj), sep=sep, encoding=decoding,
+                                     usecols=columns, dtype=dtype)
+            metrics.record(rows_out=len(data_frame))
+        return data_frame
+
+    async def write_df_s3(self, df: pd.DataFrame, key: str, file_format: str):
+        """
+        Write a dataframe to the S3 bucket with one put_object request
+        Supported formats: .parquet, .csv
+
+        Args:
+            df (pd.DataFrame): dataframe
+            key (str): target key
+            file_format (str): format of the file
+        """
+        if df.empty:
+            self._logger.info('The dataframe is empty! No file will be written.')
+            return None
+
+        self._logger.info(f'Writing file {self.endpoint_url}, {self.bucket}, {key}')
+        if file_format not in (S3FileTypes.PARQUET.value, S3FileTypes.CSV.value):
+            self._logger.info(f'The file type {file_format} is not supported!')
+            raise WrongFormatException
+        counters = dict.fromkeys(_COUNTERS, 0)
+        with StageMetrics(self.metrics, 'write_df_s3', lambda: counters,
+                          bucket=self.bucket, key=key, rows_in=len(df)):
+            if file_format == S3FileTypes.PARQUET.value:
+                out_buffer = BytesIO()
+                df.to_parquet(out_buffer, index=False)
+                content = out_buffer.getvalue()
+            else:
+                content = df.to_csv(index=False).encode('utf-8')
+            await self._request(counters, 'put_object', Key=key, Body=content)
+            self._add_counter(counters, 'bytes_written', len(content))
+        return True
@@ -0,0 +1,113 @@
+"""Local on-disk cache of parsed S3 objects"""
+import hashlib
+import logging
+import os
+import threading
+
+import pyarrow as pa
+
+
+class LocalObjectCache():
+    """
+    Class for caching parsed S3 objects as Arrow IPC files in a local directory.
+    Entries are keyed by bucket, key and ETag, so a changed object is never served
+    from the cache. The least recently used entries are evicted when the cache
+    grows beyond its maximum size.
+    """
+
+    def __init__(self, cache_dir: str, max_size_mb: float):
+        """
+        Constructor for LocalObjectCache
+
+        Args:
+            cache_dir (str): local directory of the cache files
+            max_size_mb (float): maximum size of the cache in MB
+        """
+        self._logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, bucket: str, key: str, etag: str, variant: str):
+        """
+        Path of the cache file of an object
+
+        Args:
+            bucket (str): s3 bucket name
+            key (str): key of the object
+            etag (str): ETag of the object
+            variant (str): description of how the object was parsed
+
+        Returns:
+            path: path of the cache file
+        """
+        name = hashlib.sha256(f'{bucket}/{key}/{etag}/{variant}'.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{name}.arrow')
+
+    def get_table(self, bucket: str, key: str, etag: str, variant: str = ''):
+        """
+        Reading a cached object as memory mapped Arrow table
+
+        Args:
+            bucket (str): s3 bucket name
+            key (str): key of the object
+            etag (str): ETag of the object
+            variant (str, optional): description of how the object was parsed
+
+        Returns:
+            table: Arrow table of the cached object, None if the object is not cached
+        """
+        path = self._path(bucket, key, etag, variant)
+        try:
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+            # Updating the modification time marks the entry as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        self._logger.info('Reading file %s/%s from cache', bucket, key)
+        return table
+
+    def put_table(self, bucket: str, key: str, etag: str, table: pa.Table, variant: str = ''):
+        """
+        Writing a parsed object to the cache and evicting the least
+        recently used entries if the cache is too large
+
+        Args:
+            bucket (str): s3 bucket name
+            key (str): key of the object
+            etag (str): ETag of the object
+            table (pa.Table): parsed object
+            variant (str, optional): description of how the object was parsed
+        """
+        path = self._path(bucket, key, etag, variant)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        # Renaming is atomic, readers never see a partially written file
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        """
+        Deleting the least recently used cache files until the cache
+        is not larger than its maximum size
+        """
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith('.arrow'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            size = sum(entry[1] for entry in entries)
+            for _, entry_size, path in sorted(entries):
+                if size <= self.max_size_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                size -= entry_size
+                self._logger.info('Evicted %s from cache', path)
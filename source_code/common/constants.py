@@ -9,6 +9,22 @@ class S3FileTypes(Enum):
     CSV = 'csv'
     PARQUET = 'parquet'
 
+class CsvEngines(Enum):
+    """
+    supported engines for reading source csv files
+    """
+
+    PANDAS = 'pandas'
+    ARROW = 'arrow'
+
+class TargetWriteModes(Enum):
+    """
+    supported modes for writing the target data
+    """
+
+    FULL = 'full'
+    PARTITIONED = 'partitioned'
+
 class MetaProcessFormat(Enum):
     """
     formation for MetaProcess class
@@ -18,5 +34,11 @@ class MetaProcessFormat(Enum):
     META_SOURCE_DATE_COL = 'source_date'
     META_PROCESS_DATE_COL = 'datetime_of_processing'
     META_FILE_FORMAT = 'csv'
+    META_PART_PREFIX = 'part_'
+    META_PART_DATE_FORMAT = '%Y%m%d_%H%M%S_%f'
+    META_MAX_PARTS = 100
+    META_MANIFEST_KEY_COL = 'key'
+    META_MANIFEST_ETAG_COL = 'etag'
+    META_MANIFEST_SIZE_COL = 'size'
     
     
\ No newline at end of file
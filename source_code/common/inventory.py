@@ -0,0 +1,88 @@
+"""Local inventory of the objects of a S3 bucket"""
+import bisect
+import json
+import os
+import threading
+
+
+class S3Inventory():
+    """
+    Persists the keys, ETags and sizes of the objects below completely listed
+    prefixes (e.g. past source dates) in a local JSON file, so later runs
+    only list the prefixes that are not in the inventory yet
+    """
+
+    def __init__(self, path: str):
+        """
+        Constructor for S3Inventory
+
+        Args:
+            path (str): path of the JSON file of the inventory
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._bucket = None
+        self._prefixes = set()
+        self._objects = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as inventory_file:
+                inventory = json.load(inventory_file)
+            self._bucket = inventory['bucket']
+            self._prefixes = set(inventory['prefixes'])
+            self._objects = inventory['objects']
+        self._keys = sorted(self._objects)
+
+    def objects(self, bucket: str, prefix: str):
+        """
+        Objects below a completely listed prefix
+
+        Args:
+            bucket (str): name of the bucket
+            prefix (str): prefix that was listed
+
+        Returns:
+            objects: list of dictionaries with Key, ETag and Size in key order,
+                     None if the prefix is not in the inventory
+        """
+        with self._lock:
+            if bucket != self._bucket or prefix not in self._prefixes:
+                return None
+            objects = []
+            for key in self._keys[bisect.bisect_left(self._keys, prefix):]:
+                if not key.startswith(prefix):
+                    break
+                etag, size = self._objects[key]
+                objects.append({'Key': key, 'ETag': etag, 'Size': size})
+            return objects
+
+    def update(self, bucket: str, prefixes: list, objects: list):
+        """
+        Adding completely listed prefixes and their objects to the inventory
+        and saving it, the objects of prefixes listed again are replaced
+
+        Args:
+            bucket (str): name of the bucket
+            prefixes (list): prefixes that were listed completely
+            objects (list): dictionaries with Key, ETag and Size of the objects below prefixes
+        """
+        if not prefixes:
+            return
+        with self._lock:
+            if bucket != self._bucket:
+                # The inventory belongs to one bucket
+                self._bucket = bucket
+                self._prefixes = set()
+                self._objects = {}
+            prefix_length = len(prefixes[0])
+            listed = set(prefixes)
+            self._objects = {key: value for key, value in self._objects.items()
+                             if key[:prefix_length] not in listed}
+            self._prefixes.update(prefixes)
+            for obj in objects:
+                self._objects[obj['Key']] = [obj['ETag'], obj['Size']]
+            self._keys = sorted(self._objects)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(f'{self.path}.tmp', 'w', encoding='utf-8') as inventory_file:
+                json.dump({'bucket': self._bucket, 'prefixes': sorted(self._prefixes),
+                           'objects': self._objects}, inventory_file)
+            os.replace(f'{self.path}.tmp', self.path)
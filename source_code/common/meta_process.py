@@ -1,19 +1,24 @@
 """Methods for processing the meta data"""
 
+import threading
+
 import pandas as pd
 from datetime import datetime, timedelta
 
 from s3 import S3BucketConnector
-from constants import MetaProcessFormat
+from constants import MetaProcessFormat, S3FileTypes
 from custom_exceptions import WrongMetaFileException
 
+# Serializing the meta file updates of concurrent jobs, e.g. backfill batches
+_META_UPDATE_LOCK = threading.Lock()
 
 class MetaProcess():
     """
     This class is for working with the meta data
     """
     @staticmethod
-    def update_meta_file(extract_date_list: list, meta_key: str, s3_target_bucket: S3BucketConnector):
+    def update_meta_file(extract_date_list: list, meta_key: str, s3_target_bucket: S3BucketConnector,
+                         meta_format: str = MetaProcessFormat.META_FILE_FORMAT.value):
         """
         Updating the meta file with the processed Xetra dates and today's date as 
         processed date
@@ -22,6 +27,8 @@ class MetaProcess():
             extract_date_list (list): a list of dates that are extracted from the source 
             meta_key (str): key of meta file on the s3 bucket
             s3_target_bucket (S3BucketConnector): S3BucketConnector with the bucket containing the meta file
+            meta_format (str, optional): 'csv' for one meta file that is rewritten on every update,
+                                         'parquet' for one part file per update below meta_key
         """
         # Creating an empty dataframe
         df_new = pd.DataFrame(columns=
@@ -32,23 +39,191 @@ class MetaProcess():
         # Filling the processed column
         df_new[MetaProcessFormat.META_PROCESS_DATE_COL.value] = \
             datetime.today().strftime(MetaProcessFormat.META_PROCESS_DATE_FORMAT.value)
-        try:
+        with _META_UPDATE_LOCK:
+            return MetaProcess._write_meta_update(df_new, meta_key, s3_target_bucket, meta_format)
+
+    @staticmethod
+    def _write_meta_update(df_new: pd.DataFrame, meta_key: str,
+                           s3_target_bucket: S3BucketConnector, meta_format: str):
+        """
+        Writing new rows of the meta data, see update_meta_file
+
+        Args:
+            df_new (pd.DataFrame): DataFrame with the new rows of the meta data
+            meta_key (str): key of meta file on the s3 bucket
+            s3_target_bucket (S3BucketConnector): S3BucketConnector with the bucket containing the meta file
+            meta_format (str): 'csv' or 'parquet'
+        """
+        if meta_format == S3FileTypes.PARQUET.value:
+            # Appending a typed part file with the new dates only
+            if df_new.empty:
+                return True
+            df_new[MetaProcessFormat.META_SOURCE_DATE_COL.value] = pd.to_datetime(
+                df_new[MetaProcessFormat.META_SOURCE_DATE_COL.value].astype(str),
+                format=MetaProcessFormat.META_DATE_FORMAT.value)
+            df_new[MetaProcessFormat.META_PROCESS_DATE_COL.value] = pd.to_datetime(
+                df_new[MetaProcessFormat.META_PROCESS_DATE_COL.value],
+                format=MetaProcessFormat.META_PROCESS_DATE_FORMAT.value)
+            part_key = (
+                f'{meta_key}/{MetaProcessFormat.META_PART_PREFIX.value}'
+                f'{datetime.today().strftime(MetaProcessFormat.META_PART_DATE_FORMAT.value)}.'
+                f'{S3FileTypes.PARQUET.value}'
+            )
+            s3_target_bucket.write_df_s3(df_new, part_key, S3FileTypes.PARQUET.value)
+            part_keys = s3_target_bucket.list_files_in_prefix(
+                f'{meta_key}/{MetaProcessFormat.META_PART_PREFIX.value}')
+            if len(part_keys) > MetaProcessFormat.META_MAX_PARTS.value:
+                MetaProcess.compact_meta_file(meta_key, s3_target_bucket)
+            return True
+        df_old = MetaProcess.return_meta_data(meta_key, s3_target_bucket, meta_format)
+        if df_old is None:
+            # No meta file exists
+            df_all = df_new
+        else:
             # If the meta file exists
-            df_old = s3_target_bucket.read_csv_to_df(meta_key)
-            
             if (df_old.columns != df_new.columns).any():
                 raise WrongMetaFileException
             df_all = pd.concat([df_old, df_new], ignore_index=True)
-        except s3_target_bucket.session.client('s3').exceptions.NoSuchKey:
-            # No meta file exists
-            df_all = df_new
         # Writing to s3
         s3_target_bucket.write_df_s3(df_all, meta_key, MetaProcessFormat.META_FILE_FORMAT.value)
         return True
-            
-    
+
+    @staticmethod
+    def return_meta_data(meta_key: str, s3_bucket_meta: S3BucketConnector,
+                         meta_format: str = MetaProcessFormat.META_FILE_FORMAT.value):
+        """
+        Reading the meta data
+
+        Args:
+            meta_key (str): key of the meta file on the s3 bucket
+            s3_bucket_meta (S3BucketConnector): S3BucketConnector for the bucket with the meta file
+            meta_format (str, optional): 'csv' or 'parquet', see update_meta_file
+
+        Returns:
+            meta_data: DataFrame with the meta data, None if there is no meta file
+        """
+        if meta_format == S3FileTypes.PARQUET.value:
+            part_keys = s3_bucket_meta.list_files_in_prefix(
+                f'{meta_key}/{MetaProcessFormat.META_PART_PREFIX.value}')
+            if not part_keys:
+                return None
+            return pd.concat([s3_bucket_meta.read_parquet_to_df(key) for key in part_keys],
+                             ignore_index=True)
+        try:
+            return s3_bucket_meta.read_csv_to_df(meta_key)
+        except s3_bucket_meta.s3_client.exceptions.NoSuchKey:
+            return None
+
+    @staticmethod
+    def return_processed_dates(meta_key: str, s3_bucket_meta: S3BucketConnector,
+                               meta_format: str = MetaProcessFormat.META_FILE_FORMAT.value):
+        """
+        Reading the source dates that are processed already
+
+        Args:
+            meta_key (str): key of the meta file on the s3 bucket
+            s3_bucket_meta (S3BucketConnector): S3BucketConnector for the bucket with the meta file
+            meta_format (str, optional): 'csv' or 'parquet', see update_meta_file
+
+        Returns:
+            processed_dates: set of the processed dates as strings in META_DATE_FORMAT
+        """
+        meta_data = MetaProcess.return_meta_data(meta_key, s3_bucket_meta, meta_format)
+        if meta_data is None:
+            return set()
+        return set(pd.to_datetime(meta_data[MetaProcessFormat.META_SOURCE_DATE_COL.value])\
+            .dt.strftime(MetaProcessFormat.META_DATE_FORMAT.value))
+
+    @staticmethod
+    def return_manifest(manifest_key: str, s3_bucket_meta: S3BucketConnector):
+        """
+        Reading the source files recorded per processed date, stored next to the meta file
+
+        Args:
+            manifest_key (str): key of the manifest file on the s3 bucket
+            s3_bucket_meta (S3BucketConnector): S3BucketConnector for the bucket with the meta file
+
+        Returns:
+            manifest: dictionary with the set of (key, ETag, size) of the source files
+                      per processed date 'YYYY-MM-DD', empty if there is no manifest yet
+        """
+        try:
+            df_manifest = s3_bucket_meta.read_csv_to_df(manifest_key)
+        except s3_bucket_meta.s3_client.exceptions.NoSuchKey:
+            return {}
+        manifest = {}
+        for date, key, etag, size in zip(
+                df_manifest[MetaProcessFormat.META_SOURCE_DATE_COL.value].astype(str),
+                df_manifest[MetaProcessFormat.META_MANIFEST_KEY_COL.value],
+                df_manifest[MetaProcessFormat.META_MANIFEST_ETAG_COL.value],
+                df_manifest[MetaProcessFormat.META_MANIFEST_SIZE_COL.value]):
+            files = manifest.setdefault(date, set())
+            # Dates without source files are recorded with an empty key
+            if not pd.isna(key):
+                files.add((key, etag, int(size)))
+        return manifest
+
+    @staticmethod
+    def update_manifest(objects: dict, manifest_key: str, s3_bucket_meta: S3BucketConnector):
+        """
+        Recording the source files of processed dates, the files recorded
+        before for these dates are replaced
+
+        Args:
+            objects (dict): list of the source objects (Key, ETag, Size) per date 'YYYY-MM-DD'
+            manifest_key (str): key of the manifest file on the s3 bucket
+            s3_bucket_meta (S3BucketConnector): S3BucketConnector for the bucket with the meta file
+        """
+        columns = [MetaProcessFormat.META_SOURCE_DATE_COL.value,
+                   MetaProcessFormat.META_MANIFEST_KEY_COL.value,
+                   MetaProcessFormat.META_MANIFEST_ETAG_COL.value,
+                   MetaProcessFormat.META_MANIFEST_SIZE_COL.value]
+        if not objects:
+            return True
+        rows = []
+        for date, date_objects in objects.items():
+            rows.extend([(date, obj['Key'], obj['ETag'], obj['Size']) for obj in date_objects]
+                        or [(date, '', '', 0)])
+        df_new = pd.DataFrame(rows, columns=columns)
+        with _META_UPDATE_LOCK:
+            try:
+                df_old = s3_bucket_meta.read_csv_to_df(manifest_key)
+            except s3_bucket_meta.s3_client.exceptions.NoSuchKey:
+                df_old = None
+            if df_old is not None:
+                if list(df_old.columns) != columns:
+                    raise WrongMetaFileException
+                df_old = df_old[~df_old[MetaProcessFormat.META_SOURCE_DATE_COL.value]
+                                .astype(str).isin(objects)]
+                df_new = pd.concat([df_old, df_new], ignore_index=True)
+            df_new = df_new.sort_values(by=columns[:2], kind='stable')
+            s3_bucket_meta.write_df_s3(df_new, manifest_key,
+                                       MetaProcessFormat.META_FILE_FORMAT.value)
+        return True
+
     @staticmethod
-    def return_date_list(first_date: str, meta_key: str, s3_bucket_meta: S3BucketConnector):
+    def compact_meta_file(meta_key: str, s3_bucket_meta: S3BucketConnector):
+        """
+        Merging the part files of a parquet meta file into one part file
+
+        Args:
+            meta_key (str): key of the meta file on the s3 bucket
+            s3_bucket_meta (S3BucketConnector): S3BucketConnector for the bucket with the meta file
+        """
+        part_keys = s3_bucket_meta.list_files_in_prefix(
+            f'{meta_key}/{MetaProcessFormat.META_PART_PREFIX.value}')
+        if len(part_keys) <= 1:
+            return True
+        meta_data = pd.concat([s3_bucket_meta.read_parquet_to_df(key) for key in part_keys],
+                              ignore_index=True)
+        # The merged part sorts before all parts written afterwards
+        s3_bucket_meta.write_df_s3(meta_data, part_keys[-1], S3FileTypes.PARQUET.value)
+        s3_bucket_meta.delete_files(part_keys[:-1])
+        return True
+
+    @staticmethod
+    def return_date_list(first_date: str, meta_key: str, s3_bucket_meta: S3BucketConnector,
+                         meta_format: str = MetaProcessFormat.META_FILE_FORMAT.value):
         """
         Creating a list of dates based on the input first_date and the processed dates
         in the meta file
@@ -57,46 +232,80 @@ class MetaProcess():
             first_date (str): the earliest date Xetra data should be processed
             meta_key (str): ket of the meta file on the s3 bucket
             s3_bucket_meta (S3BucketConnector): S3BucketConnector for the bucket with the meta file
+            meta_format (str, optional): 'csv' or 'parquet', see update_meta_file
 
         Returns:
             return_min_date: first date that should be processed
             date_list: list of all dates from min_date till 10 days later
         """
         start = datetime.strptime(first_date, MetaProcessFormat.META_DATE_FORMAT.value).date() - timedelta(days=1)
-        end = datetime.strptime(first_date, MetaProcessFormat.META_DATE_FORMAT.value).date() + timedelta(days=10)
-        
-        try:
+        end = start + timedelta(days=11)
+        dates = [start + timedelta(days=x) for x in range(0, (end - start).days)]
+        meta_data = MetaProcess.return_meta_data(meta_key, s3_bucket_meta, meta_format)
+        if meta_data is not None:
             # If meta file exists create return_date_list using the content of the meta file 
-            # Reading meta file
-            meta_data = s3_bucket_meta.read_csv_to_df(meta_key)
-            # Creating a list of dates from first_date untill the the end_date
-            date_list = [datetime.strftime(start+timedelta(days=x), MetaProcessFormat.META_DATE_FORMAT.value) \
-            for x in range(0, ((end-start).days))]
             # Creating set of all dates in meta file
-            meta_data_date = list(pd.to_datetime(meta_data[MetaProcessFormat.META_SOURCE_DATE_COL.value]).dt.date)
-            date_list_date = [datetime.strptime(date, MetaProcessFormat.META_DATE_FORMAT.value).date()\
-                for date in date_list]
-            not_processed = [date for date in date_list_date if date not in meta_data_date]
-            if not_processed:
-                min_date = min(not_processed)
-                
-                date_list = [datetime.strftime(date, MetaProcessFormat.META_DATE_FORMAT.value) \
-                    for date in date_list_date if date>=min_date]
-                return_min_date = min(date_list)
+            meta_data_date = set(pd.to_datetime(
+                meta_data[MetaProcessFormat.META_SOURCE_DATE_COL.value]).dt.date)
+            # dates is sorted, the first date that is not processed is the minimum
+            min_date = next((date for date in dates if date not in meta_data_date), None)
+            if min_date is not None:
+                date_list = [date.strftime(MetaProcessFormat.META_DATE_FORMAT.value) \
+                    for date in dates if date >= min_date]
+                return_min_date = date_list[0]
             else:
                 # Setting values for the earliest date and the list of dates
                 date_list = []
                 return_min_date = datetime(2200, 1, 1).date()\
                     .strftime(MetaProcessFormat.META_DATE_FORMAT.value)
-        except s3_bucket_meta.session.client('s3').exceptions.NoSuchKey:
+        else:
             # No meta file found -> creating a date list from first_date - 1 day untill the end date
             return_min_date = start
-            date_list = [
-              (start + timedelta(days=x)).strftime(MetaProcessFormat.META_DATE_FORMAT.value) \
-              for x in range(0, (end - start).days)]
-            
-            
+            date_list = [date.strftime(MetaProcessFormat.META_DATE_FORMAT.value) for date in dates]
         return return_min_date, date_list
 
-            
-    
\ No newline at end of file
+    @staticmethod
+    def return_last_close(last_close_key: str, s3_bucket_meta: S3BucketConnector):
+        """
+        Reading the last known prices per ISIN, stored next to the meta file
+
+        Args:
+            last_close_key (str): key of the last close file on the s3 bucket
+            s3_bucket_meta (S3BucketConnector): S3BucketConnector for the bucket with the meta file
+
+        Returns:
+            last_close: DataFrame with ISIN, date and prices of the last trading day
+                        per ISIN, empty if there is no last close file yet
+        """
+        try:
+            return s3_bucket_meta.read_csv_to_df(last_close_key)
+        except s3_bucket_meta.s3_client.exceptions.NoSuchKey:
+            return pd.DataFrame()
+
+    @staticmethod
+    def update_last_close(last_close: pd.DataFrame, isin_col: str, date_col: str,
+                          last_close_key: str, s3_bucket_meta: S3BucketConnector):
+        """
+        Updating the last known prices per ISIN with the prices of a report
+
+        Args:
+            last_close (pd.DataFrame): DataFrame with ISIN, date and prices per ISIN and day
+            isin_col (str): column name of the ISIN
+            date_col (str): column name of the date
+            last_close_key (str): key of the last close file on the s3 bucket
+            s3_bucket_meta (S3BucketConnector): S3BucketConnector for the bucket with the meta file
+        """
+        # Reading and writing under the lock, backfill batches update the file concurrently
+        with _META_UPDATE_LOCK:
+            df_old = MetaProcess.return_last_close(last_close_key, s3_bucket_meta)
+            if not df_old.empty:
+                if set(df_old.columns) != set(last_close.columns):
+                    raise WrongMetaFileException
+                last_close = pd.concat([df_old, last_close], ignore_index=True)
+            # Keeping the most recent trading day per ISIN
+            last_close = last_close.sort_values(by=[date_col], kind='stable')\
+                .drop_duplicates(subset=[isin_col], keep='last')\
+                    .sort_values(by=[isin_col])
+            s3_bucket_meta.write_df_s3(last_close, last_close_key,
+                                       MetaProcessFormat.META_FILE_FORMAT.value)
+        return True
@@ -0,0 +1,92 @@
+"""Metrics of the ETL stages and pluggable sinks for them"""
+import json
+import threading
+import time
+from datetime import datetime
+
+
+class MetricsSink():
+    """
+    Base class for metrics sinks, discarding all records
+    """
+
+    def emit(self, record: dict):
+        """
+        Emitting one metrics record
+
+        Args:
+            record (dict): metrics record
+        """
+
+
+class JsonLinesMetricsSink(MetricsSink):
+    """
+    Metrics sink appending every record as one JSON line to a local file
+    """
+
+    def __init__(self, path: str):
+        """
+        Constructor for JsonLinesMetricsSink
+
+        Args:
+            path (str): path of the JSON lines file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict):
+        """
+        Appending one metrics record to the JSON lines file
+
+        Args:
+            record (dict): metrics record
+        """
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as metrics_file:
+                metrics_file.write(f'{line}\n')
+
+
+class StageMetrics():
+    """
+    Context manager measuring the duration of a stage and emitting it together
+    with the recorded values (rows, bytes, s3 requests) to a metrics sink
+    """
+
+    def __init__(self, sink: MetricsSink, stage: str, counters=None, **fields):
+        """
+        Constructor for StageMetrics
+
+        Args:
+            sink (MetricsSink): sink the record is emitted to
+            stage (str): name of the stage
+            counters (optional): function returning a dictionary of cumulative counters,
+                                 e.g. s3 requests, their increase during the stage is recorded
+            fields: additional values of the record, e.g. the s3 key
+        """
+        self.sink = sink
+        self.fields = {'stage': stage, **fields}
+        self._counters = counters
+        self._counters_start = {}
+        self._start = None
+
+    def __enter__(self):
+        if self._counters is not None:
+            self._counters_start = dict(self._counters())
+        self._start = time.perf_counter()
+        return self
+
+    def record(self, **fields):
+        """
+        Adding values to the record of the stage
+        """
+        self.fields.update(fields)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.fields['duration_s'] = time.perf_counter() - self._start
+        if self._counters is not None:
+            for name, value in self._counters().items():
+                self.fields[name] = value - self._counters_start.get(name, 0)
+        self.fields['status'] = 'ok' if exc_type is None else 'failed'
+        self.sink.emit({'timestamp': datetime.now().isoformat(), **self.fields})
+        return False
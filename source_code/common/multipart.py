@@ -0,0 +1,137 @@
+"""Streaming upload of large objects to S3"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class S3MultipartWriter():
+    """
+    Writable file object uploading its content to S3. The content is cut into parts
+    that are uploaded with a multipart upload while the writing goes on, so the memory
+    is bound by part_size times (max_concurrency + 1). Content smaller than one part
+    is uploaded with a single put_object.
+
+    Used as context manager: the upload is completed on a clean exit and aborted
+    if an exception was raised.
+    """
+
+    def __init__(self, request, key: str, part_size: int, max_concurrency: int = 4):
+        """
+        Constructor for S3MultipartWriter
+
+        Args:
+            request: function sending a request to the bucket, called with the name of
+                     the s3 client method and its parameters except the bucket
+            key (str): key of the object
+            part_size (int): size of the parts in bytes, at least 5 MB for S3
+            max_concurrency (int, optional): number of parts uploaded at the same time
+        """
+        self._request = request
+        self.key = key
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.bytes_written = 0
+        self.closed = False
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._executor = None
+        self._parts = []
+        self._pending = deque()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.bytes_written
+
+    def flush(self):
+        pass
+
+    def write(self, data):
+        """
+        Writing data, every complete part is handed over to the upload
+
+        Args:
+            data: bytes-like object
+
+        Returns:
+            size: number of bytes written
+        """
+        self._buffer += data
+        size = len(memoryview(data).cast('B'))
+        self.bytes_written += size
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._upload_part(part)
+        return size
+
+    def _upload_part(self, part: bytes):
+        """
+        Uploading one part, waiting for the oldest part if
+        max_concurrency parts are in flight
+
+        Args:
+            part (bytes): content of the part
+        """
+        if self._upload_id is None:
+            self._upload_id = self._request('create_multipart_upload',
+                                            Key=self.key)['UploadId']
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        while len(self._pending) >= self.max_concurrency:
+            self._pending.popleft().result()
+        future = self._executor.submit(self._request, 'upload_part', Key=self.key,
+                                       PartNumber=len(self._parts) + 1,
+                                       UploadId=self._upload_id, Body=part)
+        self._parts.append(future)
+        self._pending.append(future)
+
+    def close(self):
+        """
+        Uploading the remaining content and completing the upload
+        """
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self._request('put_object', Key=self.key, Body=bytes(self._buffer))
+            else:
+                if self._buffer:
+                    self._upload_part(bytes(self._buffer))
+                parts = [{'ETag': future.result()['ETag'], 'PartNumber': number}
+                         for number, future in enumerate(self._parts, start=1)]
+                self._request('complete_multipart_upload', Key=self.key,
+                              UploadId=self._upload_id, MultipartUpload={'Parts': parts})
+        except Exception:
+            self.abort()
+            raise
+        self._shutdown()
+
+    def abort(self):
+        """
+        Aborting the upload, the uploaded parts are removed
+        """
+        if self.closed:
+            return
+        self._shutdown()
+        if self._upload_id is not None:
+            self._request('abort_multipart_upload', Key=self.key,
+                          UploadId=self._upload_id)
+
+    def _shutdown(self):
+        """
+        Releasing the buffer and the upload threads
+        """
+        self.closed = True
+        self._buffer = bytearray()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
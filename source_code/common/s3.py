@@ -3,22 +3,92 @@
 import os
 import logging
 import sys
+import threading
+from functools import partial
+from typing import NamedTuple
 sys.path.append("/Users/pashkrof/surfdrive_general/DITTLAB/Courses/Data pipeline/production-ready ETL/venv/xetra/source_code/common")
-from io import StringIO, BytesIO
+from io import BytesIO
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from pyarrow import parquet as pq
+from cache import LocalObjectCache
+from inventory import S3Inventory
 from custom_exceptions import WrongFormatException
 from constants import S3FileTypes
+from metrics import MetricsSink, StageMetrics
+from multipart import S3MultipartWriter
 
+# Counters of the requests and transferred bytes of a connector
+_COUNTERS = ('s3_requests', 'bytes_read', 'bytes_written')
+# Number of rows serialized at once by write_df_s3, one parquet row group
+_WRITE_CHUNK_ROWS = 100000
+# Shared s3 clients per endpoint, credentials and client configuration
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
 
 
+class S3ClientConfig(NamedTuple):
+    """
+    Class for the configuration of the shared s3 clients
+
+    max_pool_connections: maximum number of pooled HTTP connections of a client
+    retry_mode: botocore retry mode, 'legacy', 'standard' or 'adaptive'
+    max_attempts: maximum number of attempts of a request, including the first one
+    connect_timeout: timeout in seconds for establishing a connection
+    read_timeout: timeout in seconds for reading from a connection
+    """
+    max_pool_connections: int = 50
+    retry_mode: str = 'standard'
+    max_attempts: int = 5
+    connect_timeout: float = 10
+    read_timeout: float = 60
+
+
+def shared_s3_client(access_key_id: str, secret_access_key: str, endpoint_url: str,
+                     client_config: S3ClientConfig = S3ClientConfig()):
+    """
+    Returning the s3 client of an endpoint and credential pair, created on first use.
+    boto3 clients are thread safe, all connectors with the same endpoint and
+    credentials share one client and its pool of HTTP connections.
+
+    Args:
+        access_key_id (str): access key id
+        secret_access_key (str): secret access key
+        endpoint_url (str): endpoint url for s3
+        client_config (S3ClientConfig, optional): pool size, retries and timeouts
+
+    Returns:
+        s3_client: boto3 s3 client
+    """
+    client_key = (endpoint_url, access_key_id, secret_access_key, client_config)
+    with _CLIENTS_LOCK:
+        if client_key not in _CLIENTS:
+            session = boto3.Session(aws_access_key_id=access_key_id,
+                                    aws_secret_access_key=secret_access_key)
+            _CLIENTS[client_key] = session.client(
+                service_name='s3', endpoint_url=endpoint_url,
+                config=Config(max_pool_connections=client_config.max_pool_connections,
+                              retries={'mode': client_config.retry_mode,
+                                       'max_attempts': client_config.max_attempts},
+                              connect_timeout=client_config.connect_timeout,
+                              read_timeout=client_config.read_timeout))
+        return _CLIENTS[client_key]
+
 
 class S3BucketConnector():
     """
     Class for interacting with s3 buckets
     """
 
-    def __init__(self, access_key: str, secret_key: str, endpoint_url: str, bucket: str):
+    def __init__(self, access_key: str, secret_key: str, endpoint_url: str, bucket: str,
+                 cache: LocalObjectCache = None, metrics: MetricsSink = None,
+                 part_size_mb: int = 8, max_part_concurrency: int = 4,
+                 client_config: S3ClientConfig = S3ClientConfig(),
+                 inventory: S3Inventory = None):
         """
         Constructor for S3BucketConnector
 
@@ -27,17 +97,128 @@ class S3BucketConnector():
             secret_key (str): secret key for accessing s3
             endpoint_url (str): endpoint url for s3
             bucket (str): s3 bucket name
+            cache (LocalObjectCache, optional): local cache of the parsed csv files
+            metrics (MetricsSink, optional): sink for the metrics of every request
+            part_size_mb (int, optional): part size of the multipart uploads in MB, files
+                                          smaller than one part are uploaded at once
+            max_part_concurrency (int, optional): parts of a multipart upload that are
+                                                  uploaded at the same time
+            client_config (S3ClientConfig, optional): pool size, retries and timeouts of the
+                                                      shared s3 client
+            inventory (S3Inventory, optional): local inventory of the completely listed
+                                               prefixes, used by list_objects_in_prefixes
         """
         self._logger = logging.getLogger(__name__)
         self.endpoint_url = endpoint_url
-        self.session = boto3.Session(aws_access_key_id=os.environ[access_key],
-                                     aws_secret_access_key=os.environ[secret_key])
         self.secret_key = secret_key
-        self._s3 = self.session.resource(service_name='s3', endpoint_url=endpoint_url)
-        self._bucket = self._s3.Bucket(bucket)
-        self.s3_client = boto3.client('s3', region_name='eu-north-1', endpoint_url=endpoint_url)
-    
+        self.bucket = bucket
+        self.s3_client = shared_s3_client(os.environ[access_key], os.environ[secret_key],
+                                          endpoint_url, client_config)
+        self.cache = cache
+        self.inventory = inventory
+        self.part_size = part_size_mb * 1024 ** 2
+        self.max_part_concurrency = max_part_concurrency
+        # ETags of the listed objects, used as cache keys without extra requests
+        self._etags = {}
+        self.metrics = metrics if metrics is not None else MetricsSink()
+        # Counters of s3 requests and bytes, in total and per thread
+        self._counters = dict.fromkeys(_COUNTERS, 0)
+        self._counters_lock = threading.Lock()
+        self._thread_local = threading.local()
+
+    def _add_counter(self, name: str, value: int, thread_counters: dict = None):
+        """
+        Adding a value to the total and thread counter
+
+        :param name: name of the counter
+        :param value: value that is added
+        :param thread_counters: counters of the thread the value is counted for,
+                                the counters of the current thread if None
+        """
+        if thread_counters is None:
+            thread_counters = self._thread_counters()
+        with self._counters_lock:
+            self._counters[name] += value
+            thread_counters[name] += value
+
+    def _request(self, operation: str, thread_counters: dict = None, **kwargs):
+        """
+        Sending one request with the s3 client and counting it
+
+        :param operation: name of the client method, e.g. 'get_object'
+        :param thread_counters: counters of the thread the request is counted for,
+                                the counters of the current thread if None
+        :param kwargs: parameters of the request, the bucket is added
+
+        returns:
+          response: response of the request
+        """
+        self._add_counter('s3_requests', 1, thread_counters)
+        return getattr(self.s3_client, operation)(Bucket=self.bucket, **kwargs)
 
+    def _caller_request(self):
+        """
+        Request function counting for the current thread, also when it is called
+        from other threads like the part uploads of S3MultipartWriter
+
+        returns:
+          request: function with the parameters of _request
+        """
+        return partial(self._request, thread_counters=self._thread_counters())
+
+    def _list_objects(self, prefix: str, start_after: str = None):
+        """
+        Listing all objects with a prefix, page by page
+
+        :param prefix: prefix on the S3 bucket that should be filtered with
+        :param start_after: lists only the keys after start_after
+
+        returns:
+          objects: generator of the object descriptions with Key, ETag and Size
+        """
+        kwargs = {'Prefix': prefix}
+        if start_after:
+            kwargs['StartAfter'] = start_after
+        while True:
+            response = self._request('list_objects_v2', **kwargs)
+            yield from response.get('Contents', [])
+            if not response.get('IsTruncated'):
+                return
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+    def counters(self):
+        """
+        Total number of s3 requests, bytes read and bytes written by this connector
+
+        returns:
+          counters: dictionary with the counter values
+        """
+        with self._counters_lock:
+            return dict(self._counters)
+
+    def _thread_counters(self):
+        """
+        Counters of the current thread, used for the metrics of one request
+
+        returns:
+          counters: dictionary with the counter values
+        """
+        if not hasattr(self._thread_local, 'counters'):
+            self._thread_local.counters = dict.fromkeys(_COUNTERS, 0)
+        return self._thread_local.counters
+
+    def _get_object(self, key: str):
+        """
+        Downloading the content of an object
+
+        :param key: key of the object
+
+        returns:
+          content: bytes of the object
+        """
+        content = self._request('get_object', Key=key)['Body'].read()
+        self._add_counter('bytes_read', len(content))
+        return content
 
     def list_files_in_prefix(self, prefix: str):
         """
@@ -48,11 +229,90 @@ class S3BucketConnector():
         returns:
           files: list of all the file names containing the prefix in the key
         """
-        files = [obj.key for obj in self._bucket.objects.filter(Prefix=prefix)]
+        with StageMetrics(self.metrics, 'list_files_in_prefix', self._thread_counters,
+                          bucket=self.bucket, prefix=prefix) as metrics:
+            files = []
+            for obj in self._list_objects(prefix):
+                self._etags[obj['Key']] = obj['ETag']
+                files.append(obj['Key'])
+            metrics.record(files=len(files))
         return files
+
+    def list_objects_in_prefixes(self, prefixes: list, complete_until: str = None,
+                                 refresh: bool = False):
+        """
+        listing the objects of several prefixes with one range scan from the first
+        to the last prefix instead of one listing per prefix. Prefixes in the
+        inventory are not listed again.
+
+        :param prefixes: prefixes of the same length, e.g. dates 'YYYY-MM-DD'
+        :param complete_until: prefixes up to complete_until do not get new objects
+                               anymore and are added to the inventory
+        :param refresh: lists all prefixes again, e.g. to detect late or corrected
+                        objects, and replaces them in the inventory
+
+        returns:
+          objects: dictionary with the list of objects (Key, ETag, Size) per prefix
+        """
+        objects = {}
+        missing = []
+        for prefix in sorted(set(prefixes)):
+            inventory_objects = self.inventory.objects(self.bucket, prefix)\
+                if self.inventory is not None and not refresh else None
+            if inventory_objects is None:
+                missing.append(prefix)
+            else:
+                objects[prefix] = inventory_objects
+        if missing:
+            with StageMetrics(self.metrics, 'list_objects_in_prefixes', self._thread_counters,
+                              bucket=self.bucket, first_prefix=missing[0],
+                              last_prefix=missing[-1]) as metrics:
+                prefix_length = len(missing[0])
+                listed = {prefix: [] for prefix in missing}
+                # Every key below a prefix sorts after the prefix itself
+                for obj in self._list_objects('', start_after=missing[0]):
+                    prefix = obj['Key'][:prefix_length]
+                    if prefix > missing[-1]:
+                        break
+                    if prefix in listed:
+                        listed[prefix].append({'Key': obj['Key'], 'ETag': obj['ETag'],
+                                               'Size': obj['Size']})
+                metrics.record(files=sum(len(listed_objects)
+                                         for listed_objects in listed.values()))
+            objects.update(listed)
+            if self.inventory is not None and complete_until is not None:
+                complete = [prefix for prefix in missing if prefix <= complete_until]
+                self.inventory.update(self.bucket, complete, [
+                    obj for prefix in complete for obj in listed[prefix]])
+        for prefix_objects in objects.values():
+            for obj in prefix_objects:
+                self._etags[obj['Key']] = obj['ETag']
+        return objects
+
+    def _etag(self, key: str):
+        """
+        ETag of an object, known from listing or requested from s3
+
+        :param key: key of the object
+
+        returns:
+          etag: ETag of the object
+        """
+        if key not in self._etags:
+            try:
+                self._etags[key] = self._request('head_object', Key=key)['ETag']
+            except ClientError as error:
+                # head_object has no body for the error code, a missing key is a plain 404
+                if error.response['Error']['Code'] not in ('404', 'NoSuchKey'):
+                    raise
+                raise self.s3_client.exceptions.NoSuchKey(
+                    {'Error': {'Code': 'NoSuchKey', 'Message': f'The key {key} does not exist.'}},
+                    'HeadObject') from error
+        return self._etags[key]
     
 
-    def read_csv_to_df(self, key: str, decoding: str = 'utf-8', sep: str = ','):
+    def read_csv_to_df(self, key: str, decoding: str = 'utf-8', sep: str = ',',
+                       columns: list = None, dtype: dict = None):
         """
         Reading a CSv file from the S3 bucket and returning a dataframe
 
@@ -60,17 +320,129 @@ class S3BucketConnector():
             key (str): key of the file that shoudl be read
             decoding (str, optional): encoding of the data inside the csv file
             sep (str, optional): separator of the csv file
+            columns (list, optional): columns that should be read, all columns if None
+            dtype (dict, optional): data types per column, inferred by pandas if None
             
         Returns:
             df: Pandas DateaFrame containing the data of the csv file
         """
-        self._logger.info('Reading file %s/%s/%s', self.endpoint_url, self._bucket.name, key)
-        csv_obj = self._bucket.Object(key=key).get().get('Body').read().decode(decoding)
-        data = StringIO(csv_obj)
-        data_frame = pd.read_csv(data, sep=sep)
+        with StageMetrics(self.metrics, 'read_csv_to_df', self._thread_counters,
+                          bucket=self.bucket, key=key) as metrics:
+            if self.cache is not None:
+                etag = self._etag(key)
+                variant = f'read_csv_to_df|{decoding}|{sep}|{columns}|{dtype}'
+                table = self.cache.get_table(self.bucket, key, etag, variant)
+                if table is not None:
+                    metrics.record(cache_hit=True, rows_out=table.num_rows)
+                    return table.to_pandas()
+            self._logger.info('Reading file %s/%s/%s', self.endpoint_url, self.bucket, key)
+            # Parsing the raw bytes, pandas decodes while parsing
+            csv_obj = self._get_object(key)
+            data = BytesIO(csv_obj)
+            data_frame = pd.read_csv(data, sep=sep, encoding=decoding, usecols=columns, dtype=dtype)
+            if self.cache is not None:
+                self.cache.put_table(self.bucket, key, etag,
+                                     pa.Table.from_pandas(data_frame, preserve_index=False),
+                                     variant)
+            metrics.record(rows_out=len(data_frame))
         return data_frame
 
 
+    def read_csv_to_table(self, key: str, decoding: str = 'utf-8', sep: str = ',',
+                          columns: list = None, column_types: dict = None):
+        """
+        Reading a CSV file from the S3 bucket with the multithreaded Arrow CSV reader
+        and returning an Arrow table
+
+        Args:
+            key (str): key of the file that should be read
+            decoding (str, optional): encoding of the data inside the csv file
+            sep (str, optional): separator of the csv file
+            columns (list, optional): columns that should be read, all columns if None
+            column_types (dict, optional): Arrow data types per column, inferred if None
+
+        Returns:
+            table: Arrow table containing the data of the csv file
+        """
+        with StageMetrics(self.metrics, 'read_csv_to_table', self._thread_counters,
+                          bucket=self.bucket, key=key) as metrics:
+            if self.cache is not None:
+                etag = self._etag(key)
+                variant = f'read_csv_to_table|{decoding}|{sep}|{columns}|{column_types}'
+                table = self.cache.get_table(self.bucket, key, etag, variant)
+                if table is not None:
+                    metrics.record(cache_hit=True, rows_out=table.num_rows)
+                    return table
+            self._logger.info('Reading file %s/%s/%s', self.endpoint_url, self.bucket, key)
+            csv_obj = self._get_object(key)
+            table = pa_csv.read_csv(
+                BytesIO(csv_obj),
+                read_options=pa_csv.ReadOptions(use_threads=True, encoding=decoding),
+                parse_options=pa_csv.ParseOptions(delimiter=sep),
+                convert_options=pa_csv.ConvertOptions(include_columns=columns,
+                                                      column_types=column_types))
+            if self.cache is not None:
+                self.cache.put_table(self.bucket, key, etag, table, variant)
+            metrics.record(rows_out=table.num_rows)
+        return table
+
+
+    def read_parquet_to_df(self, key: str, columns: list = None):
+        """
+        Reading a parquet file from the S3 bucket and returning a dataframe
+
+        Args:
+            key (str): key of the file that should be read
+            columns (list, optional): columns that should be read, all columns if None
+
+        Returns:
+            df: Pandas DataFrame containing the data of the parquet file
+        """
+        with StageMetrics(self.metrics, 'read_parquet_to_df', self._thread_counters,
+                          bucket=self.bucket, key=key) as metrics:
+            self._logger.info('Reading file %s/%s/%s', self.endpoint_url, self.bucket, key)
+            parquet_obj = self._get_object(key)
+            data_frame = pd.read_parquet(BytesIO(parquet_obj), columns=columns)
+            metrics.record(rows_out=len(data_frame))
+        return data_frame
+
+    def read_parquet_to_table(self, key: str, columns: list = None, filters=None):
+        """
+        Reading a parquet file from the S3 bucket and returning an Arrow table
+
+        Args:
+            key (str): key of the file that should be read
+            columns (list, optional): columns that should be read, all columns if None
+            filters (optional): pyarrow filter expression or list of tuples, row groups
+                                are skipped by their statistics before decoding
+
+        Returns:
+            table: Arrow table containing the data of the parquet file
+        """
+        with StageMetrics(self.metrics, 'read_parquet_to_table', self._thread_counters,
+                          bucket=self.bucket, key=key) as metrics:
+            self._logger.info('Reading file %s/%s/%s', self.endpoint_url, self.bucket, key)
+            parquet_obj = self._get_object(key)
+            table = pq.read_table(BytesIO(parquet_obj), columns=columns, filters=filters)
+            metrics.record(rows_out=table.num_rows)
+        return table
+
+    def delete_files(self, keys: list):
+        """
+        Deleting files from the S3 bucket
+
+        Args:
+            keys (list): keys of the files that should be deleted
+        """
+        # delete_objects accepts up to 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            self._request('delete_objects', Delete={
+                'Objects': [{'Key': key} for key in keys[start:start + 1000]]})
+        self._logger.info('Deleted %s files from %s/%s', len(keys), self.endpoint_url,
+                          self.bucket)
+        return True
+
+
     def write_df_s3(self, df: pd.DataFrame, key: str, file_format: str):
         """
         Write a dataframe to the S3 bucket
@@ -85,18 +457,67 @@ class S3BucketConnector():
             self._logger.info('The dataframe is empty! No file will be written.')
             return None
             
-        self._logger.info(f'Writing file {self.endpoint_url}, {self._bucket.name}, {key}')
-        if file_format == S3FileTypes.PARQUET.value:
-            out_buffer = BytesIO()
-            df.to_parquet(out_buffer, index=False)
-            self._bucket.put_object(Body=out_buffer.getvalue(), Key=key)
-            return True
-        elif file_format == S3FileTypes.CSV.value:
-            out_buffer = StringIO()
-            df.to_csv(out_buffer, index=False)
-            self._bucket.put_object(Body=out_buffer.getvalue(), Key=key)
-            return True
-        else: 
+        self._logger.info(f'Writing file {self.endpoint_url}, {self.bucket}, {key}')
+        if file_format not in (S3FileTypes.PARQUET.value, S3FileTypes.CSV.value):
             self._logger.info(f'The file type {file_format} is not supported!')
             raise WrongFormatException
+        with StageMetrics(self.metrics, 'write_df_s3', self._thread_counters,
+                          bucket=self.bucket, key=key, rows_in=len(df)):
+            # Serializing chunk by chunk into the upload, the file is never
+            # completely in memory
+            with S3MultipartWriter(self._caller_request(), key, self.part_size,
+                                   self.max_part_concurrency) as writer:
+                if file_format == S3FileTypes.PARQUET.value:
+                    self._write_parquet_chunks(df, writer)
+                else:
+                    self._write_csv_chunks(df, writer)
+            self._add_counter('bytes_written', writer.bytes_written)
+        return True
+
+    def write_table_s3(self, table: pa.Table, key: str, row_group_size: int = None):
+        """
+        Write an Arrow table as parquet file with row group statistics to the S3 bucket
+
+        Args:
+            table (pa.Table): Arrow table
+            key (str): target key
+            row_group_size (int, optional): maximum number of rows per row group
+        """
+        self._logger.info(f'Writing file {self.endpoint_url}, {self.bucket}, {key}')
+        with StageMetrics(self.metrics, 'write_table_s3', self._thread_counters,
+                          bucket=self.bucket, key=key, rows_in=table.num_rows):
+            with S3MultipartWriter(self._caller_request(), key, self.part_size,
+                                   self.max_part_concurrency) as writer:
+                pq.write_table(table, writer, row_group_size=row_group_size)
+            self._add_counter('bytes_written', writer.bytes_written)
+        return True
+
+    @staticmethod
+    def _write_parquet_chunks(df: pd.DataFrame, writer):
+        """
+        Writing a dataframe as parquet file with one row group per chunk
+
+        Args:
+            df (pd.DataFrame): dataframe
+            writer: writable file object
+        """
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        with pq.ParquetWriter(writer, schema) as parquet_writer:
+            for start in range(0, len(df), _WRITE_CHUNK_ROWS):
+                parquet_writer.write_table(pa.Table.from_pandas(
+                    df.iloc[start:start + _WRITE_CHUNK_ROWS], schema=schema,
+                    preserve_index=False))
+
+    @staticmethod
+    def _write_csv_chunks(df: pd.DataFrame, writer):
+        """
+        Writing a dataframe as utf-8 csv file chunk by chunk
+
+        Args:
+            df (pd.DataFrame): dataframe
+            writer: writable file object
+        """
+        for start in range(0, len(df), _WRITE_CHUNK_ROWS):
+            writer.write(df.iloc[start:start + _WRITE_CHUNK_ROWS]\
+                .to_csv(index=False, header=start == 0).encode('utf-8'))
         
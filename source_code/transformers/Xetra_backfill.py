@@ -0,0 +1,160 @@
+"""Xetra backfill of long date ranges in resumable batches"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from ..common.constants import MetaProcessFormat, TargetWriteModes
+from ..common.s3 import S3BucketConnector
+from ..common.meta_process import MetaProcess
+from ..common.metrics import MetricsSink
+from .Xetra_transformer import Xetra_ETL, XetraSourceConfig, XetraTargetConfig
+
+
+class XetraBackfillConfig(NamedTuple):
+    """
+    Class for backfill configuration data
+
+    bf_memory_budget_mb: memory in MB that all batches running at the same time may use
+    bf_memory_factor: estimated memory of the extracted data per byte of source file
+    bf_max_parallel_batches: number of batches that are processed at the same time,
+                             the batches run one after another with a last close file
+    """
+    bf_memory_budget_mb: int = 2048
+    bf_memory_factor: float = 4.0
+    bf_max_parallel_batches: int = 2
+
+
+class Xetra_Backfill():
+    """
+    Processes an arbitrary date range with the Xetra ETL job in batches. Every batch
+    is checkpointed in the meta file, a restarted backfill skips the processed dates.
+    """
+
+    def __init__(self, s3_bucket_src: S3BucketConnector, s3_bucket_trg: S3BucketConnector,
+                 meta_key: str, src_arg: XetraSourceConfig, trg_arg: XetraTargetConfig,
+                 backfill_arg: XetraBackfillConfig,
+                 meta_format: str = MetaProcessFormat.META_FILE_FORMAT.value,
+                 metrics: MetricsSink = None, last_close_key: str = None,
+                 manifest_key: str = None):
+        """
+        Constructor for Xetra_Backfill
+
+        Args:
+            s3_bucket_src (S3BucketConnector): connection to source s3 bucket
+            s3_bucket_trg (S3BucketConnector): connection to target s3 bucket
+            meta_key (str): key of meta file
+            src_arg (XetraSourceConfig): NamedTuple class with source config data
+            trg_arg (XetraTargetConfig): NamedTuple class with target config data
+            backfill_arg (XetraBackfillConfig): NamedTuple class with backfill config data
+            meta_format (str, optional): format of the meta file, 'csv' or 'parquet'
+            metrics (MetricsSink, optional): sink for the metrics of the ETL stages
+            last_close_key (str, optional): key of the file with the last prices per ISIN,
+                                            updated by every batch like by the ETL job,
+                                            the batches run in date order
+            manifest_key (str, optional): key of the file with the source files per processed
+                                          date, every batch records its dates
+        """
+        self._logger = logging.getLogger(__name__)
+        self.s3_bucket_src = s3_bucket_src
+        self.s3_bucket_trg = s3_bucket_trg
+        self.meta_key = meta_key
+        self.src_args = src_arg
+        self.trg_args = trg_arg
+        self.backfill_args = backfill_arg
+        self.meta_format = meta_format
+        self.metrics = metrics
+        self.last_close_key = last_close_key
+        self.manifest_key = manifest_key
+
+    @property
+    def parallel_batches(self):
+        """
+        Number of batches that are processed at the same time. With a last close file
+        every batch needs the last prices of the batch before, so one batch runs at a time.
+        """
+        if self.last_close_key:
+            return 1
+        return self.backfill_args.bf_max_parallel_batches
+
+    def plan_batches(self, start_date: str, end_date: str):
+        """
+        Splits the dates from start_date till end_date that are not processed yet
+        into batches of consecutive dates. A batch ends at a processed date or when
+        the estimated memory of its source files, including the day before the
+        batch, exceeds its share of the memory budget.
+
+        :param start_date: first date 'YYYY-MM-DD' of the backfill
+        :param end_date: last date 'YYYY-MM-DD' of the backfill
+
+        :returns:
+        batches: list of lists of dates 'YYYY-MM-DD'
+        """
+        date_format = MetaProcessFormat.META_DATE_FORMAT.value
+        start = datetime.strptime(start_date, date_format).date()
+        end = datetime.strptime(end_date, date_format).date()
+        # Including the day before start_date, extracted by the first batch
+        dates = [(start + timedelta(days=day)).strftime(date_format)
+                 for day in range(-1, (end - start).days + 1)]
+        processed = MetaProcess.return_processed_dates(self.meta_key, self.s3_bucket_trg,
+                                                       self.meta_format)
+        # One range scan over all dates, the past dates are kept in the inventory
+        yesterday = (datetime.today() - timedelta(days=1)).strftime(date_format)
+        objects = self.s3_bucket_src.list_objects_in_prefixes(dates, complete_until=yesterday)
+        sizes = {date: sum(obj['Size'] for obj in date_objects)
+                 for date, date_objects in objects.items()}
+        batch_budget = self.backfill_args.bf_memory_budget_mb * 1024 ** 2\
+            / self.parallel_batches
+        batches = []
+        batch = []
+        batch_size = 0
+        for previous_date, date in zip(dates, dates[1:]):
+            if date in processed:
+                if batch:
+                    batches.append(batch)
+                batch = []
+                continue
+            size = sizes[date] * self.backfill_args.bf_memory_factor
+            if batch and size and batch_size + size > batch_budget:
+                batches.append(batch)
+                batch = []
+            if not batch:
+                batch_size = sizes[previous_date] * self.backfill_args.bf_memory_factor
+            batch.append(date)
+            batch_size += size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _run_batch(self, batch: list):
+        """
+        Runs the Xetra ETL job for one batch, the meta file update at the end
+        of the job is the checkpoint of the batch
+
+        :param batch: list of consecutive dates 'YYYY-MM-DD'
+        """
+        trg_args = self.trg_args
+        if trg_args.trg_write_mode == TargetWriteModes.FULL.value:
+            # Batches running at the same time must not write to the same key
+            trg_args = trg_args._replace(trg_key=f'{trg_args.trg_key}{batch[0]}_{batch[-1]}_')
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_trg, self.meta_key,
+                              self.src_args, trg_args, last_close_key=self.last_close_key,
+                              meta_format=self.meta_format, metrics=self.metrics,
+                              extract_dates=batch, manifest_key=self.manifest_key)
+        xetra_etl.etl_report1()
+        self._logger.info('Xetra backfill batch %s - %s finished.', batch[0], batch[-1])
+
+    def backfill_report1(self, start_date: str, end_date: str):
+        """
+        Runs the Xetra ETL job for report 1 for all dates from start_date
+        till end_date that are not processed yet
+
+        :param start_date: first date 'YYYY-MM-DD' of the backfill
+        :param end_date: last date 'YYYY-MM-DD' of the backfill
+        """
+        batches = self.plan_batches(start_date, end_date)
+        self._logger.info('Xetra backfill of %s batches started.', len(batches))
+        with ThreadPoolExecutor(max_workers=self.parallel_batches) as executor:
+            # Raising the first exception, the finished batches are checkpointed
+            list(executor.map(self._run_batch, batches))
+        return True
@@ -1,11 +1,31 @@
 """Xetra ETL Component"""
+import asyncio
 import logging
-from typing import NamedTuple
+import multiprocessing
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import reduce
+from typing import Callable, NamedTuple
+import numpy as np
 import pandas as pd
-from datetime import datetime
+import pyarrow as pa
+from pyarrow import compute as pc
+from pyarrow import parquet as pq
+from datetime import datetime, timedelta
+from ..common.constants import CsvEngines, MetaProcessFormat, S3FileTypes, TargetWriteModes
 from ..common.s3 import S3BucketConnector
 from ..common.meta_process import MetaProcess
+from ..common.metrics import MetricsSink, StageMetrics
 
+# Helper columns of the partial report 1 aggregates
+_PARTIAL_OP_TIME = '_opening_time'
+_PARTIAL_CLOS_TIME = '_closing_time'
+# Number of partial aggregates that are combined at once
+_PARTIAL_MERGE_BATCH = 24
+# Rows per row group of the staged source dates
+_STAGE_ROW_GROUP_ROWS = 65536
 
 class XetraSourceConfig(NamedTuple):
     """
@@ -20,6 +40,29 @@ class XetraSourceConfig(NamedTuple):
     src_col_min_price: column name for minimum price in source
     src_col_max_price: column name for maximum price in source
     src_col_traded_vol: column name for traded volumne in source
+    src_max_concurrency: maximum number of S3 requests in flight during extraction,
+                         1 means the source files are read one after another. With an
+                         async source connector it limits the concurrent GETs of the
+                         event loop, so it can be in the hundreds
+    src_streaming: reduces every source file to partial aggregates while extracting
+                   instead of concatenating the whole extraction window first
+    src_typed_read: reads only src_columns from the source files, with categorical
+                    text columns and src_price_dtype prices
+    src_price_dtype: data type of the price columns for src_typed_read, 'float32'
+                     halves their memory at the cost of precision
+    src_engine: engine reading the source files, 'pandas' or 'arrow'. The arrow engine
+                reads src_columns with the multithreaded Arrow CSV reader and converts
+                the concatenated tables to pandas once
+    src_transform_workers: number of processes transforming report 1, more than 1 shards
+                           the source data by ISIN hash and transforms the shards in parallel
+    src_stage_key: basic key of the raw staging in the target bucket. If set, every past
+                   source date is converted once to <src_stage_key><date>/part.parquet with
+                   src_columns sorted by ISIN and time, and read from there afterwards
+    src_stage_dir: local directory of the raw staging, used instead of src_stage_key
+    src_col_end_price: column name for end price in source, the closing price of report 1
+                       and the bars report. The last starting price is used if None
+    src_arrow_native: etl_report1 reads, transforms and writes report 1 as Arrow tables
+                      with Arrow compute, without converting the source data to pandas
     """
     src_first_extract_date: str
     src_columns: list
@@ -30,6 +73,16 @@ class XetraSourceConfig(NamedTuple):
     src_col_min_price: str
     src_col_max_price: str
     src_col_traded_vol: str
+    src_max_concurrency: int = 1
+    src_streaming: bool = False
+    src_typed_read: bool = False
+    src_price_dtype: str = 'float64'
+    src_engine: str = CsvEngines.PANDAS.value
+    src_transform_workers: int = 1
+    src_stage_key: str = None
+    src_stage_dir: str = None
+    src_col_end_price: str = None
+    src_arrow_native: bool = False
 
 
 class XetraTargetConfig(NamedTuple):
@@ -47,6 +100,9 @@ class XetraTargetConfig(NamedTuple):
     trg_key: basic key of target file
     trg_key_date_format: date format of target file key
     trg_format: file format of the target file
+    trg_write_mode: 'full' writes one file with all dates to trg_key, 'partitioned' writes
+                    one file per trade date to <trg_partition_key><date>/part.<trg_format>
+    trg_partition_key: basic key of the partitions of the partitioned write mode
     """
     trg_col_isin: str
     trg_col_date: str
@@ -59,14 +115,192 @@ class XetraTargetConfig(NamedTuple):
     trg_key: str
     trg_key_date_format: str
     trg_format: str
-    
+    trg_write_mode: str = TargetWriteModes.FULL.value
+    trg_partition_key: str = 'report1/date='
+
+
+class XetraBarsConfig(NamedTuple):
+    """
+    Class for the configuration of the OHLCV bars report, the ISIN and date
+    columns keep their source names like in report 1
+
+    bars_interval_minutes: length of the bars in minutes, e.g. 5, 15 or 60. Every bar
+                           starts at a multiple of the length after midnight
+    bars_col_time: column name for the starting time of the bar in target
+    bars_col_op_price: column name for opening price in target
+    bars_col_max_price: column name for maximum price in target
+    bars_col_min_price: column name for minimum price in target
+    bars_col_clos_price: column name for closing price in target
+    bars_col_trad_vol: column name for traded volume in target
+    bars_trg_key: basic key of target file
+    bars_trg_partition_key: basic key of the partitions of the partitioned write mode
+    """
+    bars_interval_minutes: int = 60
+    bars_col_time: str = 'bar_start'
+    bars_col_op_price: str = 'opening_price_eur'
+    bars_col_max_price: str = 'maximum_price_eur'
+    bars_col_min_price: str = 'minimum_price_eur'
+    bars_col_clos_price: str = 'closing_price_eur'
+    bars_col_trad_vol: str = 'traded_volume'
+    bars_trg_key: str = 'bars/xetra_bars_'
+    bars_trg_partition_key: str = 'bars/date='
+
+
+
+def _concat_frames(frames: list):
+    """
+    Concatenates DataFrames to one DataFrame. Categorical columns get the union of
+    the categories of all frames first, so they stay categorical after concatenating.
+
+    :param frames: list of Pandas DataFrames with the same columns
+
+    :returns:
+    data_frame: concatenated Pandas DataFrame
+    """
+    for column, dtype in frames[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = reduce(lambda left, right: left.union(right),
+                                [frame[column].cat.categories for frame in frames])
+            frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)})\
+                for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _table_to_frame(table: pa.Table):
+    """
+    Converts an Arrow table to a DataFrame. Dictionary columns become categorical
+    columns with sorted categories, like the categorical columns read by pandas.
+
+    :param table: Arrow table
+
+    :returns:
+    data_frame: Pandas DataFrame
+    """
+    data_frame = table.to_pandas()
+    for column, dtype in data_frame.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            data_frame[column] = data_frame[column].cat\
+                .reorder_categories(dtype.categories.sort_values())
+    return data_frame
+
+
+def _sorted_codes(series: pd.Series):
+    """
+    Integer codes of the values of a Series in the sort order of the values.
+    Categorical Series are coded from their categories without comparing the rows.
+
+    :param series: Pandas Series without missing values
+
+    :returns:
+    codes: NumPy array with the code per row
+    uniques: sorted unique values, uniques[codes] are the values of the rows
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        order = categories.argsort()
+        ranks = np.empty(len(order), dtype='int64')
+        ranks[order] = np.arange(len(order))
+        return ranks[series.cat.codes.to_numpy()], categories[order]
+    return pd.factorize(series, sort=True)
+
+
+def _sorted_codes_arrow(column: pa.ChunkedArray):
+    """
+    Integer codes of the values of an Arrow column in the sort order of the values,
+    the distinct values are ranked instead of comparing the rows
+
+    :param column: Arrow column without nulls
+
+    :returns:
+    codes: NumPy array with the code per row
+    """
+    encoded = pc.dictionary_encode(column).combine_chunks()
+    ranks = pc.rank(encoded.dictionary, sort_keys='ascending', tiebreaker='dense')
+    # The ranks are unsigned, mixed with signed integers NumPy would promote them to float
+    return ranks.to_numpy().astype('int64')[encoded.indices.to_numpy()] - 1
+
+
+def _stable_order(keys: list):
+    """
+    Order of the rows sorted by several integer keys, with one stable sort per key
+    from the least to the most significant key. Keys below 65536 are sorted as
+    16 bit integers, which NumPy sorts with a radix sort in linear time.
+
+    :param keys: list of NumPy arrays with non-negative integer keys, most significant first
+
+    :returns:
+    order: NumPy array with the row positions in sorted order
+    """
+    order = None
+    for key in reversed(keys):
+        if order is not None:
+            key = key[order]
+        key = key.astype('uint16') if key.max(initial=0) < 2 ** 16 else key
+        key_order = np.argsort(key, kind='stable')
+        order = key_order if order is None else order[key_order]
+    return order
+
+
+def _transform_report1_shard(xetra_etl, path: str):
+    """
+    Transforms one shard of the source data in a worker process. The shard
+    is memory-mapped from an Arrow IPC file instead of being pickled.
+
+    :param xetra_etl: Xetra_ETL instance without S3 connections
+    :param path: path of the Arrow IPC file with the shard
+
+    :returns:
+    data_frame: Transformed Pandas DataFrame of the ISINs of the shard
+    """
+    with pa.memory_map(path) as source:
+        data_frame = _table_to_frame(pa.ipc.open_file(source).read_all())
+    return xetra_etl._finalize_report1(xetra_etl._aggregate_report1(data_frame))
+
+
+class XetraExtractPlan(NamedTuple):
+    """
+    Class for the dates of one run of the Xetra ETL job
+
+    extract_date: first date of the report 'YYYY-MM-DD', the dates before it
+                  are only extracted for the previous closing price
+    extract_date_list: dates 'YYYY-MM-DD' whose source files are extracted
+    meta_update_list: dates written to the meta file after loading
+    changed_dates: processed dates whose source files changed, staged again
+    """
+    extract_date: str
+    extract_date_list: list
+    meta_update_list: list
+    changed_dates: list = []
+
+
+class XetraReport(NamedTuple):
+    """
+    Class for a report created from the extracted source data
+
+    name: name of the report, unique per Xetra_ETL instance
+    columns: source columns the transformation needs, a subset of src_columns
+    transform: function creating the report from the extracted Pandas DataFrame,
+               which may have more columns and must not be modified
+    load: function saving the report
+    """
+    name: str
+    columns: list
+    transform: Callable
+    load: Callable
+
+
 class Xetra_ETL():
     """
     Read the Xetra data, transform, and writes the transformed to the target
     """
     
     def __init__(self, s3_bucket_src: S3BucketConnector, s3_bucket_trg: S3BucketConnector,
-                 meta_key: str, src_arg: XetraSourceConfig, trg_arg: XetraTargetConfig):
+                 meta_key: str, src_arg: XetraSourceConfig, trg_arg: XetraTargetConfig,
+                 last_close_key: str = None,
+                 meta_format: str = MetaProcessFormat.META_FILE_FORMAT.value,
+                 metrics: MetricsSink = None, extract_dates: list = None,
+                 manifest_key: str = None, s3_bucket_src_async=None,
+                 change_lookback_days: int = 7, dry_run: bool = False):
         """
         Constructor for the XetraTransformer
 
@@ -76,28 +310,204 @@ class Xetra_ETL():
             meta_key (str): key of meta file
             src_arg (XetraSourceConfig): NamedTuple class with source config data
             trg_arg (XetraTargetConfig): NamedTuple class with target config data
+            last_close_key (str, optional): key of the file with the last prices per ISIN,
+                                            carried forward from run to run
+            meta_format (str, optional): format of the meta file, 'csv' or 'parquet'
+            metrics (MetricsSink, optional): sink for the metrics of the ETL stages
+            extract_dates (list, optional): consecutive dates 'YYYY-MM-DD' that are processed
+                                            instead of the dates derived from the meta file,
+                                            used by the backfill batches
+            manifest_key (str, optional): key of the file with the source files per processed
+                                          date, the dates whose source files changed since
+                                          are processed again
+            s3_bucket_src_async (AsyncS3BucketConnector, optional): asyncio connection to
+                                          the source s3 bucket, the pandas engine reads the
+                                          source files with it from a single thread
+            change_lookback_days (int, optional): days up to the latest date of the manifest
+                                                  whose source files are checked for changes
+            dry_run (bool, optional): only plans the dates, the change detection does not
+                                      update the inventory of the source connector
         """
         self._logger = logging.getLogger(__name__)
         self.s3_bucket_src = s3_bucket_src
+        self.s3_bucket_src_async = s3_bucket_src_async
         self.s3_bucket_trg = s3_bucket_trg
         self.meta_key = meta_key
         self.src_args = src_arg
         self.trg_args = trg_arg
-        self.extract_date, self.extract_date_list = MetaProcess.return_date_list(
-            self.src_args.src_first_extract_date, self.meta_key, self.s3_bucket_trg
-        )
+        self.last_close_key = last_close_key
+        self.meta_format = meta_format
+        self._last_close = None
+        self.metrics = metrics if metrics is not None else MetricsSink()
+        self._extract_dates = extract_dates
+        self.manifest_key = manifest_key
+        self.change_lookback_days = change_lookback_days
+        self.dry_run = dry_run
+        self._plan = None
+        self._source_objects = {}
+        self.reports = {}
 
+    @property
+    def plan(self):
+        """
+        Dates of this run, planned from the meta file on first use and reused
+        by extract, transform_report1 and load afterwards
 
-        # Convert string dates in self.extract_date_list to datetime.date objects
-        self.extract_date_list = [datetime.strptime(date_str, '%Y-%m-%d').date() for date_str in self.extract_date_list]
+        :returns:
+        plan: XetraExtractPlan
+        """
+        if self._plan is None:
+            self._plan = self._create_plan()
+        return self._plan
 
-        # Now, perform the comparison
-        self.meta_update_list = [date for date in self.extract_date_list if date >= self.extract_date]
-        self.extract_date, self.extract_date_list = MetaProcess.return_date_list(
-            self.src_args.src_first_extract_date, self.meta_key, self.s3_bucket_trg
-        )
+    @property
+    def extract_date(self):
+        """
+        First date of the report
+        """
+        return self.plan.extract_date
+
+    @property
+    def extract_date_list(self):
+        """
+        Dates whose source files are extracted
+        """
+        return self.plan.extract_date_list
+
+    @property
+    def meta_update_list(self):
+        """
+        Dates written to the meta file after loading
+        """
+        return self.plan.meta_update_list
+
+    def _create_plan(self):
+        """
+        Plans the dates of this run from the explicit extract_dates or
+        from the processed dates in the meta file, read once
+
+        :returns:
+        plan: XetraExtractPlan
+        """
+        date_format = MetaProcessFormat.META_DATE_FORMAT.value
+        if self._extract_dates is not None:
+            # The day before the first date is extracted for the previous closing price
+            meta_update_list = [datetime.strptime(date, date_format).date()
+                                for date in self._extract_dates]
+            return XetraExtractPlan(
+                extract_date=self._extract_dates[0],
+                extract_date_list=[
+                    (meta_update_list[0] - timedelta(days=1)).strftime(date_format),
+                    *self._extract_dates],
+                meta_update_list=meta_update_list)
+        with self._stage_metrics('meta_return_date_list', self.s3_bucket_trg):
+            extract_date, extract_date_list = MetaProcess.return_date_list(
+                self.src_args.src_first_extract_date, self.meta_key, self.s3_bucket_trg,
+                self.meta_format
+            )
+        # extract_date is a date object if there is no meta file yet
+        extract_date = str(extract_date)
+        manifest = {}
+        if self.manifest_key:
+            with self._stage_metrics('meta_return_manifest', self.s3_bucket_trg):
+                manifest = MetaProcess.return_manifest(self.manifest_key, self.s3_bucket_trg)
+        changed_dates = self._changed_dates(manifest) if manifest else []
+        if changed_dates:
+            # Processing again from the first changed date, the day after a changed
+            # date is included for its change to the previous closing price. The last
+            # close file only has the latest prices, so the previous trading day in the
+            # manifest is extracted again for the previous closing price.
+            first_date = datetime.strptime(changed_dates[0], date_format).date()
+            previous_dates = [date for date, files in manifest.items()
+                              if date < changed_dates[0] and files]
+            seed_date = datetime.strptime(max(previous_dates), date_format).date()\
+                if previous_dates else first_date - timedelta(days=1)
+            last_date = max([
+                datetime.strptime(changed_dates[-1], date_format).date() + timedelta(days=1),
+                *[datetime.strptime(date, date_format).date() for date in extract_date_list]])
+            extract_date = changed_dates[0]
+            extract_date_list = [(first_date + timedelta(days=day)).strftime(date_format)
+                                 for day in range((seed_date - first_date).days,
+                                                  (last_date - first_date).days + 1)]
+            self._logger.info('Xetra source files changed for %s, processing again from %s.',
+                              ', '.join(changed_dates), extract_date)
+        return XetraExtractPlan(
+            extract_date=extract_date,
+            extract_date_list=extract_date_list,
+            meta_update_list=[datetime.strptime(date, date_format).date()
+                              for date in extract_date_list if date >= extract_date],
+            changed_dates=changed_dates)
+
+    def _changed_dates(self, manifest: dict):
+        """
+        Compares the source files of the last change_lookback_days dates in the
+        manifest with the source bucket, the dates are listed again with one range scan
+
+        :param manifest: source files per processed date, see MetaProcess.return_manifest
+
+        :returns:
+        changed_dates: sorted list of the processed dates 'YYYY-MM-DD' whose
+                       keys, ETags or sizes of the source files changed
+        """
+        with self._stage_metrics('meta_change_detection', self.s3_bucket_src) as metrics:
+            date_format = MetaProcessFormat.META_DATE_FORMAT.value
+            # Corrections are expected for the recent dates only
+            first_date = (datetime.strptime(max(manifest), date_format).date()
+                          - timedelta(days=self.change_lookback_days - 1)).strftime(date_format)
+            dates = sorted(date for date in manifest
+                           if date >= max(first_date, self.src_args.src_first_extract_date))
+            if not dates:
+                return []
+            yesterday = (datetime.today() - timedelta(days=1)).strftime(date_format)
+            # The listing replaces the dates in the inventory, except for a dry run
+            objects = self.s3_bucket_src.list_objects_in_prefixes(
+                dates, complete_until=None if self.dry_run else yesterday, refresh=True)
+            changed_dates = [
+                date for date in dates
+                if {(obj['Key'], obj['ETag'], obj['Size']) for obj in objects[date]}
+                != manifest[date]]
+            metrics.record(dates=len(dates), changed_dates=len(changed_dates))
+        return changed_dates
+
+    def __getstate__(self):
+        """
+        State for pickling the instance to the transform worker processes,
+        without the S3 connections, the metrics sink and the registered reports
+        """
+        # The workers can not read the meta file
+        self.plan
+        state = self.__dict__.copy()
+        # The reports may hold functions that can not be pickled, e.g. lambdas
+        state.update(s3_bucket_src=None, s3_bucket_src_async=None, s3_bucket_trg=None,
+                     metrics=MetricsSink(), reports={})
+        return state
+
+    def _stage_metrics(self, stage: str, s3_bucket: S3BucketConnector = None, **fields):
+        """
+        Measures one stage of the ETL job
+
+        :param stage: name of the stage
+        :param s3_bucket: connector whose s3 requests and bytes are counted during the stage
+        :param fields: additional values of the metrics record
+
+        :returns:
+        metrics: StageMetrics context manager
+        """
+        counters = getattr(s3_bucket, 'counters', None)
+        return StageMetrics(self.metrics, stage, counters, **fields)
+
+    @property
+    def extract_columns(self):
+        """
+        Source columns read by the typed and arrow extraction: the union of
+        the columns of the registered reports in src_columns order, or
+        src_columns if no report is registered
+        """
+        if not self.reports:
+            return self.src_args.src_columns
+        columns = {column for report in self.reports.values() for column in report.columns}
+        return [column for column in self.src_args.src_columns if column in columns]
 
-        
     def extract(self):
         """
         Read the source data and concatenates them to one Pandas DataFrame
@@ -106,21 +516,315 @@ class Xetra_ETL():
         data_frame: Pandas DataFrame with the extracted data
         """
         self._logger.info('Extracting Xetra source files started...')
-        files = [key for date in self.extract_date_list\
-                    for key in self.s3_bucket_src.list_files_in_prefix(date)]
-        if not files:
-            data_frame = pd.DataFrame()
-        else:
-            data_frame = pd.concat([self.s3_bucket_src.read_csv_to_df(file)\
-                for file in files], ignore_index=True)
+        with self._stage_metrics('extract', self.s3_bucket_src) as metrics:
+            if self.src_args.src_engine == CsvEngines.ARROW.value:
+                tables = list(self._iter_source_files(self._read_source_table, as_table=True))
+                if not tables:
+                    data_frame = pd.DataFrame()
+                else:
+                    # Concatenating keeps the chunks of the tables without copying
+                    data_frame = _table_to_frame(
+                        pa.concat_tables(tables, promote_options='permissive'))
+            else:
+                frames = list(self._iter_source_frames())
+                if not frames:
+                    data_frame = pd.DataFrame()
+                else:
+                    data_frame = _concat_frames(frames)
+            metrics.record(rows_out=len(data_frame))
         self._logger.info('Extracting Xetra source files finished.')
         return data_frame
-            
-    def transform_report1(self, data_frame: pd.DataFrame):
+
+    def _read_source_file(self, key: str):
+        """
+        Reads one source file, typed according to the source configuration
+        if src_typed_read is set
+
+        :param key: key of the source file
+
+        :returns:
+        data_frame: Pandas DataFrame with the data of the source file
+        """
+        if self.src_args.src_engine == CsvEngines.ARROW.value:
+            return _table_to_frame(self._read_source_table(key))
+        if not self.src_args.src_typed_read:
+            return self.s3_bucket_src.read_csv_to_df(key)
+        return self.s3_bucket_src.read_csv_to_df(key, columns=self.extract_columns,
+                                                 dtype=self._source_dtypes())
+
+    def _read_source_table(self, key: str):
+        """
+        Reads the extract_columns of one source file as Arrow table. Text columns are
+        dictionary encoded if src_typed_read is set, otherwise strings.
+
+        :param key: key of the source file
+
+        :returns:
+        table: Arrow table with the data of the source file
+        """
+        return self.s3_bucket_src.read_csv_to_table(
+            key, columns=self.extract_columns,
+            column_types=self._source_column_types(self.src_args.src_typed_read))
+
+    def _source_column_types(self, typed: bool):
+        """
+        Arrow types of the source columns, the traded volume is inferred
+
+        :param typed: dictionary encoded text columns and src_price_dtype prices
+                      instead of strings and float64 prices
+
+        :returns:
+        column_types: dictionary with the Arrow type per source column
+        """
+        column_types = {}
+        for column, dtype in self._source_dtypes().items():
+            if dtype == 'category':
+                column_types[column] = pa.dictionary(pa.int32(), pa.string())\
+                    if typed else pa.string()
+            else:
+                column_types[column] = pa.from_numpy_dtype(np.dtype(dtype))\
+                    if typed else pa.float64()
+        return column_types
+
+    def _source_dtypes(self):
+        """
+        Data types of the source columns for the typed read. Prices are read
+        as src_price_dtype, the traded volume is inferred and all other columns
+        (ISIN, Mnemonic, date, time) are categorical.
+
+        :returns:
+        dtypes: dictionary with the data type per source column
+        """
+        price_columns = [
+            self.src_args.src_col_start_price,
+            self.src_args.src_col_end_price,
+            self.src_args.src_col_min_price,
+            self.src_args.src_col_max_price]
+        dtypes = {}
+        for column in self.src_args.src_columns:
+            if column in price_columns:
+                dtypes[column] = self.src_args.src_price_dtype
+            elif column != self.src_args.src_col_traded_vol:
+                dtypes[column] = 'category'
+        return dtypes
+
+    def _iter_source_frames(self):
+        """
+        Yields the source files of the extraction window one DataFrame at a time,
+        in date and key order. With an async source connector the source files of
+        the pandas engine are read on an event loop, src_max_concurrency at a time.
+        """
+        if self.s3_bucket_src_async is None or self.src_args.src_stage_key\
+                or self.src_args.src_stage_dir\
+                or self.src_args.src_engine != CsvEngines.PANDAS.value:
+            yield from self._iter_source_files(self._read_source_file)
+            return
+        yield from self._iter_source_files_async(self._source_keys(self.extract_date_list))
+
+    def _iter_source_files(self, read_file, as_table: bool = False):
+        """
+        Yields the source files of the extraction window read by read_file,
+        in date and key order. With raw staging, every staged date is yielded
+        as one item instead of its source files.
+
+        The dates are listed with one range scan. With src_max_concurrency > 1 the
+        files are read on a thread pool, at most src_max_concurrency files ahead
+        of the consumer.
+
+        :param read_file: function reading one source file
+        :param as_table: read_file returns Arrow tables instead of DataFrames
+        """
+        if self.src_args.src_stage_key or self.src_args.src_stage_dir:
+            yield from self._iter_staged_dates(read_file, as_table)
+            return
+        keys = self._source_keys(self.extract_date_list)
+        if self.src_args.src_max_concurrency <= 1:
+            for key in keys:
+                yield read_file(key)
+            return
+        with ThreadPoolExecutor(max_workers=self.src_args.src_max_concurrency) as executor:
+            pending = deque()
+            for key in keys:
+                pending.append(executor.submit(read_file, key))
+                if len(pending) >= self.src_args.src_max_concurrency:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _iter_source_files_async(self, keys: list):
+        """
+        Yields the source files read with the async source connector in key order.
+        The reads run as tasks on one event loop, at most src_max_concurrency files
+        ahead of the consumer. The loop runs while the next DataFrame is awaited.
+
+        :param keys: keys of the source files
+        """
+        columns, dtype = None, None
+        if self.src_args.src_typed_read:
+            columns, dtype = self.extract_columns, self._source_dtypes()
+        loop = asyncio.new_event_loop()
+        pending = deque()
+        s3_bucket = loop.run_until_complete(self.s3_bucket_src_async.__aenter__())
+        try:
+            for key in keys:
+                pending.append(loop.create_task(
+                    s3_bucket.read_csv_to_df(key, columns=columns, dtype=dtype)))
+                if len(pending) >= self.src_args.src_max_concurrency:
+                    yield loop.run_until_complete(pending.popleft())
+            while pending:
+                yield loop.run_until_complete(pending.popleft())
+        finally:
+            # Cancelling the reads ahead if the consumer stopped early
+            if pending:
+                for task in pending:
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(self.s3_bucket_src_async.__aexit__(None, None, None))
+            loop.close()
+
+    def _source_keys(self, dates: list):
+        """
+        Lists the source files of dates in date and key order. The past dates
+        are complete and kept in the inventory of the source connector, if any.
+
+        :param dates: source dates 'YYYY-MM-DD'
+
+        :returns:
+        keys: list of the keys of the source files
+        """
+        date_format = MetaProcessFormat.META_DATE_FORMAT.value
+        yesterday = (datetime.today() - timedelta(days=1)).strftime(date_format)
+        objects = self.s3_bucket_src.list_objects_in_prefixes(dates, complete_until=yesterday)
+        # Recorded in the manifest with the processed dates
+        self._source_objects.update(objects)
+        return [obj['Key'] for date in sorted(objects) for obj in objects[date]]
+
+    def _iter_staged_dates(self, read_file, as_table: bool):
+        """
+        Yields the dates of the extraction window from the raw staging. Past dates
+        that are not staged yet are staged from their source files first, the
+        source files of today are read directly since they may still change.
+        At most src_max_concurrency dates are read ahead of the consumer.
+
+        :param read_file: function reading one source file
+        :param as_table: yields Arrow tables instead of DataFrames
+        """
+        today = datetime.today().strftime(MetaProcessFormat.META_DATE_FORMAT.value)
+        with ThreadPoolExecutor(max_workers=max(self.src_args.src_max_concurrency, 1))\
+                as executor:
+            pending = deque()
+            for date in self.extract_date_list:
+                if date >= today:
+                    # Draining the staged dates keeps the date order
+                    while pending:
+                        table = pending.popleft().result()
+                        if table.num_rows:
+                            yield self._convert_staged(table, as_table)
+                    for key in self._source_keys([date]):
+                        yield read_file(key)
+                    continue
+                pending.append(executor.submit(self._staged_table, date))
+                if len(pending) >= self.src_args.src_max_concurrency:
+                    table = pending.popleft().result()
+                    if table.num_rows:
+                        yield self._convert_staged(table, as_table)
+            while pending:
+                table = pending.popleft().result()
+                if table.num_rows:
+                    yield self._convert_staged(table, as_table)
+
+    def _staged_table(self, date: str):
+        """
+        Returns the staged source data of a date, staging it if needed
+
+        :param date: source date 'YYYY-MM-DD'
+
+        :returns:
+        table: Arrow table with src_columns, strings and float64 prices
+        """
+        # The staged data of changed dates is outdated
+        table = self.read_staged(date) if date not in self.plan.changed_dates else None
+        if table is not None:
+            return table
+        tables = [self.s3_bucket_src.read_csv_to_table(
+            key, columns=self.src_args.src_columns,
+            column_types=self._source_column_types(typed=False))
+                  for key in self._source_keys([date])]
+        if not tables:
+            # Nothing is staged for dates without trading
+            return pa.table({column: [] for column in self.src_args.src_columns})
+        table = pa.concat_tables(tables, promote_options='permissive').sort_by([
+            (self.src_args.src_col_isin, 'ascending'),
+            (self.src_args.src_col_time, 'ascending')])
+        if self.src_args.src_stage_dir:
+            os.makedirs(self.src_args.src_stage_dir, exist_ok=True)
+            path = self._staged_path(date)
+            pq.write_table(table, f'{path}.tmp', row_group_size=_STAGE_ROW_GROUP_ROWS)
+            os.replace(f'{path}.tmp', path)
+        else:
+            self.s3_bucket_trg.write_table_s3(table, self._staged_path(date),
+                                              row_group_size=_STAGE_ROW_GROUP_ROWS)
+        self._logger.info('Xetra source date %s staged.', date)
+        return table
+
+    def _staged_path(self, date: str):
+        """
+        Path of the staged source data of a date, in src_stage_dir
+        or the key below src_stage_key in the target bucket
+
+        :param date: source date 'YYYY-MM-DD'
+        """
+        if self.src_args.src_stage_dir:
+            return os.path.join(self.src_args.src_stage_dir, f'{date}.parquet')
+        return f'{self.src_args.src_stage_key}{date}/part.parquet'
+
+    def read_staged(self, date: str, columns: list = None, filters=None):
+        """
+        Reads the staged source data of a date with column projection and predicate
+        pushdown, the row groups are sorted by ISIN and time
+
+        :param date: source date 'YYYY-MM-DD'
+        :param columns: columns that should be read, all columns if None
+        :param filters: pyarrow filter expression or list of tuples, e.g.
+                        [('ISIN', 'in', ['DE000A0DJ6J9'])]
+
+        :returns:
+        table: Arrow table with the staged source data, None if the date is not staged
+        """
+        path = self._staged_path(date)
+        if self.src_args.src_stage_dir:
+            if not os.path.exists(path):
+                return None
+            return pq.read_table(path, columns=columns, filters=filters)
+        if not self.s3_bucket_trg.list_files_in_prefix(path):
+            return None
+        return self.s3_bucket_trg.read_parquet_to_table(path, columns=columns, filters=filters)
+
+    def _convert_staged(self, table: pa.Table, as_table: bool):
+        """
+        Converts staged source data to the types of the extraction
+
+        :param table: Arrow table with staged source data
+        :param as_table: returns an Arrow table instead of a DataFrame
+
+        :returns:
+        data: Arrow table or Pandas DataFrame
+        """
+        table = table.select(self.extract_columns)
+        if self.src_args.src_typed_read:
+            column_types = self._source_column_types(typed=True)
+            table = table.cast(pa.schema([
+                pa.field(field.name, column_types.get(field.name, field.type))
+                for field in table.schema]))
+        return table if as_table else _table_to_frame(table)
+
+    def transform_report1(self, data_frame: pd.DataFrame, legacy: bool = False):
         """
         Applies the necessary transformation to create report 1
 
         :param data_frame: Pandas DataFrame as Input
+        :param legacy: uses the previous implementation with row-level opening and
+                       closing price columns, kept for parity tests
 
         :returns:
         data_frame: Transformed Pandas DataFrame as Output
@@ -129,6 +833,126 @@ class Xetra_ETL():
             self._logger.info('The dataframe is empty. No transformations will be applied.')
             return data_frame
         self._logger.info('Applying transformations to Xetra source data for report 1 started...')
+        with self._stage_metrics('transform_report1', rows_in=len(data_frame)) as metrics:
+            if legacy:
+                data_frame = self._finalize_report1(self._aggregate_report1_legacy(data_frame))
+            elif self.src_args.src_transform_workers > 1:
+                data_frame = self._transform_report1_parallel(data_frame)
+            else:
+                data_frame = self._finalize_report1(self._aggregate_report1(data_frame))
+            metrics.record(rows_out=len(data_frame))
+        self._logger.info('Applying transformations to Xetra source data finished...')
+        return data_frame
+
+    def _transform_report1_parallel(self, data_frame: pd.DataFrame):
+        """
+        Transforms the source data in src_transform_workers processes. The rows are
+        sharded by ISIN hash, so every worker sees all days of its ISINs and
+        calculates the change to the previous closing price on its own.
+
+        :param data_frame: Pandas DataFrame with source data
+
+        :returns:
+        data_frame: Transformed Pandas DataFrame as Output
+        """
+        workers = self.src_args.src_transform_workers
+        data_frame = data_frame.loc[:, self.src_args.src_columns]
+        # The hashes are uint64, which np.bincount of NumPy 1.x does not take
+        shard_ids = (pd.util.hash_pandas_object(
+            data_frame[self.src_args.src_col_isin], index=False).to_numpy() % workers)\
+            .astype(np.int64)
+        # Ordering the rows by shard once, every shard is a slice of the table
+        order = np.argsort(shard_ids, kind='stable')
+        table = pa.Table.from_pandas(data_frame, preserve_index=False).take(order)
+        shard_sizes = np.bincount(shard_ids, minlength=workers)
+        if self.last_close_key:
+            # Reading the last close file once instead of in every worker
+            self._last_close_prices()
+        with tempfile.TemporaryDirectory() as tmp_dir, ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = []
+            start = 0
+            for shard, size in enumerate(shard_sizes):
+                if size == 0:
+                    continue
+                path = os.path.join(tmp_dir, f'shard_{shard}.arrow')
+                shard_table = table.slice(start, size)
+                with pa.OSFile(path, 'wb') as sink, \
+                        pa.ipc.new_file(sink, shard_table.schema) as writer:
+                    writer.write_table(shard_table)
+                futures.append(executor.submit(_transform_report1_shard, self, path))
+                start += size
+            frames = [future.result() for future in futures]
+        # Restoring the order of the single process transformation
+        return pd.concat(frames, ignore_index=True)\
+            .sort_values(by=[self.src_args.src_col_isin, self.src_args.src_col_date])\
+                .reset_index(drop=True)
+
+    def _aggregate_report1(self, data_frame: pd.DataFrame, partial: bool = False):
+        """
+        Aggregates the source data per ISIN and day. The rows are ordered once by the
+        integer codes of ISIN, date and time, the opening and closing price are picked
+        from the first and last row of every day and the other aggregates are reduced
+        over the contiguous slices of the days.
+
+        :param data_frame: Pandas DataFrame with source data
+        :param partial: keeps the times of the opening and closing price,
+                        needed to combine partial aggregates
+
+        :returns:
+        data_frame: Pandas DataFrame with opening price, closing price, minimum price,
+                    maximum price and traded volume per ISIN and day, sorted by ISIN and date
+        """
+        # Filtering necessary source columns
+        data_frame = data_frame.loc[:, self.src_args.src_columns]
+        # Removing rows with missing values
+        data_frame = data_frame.dropna()
+        key_columns = [self.src_args.src_col_isin, self.src_args.src_col_date]
+        if data_frame.empty:
+            return pd.DataFrame(columns=key_columns + [
+                *([_PARTIAL_OP_TIME] if partial else []), self.trg_args.trg_col_op_price,
+                *([_PARTIAL_CLOS_TIME] if partial else []), self.trg_args.trg_col_clos_price,
+                self.trg_args.trg_col_min_price, self.trg_args.trg_col_max_price,
+                self.trg_args.trg_col_dail_trad_vol])
+        isin_codes, _ = _sorted_codes(data_frame[self.src_args.src_col_isin])
+        date_codes, dates = _sorted_codes(data_frame[self.src_args.src_col_date])
+        time_codes, _ = _sorted_codes(data_frame[self.src_args.src_col_time])
+        order = _stable_order([isin_codes, date_codes, time_codes])
+        day_keys = (isin_codes.astype('int64') * len(dates) + date_codes)[order]
+        starts = np.flatnonzero(np.r_[True, day_keys[1:] != day_keys[:-1]])
+        first_rows = order[starts]
+        last_rows = order[np.r_[starts[1:], len(order)] - 1]
+        close_column = self.src_args.src_col_end_price or self.src_args.src_col_start_price
+        result = data_frame[key_columns].iloc[first_rows].reset_index(drop=True)
+        if partial:
+            result[_PARTIAL_OP_TIME] = data_frame[self.src_args.src_col_time]\
+                .iloc[first_rows].to_numpy()
+        result[self.trg_args.trg_col_op_price] = data_frame[self.src_args.src_col_start_price]\
+            .to_numpy()[first_rows]
+        if partial:
+            result[_PARTIAL_CLOS_TIME] = data_frame[self.src_args.src_col_time]\
+                .iloc[last_rows].to_numpy()
+        result[self.trg_args.trg_col_clos_price] = data_frame[close_column]\
+            .to_numpy()[last_rows]
+        result[self.trg_args.trg_col_min_price] = np.minimum.reduceat(
+            data_frame[self.src_args.src_col_min_price].to_numpy()[order], starts)
+        result[self.trg_args.trg_col_max_price] = np.maximum.reduceat(
+            data_frame[self.src_args.src_col_max_price].to_numpy()[order], starts)
+        result[self.trg_args.trg_col_dail_trad_vol] = np.add.reduceat(
+            data_frame[self.src_args.src_col_traded_vol].to_numpy()[order], starts)
+        return result
+
+    def _aggregate_report1_legacy(self, data_frame: pd.DataFrame):
+        """
+        Aggregates the source data per ISIN and day by broadcasting the opening
+        and closing price to the source rows first
+
+        :param data_frame: Pandas DataFrame with source data
+
+        :returns:
+        data_frame: Pandas DataFrame with opening price, closing price, minimum price,
+                    maximum price and traded volume per ISIN and day
+        """
         # Filtering necessary source columns
         data_frame = data_frame.loc[:, self.src_args.src_columns]
         # Removing rows with missing values
@@ -147,7 +971,7 @@ class Xetra_ETL():
                 .groupby([
                     self.src_args.src_col_isin,
                     self.src_args.src_col_date
-                    ])[self.src_args.src_col_start_price]\
+                    ])[self.src_args.src_col_end_price or self.src_args.src_col_start_price]\
                         .transform('last')
         # Renaming columns
         data_frame.rename(columns={
@@ -166,55 +990,636 @@ class Xetra_ETL():
                     self.trg_args.trg_col_min_price: 'min',
                     self.trg_args.trg_col_max_price: 'max',
                     self.trg_args.trg_col_dail_trad_vol: 'sum'})
-        # Change of current day's closing price compared to the
-        # previous trading day's closing price in %
-        data_frame[self.trg_args.trg_col_ch_prev_clos] = data_frame\
-            .sort_values(by=[self.src_args.src_col_date])\
-                .groupby([self.src_args.src_col_isin])[self.trg_args.trg_col_op_price]\
-                    .shift(1)
-        data_frame[self.trg_args.trg_col_ch_prev_clos] = (
-            data_frame[self.trg_args.trg_col_op_price] \
-            - data_frame[self.trg_args.trg_col_ch_prev_clos]
-            ) / data_frame[self.trg_args.trg_col_ch_prev_clos ] * 100
-        # Rounding to 2 decimals
-        data_frame = data_frame.round(decimals=2)
-        # Removing the day before extract_date
-        data_frame = data_frame[data_frame.Date >= self.extract_date].reset_index(drop=True)
-        self._logger.info('Applying transformations to Xetra source data finished...')
+        return data_frame
+
+    def transform_report1_partial(self, data_frame: pd.DataFrame):
+        """
+        Reduces one chunk of source data (e.g. one source file) to partial
+        report 1 aggregates per ISIN and day. Partials of several chunks are
+        combined by merge_report1_partials.
+
+        :param data_frame: Pandas DataFrame with a chunk of the source data
+
+        :returns:
+        data_frame: Pandas DataFrame with the opening and closing price together
+                    with their times, minimum price, maximum price and traded volume
+        """
+        return self._aggregate_report1(data_frame, partial=True)
+
+    def _combine_report1_partials(self, data_frame: pd.DataFrame):
+        """
+        Combines rows of partial aggregates belonging to the same ISIN and day
+
+        :param data_frame: Pandas DataFrame with partial aggregates
+
+        :returns:
+        data_frame: Pandas DataFrame with one row of partial aggregates per ISIN and day
+        """
+        keys = [self.src_args.src_col_isin, self.src_args.src_col_date]
+        opening = data_frame.sort_values(by=[_PARTIAL_OP_TIME])\
+            .groupby(keys, observed=True)[[_PARTIAL_OP_TIME, self.trg_args.trg_col_op_price]].first()
+        closing = data_frame.sort_values(by=[_PARTIAL_CLOS_TIME])\
+            .groupby(keys, observed=True)[[_PARTIAL_CLOS_TIME, self.trg_args.trg_col_clos_price]]\
+                .last()
+        aggregated = data_frame.groupby(keys, observed=True).agg({
+            self.trg_args.trg_col_min_price: 'min',
+            self.trg_args.trg_col_max_price: 'max',
+            self.trg_args.trg_col_dail_trad_vol: 'sum'})
+        return pd.concat([opening, closing, aggregated], axis=1).reset_index()
+
+    def merge_report1_partials(self, partials):
+        """
+        Merges partial aggregates to report 1. The partials are combined in batches
+        while they arrive, so only the aggregates have to be held in memory.
+
+        :param partials: iterable of Pandas DataFrames created by transform_report1_partial
+
+        :returns:
+        data_frame: Transformed Pandas DataFrame as Output
+        """
+        merged = []
+        for partial in partials:
+            merged.append(partial)
+            if len(merged) >= _PARTIAL_MERGE_BATCH:
+                merged = [self._combine_report1_partials(pd.concat(merged, ignore_index=True))]
+        if not merged:
+            self._logger.info('The dataframe is empty. No transformations will be applied.')
+            return pd.DataFrame()
+        data_frame = self._combine_report1_partials(pd.concat(merged, ignore_index=True))
+        data_frame = data_frame[[
+            self.src_args.src_col_isin,
+            self.src_args.src_col_date,
+            self.trg_args.trg_col_op_price,
+            self.trg_args.trg_col_clos_price,
+            self.trg_args.trg_col_min_price,
+            self.trg_args.trg_col_max_price,
+            self.trg_args.trg_col_dail_trad_vol]]
+        return self._finalize_report1(data_frame)
+
+    def transform_report1_streaming(self):
+        """
+        Creates report 1 while the source files are extracted. Every file is reduced
+        to partial aggregates as soon as it arrives, so the peak memory is bound by
+        one source file and the aggregates instead of the whole extraction window.
+
+        :returns:
+        data_frame: Transformed Pandas DataFrame as Output
+        """
+        self._logger.info('Extracting and transforming Xetra source data for report 1 started...')
+        with self._stage_metrics('transform_report1_streaming', self.s3_bucket_src) as metrics:
+            data_frame = self.merge_report1_partials(
+                self.transform_report1_partial(frame) for frame in self._iter_source_frames())
+            metrics.record(rows_out=len(data_frame))
+        self._logger.info('Extracting and transforming Xetra source data finished...')
+        return data_frame
+
+    def _finalize_report1(self, data_frame: pd.DataFrame):
+        """
+        Adds the change to the previous closing price to the aggregates per ISIN
+        and day, rounds and removes the dates before extract_date
+
+        :param data_frame: Pandas DataFrame with the aggregates per ISIN and day,
+                           sorted by ISIN and date like every aggregation returns them
+
+        :returns:
+        data_frame: Transformed Pandas DataFrame as Output
+        """
+        isin = data_frame[self.src_args.src_col_isin]
+        # Comparing the category codes is cheaper than comparing the strings
+        isin_keys = isin.cat.codes.to_numpy() if isinstance(isin.dtype, pd.CategoricalDtype)\
+            else isin.to_numpy()
+        # Typed source data is aggregated with categorical keys and possibly
+        # float32 prices, the report has plain keys and float64 prices
+        for column in [self.src_args.src_col_isin, self.src_args.src_col_date]:
+            if isinstance(data_frame[column].dtype, pd.CategoricalDtype):
+                data_frame[column] = data_frame[column]\
+                    .astype(data_frame[column].cat.categories.dtype)
+        price_columns = [
+            self.trg_args.trg_col_op_price,
+            self.trg_args.trg_col_clos_price,
+            self.trg_args.trg_col_min_price,
+            self.trg_args.trg_col_max_price]
+        data_frame[price_columns] = data_frame[price_columns].astype('float64')
+        # Change of current day's closing price compared to the previous trading
+        # day's closing price in %. The rows are sorted by ISIN and date, so the
+        # previous trading day is the previous row unless a new ISIN starts there.
+        prices = data_frame[self.trg_args.trg_col_op_price].to_numpy()
+        prev_prices = np.empty_like(prices)
+        prev_prices[1:] = prices[:-1]
+        isin_starts = np.ones(len(prices), dtype=bool)
+        isin_starts[1:] = isin_keys[1:] != isin_keys[:-1]
+        prev_prices[isin_starts] = np.nan
+        if self.last_close_key:
+            # The first day of every ISIN is compared to the price carried forward
+            prev_prices[isin_starts] = data_frame[self.src_args.src_col_isin]\
+                .iloc[isin_starts].map(self._last_close_prices()).to_numpy(dtype='float64')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            data_frame[self.trg_args.trg_col_ch_prev_clos] = \
+                (prices - prev_prices) / prev_prices * 100
+        # Rounding the prices and the change to 2 decimals
+        round_columns = price_columns + [self.trg_args.trg_col_ch_prev_clos]
+        data_frame[round_columns] = data_frame[round_columns].round(decimals=2)
+        # Removing the day before extract_date, which is a date
+        # object if there is no meta file yet
+        extract_date = str(self.extract_date)
+        data_frame = data_frame[data_frame[self.src_args.src_col_date] >= extract_date]\
+            .reset_index(drop=True)
         return data_frame
 
         
+    def _last_close_prices(self):
+        """
+        Prices per ISIN of the last trading day before extract_date, carried forward
+        in the last close file. The file is read once per job.
+
+        :returns:
+        prices: Pandas Series with the price per ISIN, in the same price column
+                as the change to the previous closing price is calculated on
+        """
+        if self._last_close is None:
+            last_close = MetaProcess.return_last_close(self.last_close_key, self.s3_bucket_trg)
+            if last_close.empty:
+                self._last_close = pd.Series(dtype='float64')
+            else:
+                last_close = last_close[
+                    last_close[self.src_args.src_col_date] < str(self.extract_date)]
+                self._last_close = last_close\
+                    .set_index(self.src_args.src_col_isin)[self.trg_args.trg_col_op_price]
+        return self._last_close
+
     def load(self, data_frame: pd.DataFrame):
         """
         Saves a Pandas DataFrame to the target
 
         :param data_frame: Pandas DataFrame as Input
         """
-        # Creating target key
-        target_key = (
-            f'{self.trg_args.trg_key}'
+        self._load_report1(data_frame)
+        self._update_meta()
+        return True
+
+    def write_report(self, data_frame: pd.DataFrame, trg_key: str, trg_partition_key: str):
+        """
+        Writes a report to the target in trg_write_mode: one file
+        <trg_key><timestamp>.<trg_format> or one file per trade date
+        <trg_partition_key><date>/part.<trg_format>
+
+        :param data_frame: Pandas DataFrame with the report
+        :param trg_key: basic key of the target file
+        :param trg_partition_key: basic key of the partitions
+        """
+        if self.trg_args.trg_write_mode == TargetWriteModes.PARTITIONED.value:
+            # Writing one file per trade date
+            self._load_partitioned(data_frame, trg_partition_key)
+        else:
+            # Writing to target
+            self.s3_bucket_trg.write_df_s3(data_frame, self._target_key(trg_key),
+                                           self.trg_args.trg_format)
+
+    def _target_key(self, trg_key: str):
+        """
+        Key of a target file of the full write mode
+
+        :param trg_key: basic key of the target file
+
+        :returns:
+        target_key: <trg_key><timestamp>.<trg_format>
+        """
+        return (
+            f'{trg_key}'
             f'{datetime.today().strftime(self.trg_args.trg_key_date_format)}.'
             f'{self.trg_args.trg_format}'
         )
-        # Writing to target
-        self.s3_bucket_trg.write_df_to_s3(data_frame, target_key, self.trg_args.trg_format)
+
+    def _partition_key(self, trg_partition_key: str, date: str):
+        """
+        Key of the partition of a trade date of the partitioned write mode
+
+        :param trg_partition_key: basic key of the partitions
+        :param date: trade date 'YYYY-MM-DD'
+
+        :returns:
+        partition_key: <trg_partition_key><date>/part.<trg_format>
+        """
+        return f'{trg_partition_key}{date}/part.{self.trg_args.trg_format}'
+
+    def _load_report1(self, data_frame: pd.DataFrame):
+        """
+        Saves report 1 to the target and carries its last prices
+        per ISIN forward to the next run
+
+        :param data_frame: Pandas DataFrame with report 1
+        """
+        with self._stage_metrics('load', self.s3_bucket_trg, rows_in=len(data_frame)):
+            self.write_report(data_frame, self.trg_args.trg_key,
+                              self.trg_args.trg_partition_key)
         self._logger.info('Xetra target data successfully written.')
+        if self.last_close_key and not data_frame.empty:
+            # Carrying the last prices per ISIN forward to the next run
+            MetaProcess.update_last_close(data_frame[[
+                self.src_args.src_col_isin,
+                self.src_args.src_col_date,
+                self.trg_args.trg_col_op_price,
+                self.trg_args.trg_col_clos_price]],
+                self.src_args.src_col_isin, self.src_args.src_col_date,
+                self.last_close_key, self.s3_bucket_trg)
+            self._logger.info('Xetra last close file successfully updated.')
+
+    def _update_meta(self):
+        """
+        Records the processed dates in the manifest and meta file
+        after all reports are saved
+        """
+        if self.manifest_key:
+            # Recording the source files the processed dates were extracted from
+            dates = [str(date) for date in self.meta_update_list]
+            missing = [date for date in dates if date not in self._source_objects]
+            if missing:
+                self._source_objects.update(self.s3_bucket_src.list_objects_in_prefixes(missing))
+            MetaProcess.update_manifest({date: self._source_objects[date] for date in dates},
+                                        self.manifest_key, self.s3_bucket_trg)
+            self._logger.info('Xetra manifest file successfully updated.')
         # Updating meta file
-        MetaProcess.update_meta_file(self.meta_update_list, self.meta_key, self.s3_bucket_trg)
+        with self._stage_metrics('meta_update_meta_file', self.s3_bucket_trg,
+                                 dates=len(self.meta_update_list)):
+            MetaProcess.update_meta_file(self.meta_update_list, self.meta_key,
+                                         self.s3_bucket_trg, self.meta_format)
         self._logger.info('Xetra meta file successfully updated.')
-        return True
+
+    def _load_partitioned(self, data_frame: pd.DataFrame, trg_partition_key: str = None):
+        """
+        Saves every trade date of a Pandas DataFrame to its own partition
+        <trg_partition_key><date>/part.<trg_format>, replacing the previous
+        version of the partition. Only the dates of meta_update_list are written.
+
+        :param data_frame: Pandas DataFrame as Input
+        :param trg_partition_key: basic key of the partitions, trg_partition_key
+                                  of the target configuration if None
+        """
+        if trg_partition_key is None:
+            trg_partition_key = self.trg_args.trg_partition_key
+        if data_frame.empty:
+            self._logger.info('The dataframe is empty! No partition will be written.')
+            return
+        update_dates = {str(date) for date in self.meta_update_list}
+        for date, partition in data_frame.groupby(self.src_args.src_col_date, sort=True):
+            if date not in update_dates:
+                continue
+            self.s3_bucket_trg.write_df_s3(partition.reset_index(drop=True),
+                                           self._partition_key(trg_partition_key, date),
+                                           self.trg_args.trg_format)
 
     def etl_report1(self):
         """
         Extract, transform and load to create report 1
         """
+        if self.src_args.src_arrow_native:
+            # Extraction, transformation and load as Arrow tables
+            self.load_table(self.transform_report1_table(self.extract_table()))
+            return True
+        if self.src_args.src_streaming:
+            # Extraction and transformation file by file
+            data_frame = self.transform_report1_streaming()
+        else:
+            # Extraction
+            data_frame = self.extract()
+            # Transformation
+            data_frame = self.transform_report1(data_frame)
+        # Load
+        self.load(data_frame)
+        return True
+
+
+        
+
+    def extract_table(self):
+        """
+        Read the source data and concatenates them to one Arrow table
+
+        :returns:
+        table: Arrow table with the extract_columns of the extracted data
+        """
+        self._logger.info('Extracting Xetra source files started...')
+        with self._stage_metrics('extract', self.s3_bucket_src) as metrics:
+            tables = list(self._iter_source_files(self._read_source_table, as_table=True))
+            # Concatenating keeps the chunks of the tables without copying
+            table = pa.concat_tables(tables, promote_options='permissive')\
+                if tables else pa.table({})
+            metrics.record(rows_out=table.num_rows)
+        self._logger.info('Extracting Xetra source files finished.')
+        return table
+
+    def transform_report1_table(self, table: pa.Table):
+        """
+        Applies the necessary transformation to create report 1 with Arrow compute,
+        the result is the same as transform_report1 of the same data as DataFrame
+
+        :param table: Arrow table as Input
+
+        :returns:
+        table: Transformed Arrow table as Output
+        """
+        if table.num_rows == 0:
+            self._logger.info('The table is empty. No transformations will be applied.')
+            return table
+        self._logger.info('Applying transformations to Xetra source data for report 1 started...')
+        with self._stage_metrics('transform_report1', rows_in=table.num_rows) as metrics:
+            table = self._finalize_report1_table(self._aggregate_report1_table(table))
+            metrics.record(rows_out=table.num_rows)
+        self._logger.info('Applying transformations to Xetra source data finished...')
+        return table
+
+    def _aggregate_report1_table(self, table: pa.Table):
+        """
+        Aggregates the source data per ISIN and day with an ordered Arrow group_by.
+        The rows are ordered by the integer codes of ISIN, date and time and grouped
+        by the code of ISIN and day, so neither the sort nor the grouping compares
+        strings and only the price and volume columns are reordered.
+
+        :param table: Arrow table with source data
+
+        :returns:
+        table: Arrow table with opening price, closing price, minimum price, maximum
+               price and traded volume per ISIN and day, sorted by ISIN and date
+        """
+        # Removing rows with missing values
+        table = table.select(self.src_args.src_columns).drop_null()
+        keys = [self.src_args.src_col_isin, self.src_args.src_col_date]
+        isin_codes, date_codes, time_codes = [
+            _sorted_codes_arrow(table[column]) for column in keys + [self.src_args.src_col_time]]
+        order = _stable_order([isin_codes, date_codes, time_codes])
+        close_column = self.src_args.src_col_end_price or self.src_args.src_col_start_price
+        value_columns = list(dict.fromkeys([
+            self.src_args.src_col_start_price, close_column, self.src_args.src_col_min_price,
+            self.src_args.src_col_max_price, self.src_args.src_col_traded_vol]))
+        # Without rows left, e.g. if all prices are missing, the result is empty
+        day_keys = isin_codes.astype('int64') * (date_codes.max(initial=0) + 1) + date_codes
+        # Taking rows from one chunk is much faster than across the chunks of the files
+        values = table.select(value_columns).combine_chunks().take(order)\
+            .append_column('_day', pa.array(day_keys[order]))\
+                .append_column('_row', pa.array(order))
+        # Without threads first and last follow the order of the sorted rows
+        aggregated = values.group_by('_day', use_threads=False).aggregate([
+            ('_row', 'first'),
+            (self.src_args.src_col_start_price, 'first'),
+            (close_column, 'last'),
+            (self.src_args.src_col_min_price, 'min'),
+            (self.src_args.src_col_max_price, 'max'),
+            (self.src_args.src_col_traded_vol, 'sum')]).sort_by('_day')
+        # Dictionary encoded text columns of the typed read become strings
+        key_table = table.select(keys).take(aggregated['_row_first'])
+        key_table = key_table.cast(pa.schema([
+            pa.field(field.name, pa.string() if pa.types.is_dictionary(field.type)
+                     else field.type) for field in key_table.schema]))
+        return pa.table({
+            keys[0]: key_table[keys[0]],
+            keys[1]: key_table[keys[1]],
+            self.trg_args.trg_col_op_price:
+                aggregated[f'{self.src_args.src_col_start_price}_first'],
+            self.trg_args.trg_col_clos_price: aggregated[f'{close_column}_last'],
+            self.trg_args.trg_col_min_price:
+                aggregated[f'{self.src_args.src_col_min_price}_min'],
+            self.trg_args.trg_col_max_price:
+                aggregated[f'{self.src_args.src_col_max_price}_max'],
+            self.trg_args.trg_col_dail_trad_vol:
+                aggregated[f'{self.src_args.src_col_traded_vol}_sum']})
+
+    def _finalize_report1_table(self, table: pa.Table):
+        """
+        Adds the change to the previous closing price to the aggregates per ISIN and
+        day, rounds and removes the dates before extract_date, see _finalize_report1
+
+        :param table: Arrow table with the aggregates per ISIN and day, sorted by ISIN and date
+
+        :returns:
+        table: Transformed Arrow table as Output
+        """
+        isin = table[self.src_args.src_col_isin].combine_chunks()
+        price_columns = [
+            self.trg_args.trg_col_op_price,
+            self.trg_args.trg_col_clos_price,
+            self.trg_args.trg_col_min_price,
+            self.trg_args.trg_col_max_price]
+        columns = {column: table[column] for column in table.column_names}
+        for column in price_columns:
+            columns[column] = table[column].cast(pa.float64()).to_numpy()
+        prices = columns[self.trg_args.trg_col_op_price]
+        prev_prices = np.empty_like(prices)
+        prev_prices[1:] = prices[:-1]
+        isin_starts = np.ones(len(prices), dtype=bool)
+        isin_starts[1:] = pc.not_equal(isin[1:], isin[:-1]).to_numpy(zero_copy_only=False)
+        prev_prices[isin_starts] = np.nan
+        if self.last_close_key:
+            # The first day of every ISIN is compared to the price carried forward
+            last_close = self._last_close_prices()
+            positions = pc.index_in(isin.filter(pa.array(isin_starts)),
+                                    value_set=pa.array(last_close.index.astype(str),
+                                                       type=pa.string()))
+            last_prices = np.append(last_close.to_numpy(dtype='float64'), np.nan)
+            prev_prices[isin_starts] = last_prices[
+                positions.fill_null(len(last_close)).to_numpy()]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns[self.trg_args.trg_col_ch_prev_clos] = (prices - prev_prices) / prev_prices * 100
+        # Rounding the prices and the change to 2 decimals like DataFrame.round
+        for column in price_columns + [self.trg_args.trg_col_ch_prev_clos]:
+            columns[column] = np.round(columns[column], decimals=2)
+        table = pa.table(columns)
+        return table.filter(pc.greater_equal(table[self.src_args.src_col_date],
+                                             str(self.extract_date)))
+
+    def load_table(self, table: pa.Table):
+        """
+        Saves an Arrow table with report 1 to the target, parquet files are
+        written from the table directly
+
+        :param table: Arrow table as Input
+        """
+        with self._stage_metrics('load', self.s3_bucket_trg, rows_in=table.num_rows):
+            if table.num_rows == 0:
+                # Like write_df_s3, nothing is written for an empty report
+                self._logger.info('The table is empty! No file will be written.')
+            elif self.trg_args.trg_format != S3FileTypes.PARQUET.value:
+                # Other formats are written by pandas
+                self.write_report(table.to_pandas(), self.trg_args.trg_key,
+                                  self.trg_args.trg_partition_key)
+            elif self.trg_args.trg_write_mode == TargetWriteModes.PARTITIONED.value:
+                # Writing one file per trade date of meta_update_list
+                for date in sorted({str(date) for date in self.meta_update_list}):
+                    partition = table.filter(pc.equal(table[self.src_args.src_col_date], date))
+                    if partition.num_rows:
+                        self.s3_bucket_trg.write_table_s3(
+                            partition, self._partition_key(self.trg_args.trg_partition_key,
+                                                           date))
+            else:
+                self.s3_bucket_trg.write_table_s3(table,
+                                                  self._target_key(self.trg_args.trg_key))
+        self._logger.info('Xetra target data successfully written.')
+        if self.last_close_key and table.num_rows:
+            # Carrying the last prices per ISIN forward to the next run, the
+            # last close file is read and written by pandas
+            MetaProcess.update_last_close(table.select([
+                self.src_args.src_col_isin,
+                self.src_args.src_col_date,
+                self.trg_args.trg_col_op_price,
+                self.trg_args.trg_col_clos_price]).to_pandas(),
+                self.src_args.src_col_isin, self.src_args.src_col_date,
+                self.last_close_key, self.s3_bucket_trg)
+            self._logger.info('Xetra last close file successfully updated.')
+        self._update_meta()
+        return True
+
+    def report1(self):
+        """
+        Report 1 for the report registry
+
+        :returns:
+        report: XetraReport with opening, closing, minimum and maximum price,
+                traded volume and change to the previous closing price per ISIN and day
+        """
+        return XetraReport(name='report1', columns=self.src_args.src_columns,
+                           transform=self.transform_report1, load=self._load_report1)
+
+    def register_report(self, report: XetraReport):
+        """
+        Adds a report to the reports created by etl_reports
+
+        :param report: XetraReport
+        """
+        missing = [column for column in report.columns
+                   if column not in self.src_args.src_columns]
+        if missing:
+            raise ValueError(f'Report {report.name} needs columns that are not in '
+                             f'src_columns: {missing}')
+        self.reports[report.name] = report
+
+    def etl_reports(self):
+        """
+        Extract, transform and load to create all registered reports, report 1 with
+        etl_report1 if none is registered. The source data is extracted once with the
+        union of the columns of the reports, the reports are saved concurrently and the
+        meta file is updated after all of them are saved.
+
+        src_streaming and src_arrow_native apply to report 1 alone, the registered
+        reports raise a ValueError with them instead of extracting the whole window.
+        """
+        if not self.reports:
+            return self.etl_report1()
+        if self.src_args.src_streaming or self.src_args.src_arrow_native:
+            raise ValueError('src_streaming and src_arrow_native only apply to report 1 '
+                             'without registered reports, the registered reports '
+                             f'{list(self.reports)} need the extracted DataFrame')
+        reports = list(self.reports.values())
         # Extraction
         data_frame = self.extract()
-        # Transformation
-        data_frame = self.transform_report1(data_frame)
+        # Transformation, the transformations keep the extracted data unchanged
+        results = [(report, report.transform(data_frame)) for report in reports]
+        del data_frame
         # Load
-        self.load(data_frame)
+        with ThreadPoolExecutor(max_workers=len(results)) as executor:
+            futures = [executor.submit(self._load_report, report, result)
+                       for report, result in results]
+            # Raising the first exception before the meta file is updated
+            for future in futures:
+                future.result()
+        self._update_meta()
         return True
 
+    def _load_report(self, report: XetraReport, data_frame: pd.DataFrame):
+        """
+        Saves one report of etl_reports
+
+        :param report: XetraReport
+        :param data_frame: Pandas DataFrame with the report
+        """
+        with self._stage_metrics('load_report', report=report.name, rows_in=len(data_frame)):
+            report.load(data_frame)
+        self._logger.info('Xetra %s successfully written.', report.name)
 
-        
\ No newline at end of file
+    def transform_bars(self, data_frame: pd.DataFrame, bars_args: XetraBarsConfig):
+        """
+        Creates OHLCV bars of bars_interval_minutes per ISIN and day. The rows are
+        sorted once by the integer codes of ISIN, date and minute, every bar is a
+        contiguous slice of the sorted arrays and is reduced with ufunc.reduceat.
+
+        :param data_frame: Pandas DataFrame with source data
+        :param bars_args: XetraBarsConfig with the bars configuration
+
+        :returns:
+        data_frame: Pandas DataFrame with opening, maximum, minimum and closing price and
+                    traded volume per ISIN, day and bar, sorted by ISIN, date and bar
+        """
+        columns = self._bars_columns()
+        bars_columns = [self.src_args.src_col_isin, self.src_args.src_col_date,
+                        bars_args.bars_col_time, bars_args.bars_col_op_price,
+                        bars_args.bars_col_max_price, bars_args.bars_col_min_price,
+                        bars_args.bars_col_clos_price, bars_args.bars_col_trad_vol]
+        if not data_frame.empty:
+            data_frame = data_frame.loc[:, columns].dropna()
+            # The day before extract_date is only extracted for report 1,
+            # comparing the distinct dates instead of every row
+            date_codes, dates = _sorted_codes(data_frame[self.src_args.src_col_date])
+            keep = (np.asarray(dates).astype(str) >= str(self.extract_date))[date_codes]
+            if not keep.all():
+                data_frame = data_frame[keep]
+        if data_frame.empty:
+            self._logger.info('The dataframe is empty. No bars will be created.')
+            return pd.DataFrame(columns=bars_columns)
+        with self._stage_metrics('transform_bars', rows_in=len(data_frame)) as metrics:
+            isin_codes, isins = _sorted_codes(data_frame[self.src_args.src_col_isin])
+            date_codes, dates = _sorted_codes(data_frame[self.src_args.src_col_date])
+            time_codes, times = _sorted_codes(data_frame[self.src_args.src_col_time])
+            # Converting the distinct times 'HH:MM' instead of every row
+            time_parts = pd.Series(times.astype(str)).str.split(':', expand=True)
+            minutes = (time_parts[0].astype('int64') * 60
+                       + time_parts[1].astype('int64')).to_numpy()[time_codes]
+            interval = bars_args.bars_interval_minutes
+            order = _stable_order([isin_codes, date_codes, minutes])
+            day_keys = isin_codes.astype('int64') * len(dates) + date_codes
+            bar_keys = (day_keys * 1440 + minutes // interval)[order]
+            starts = np.flatnonzero(np.r_[True, bar_keys[1:] != bar_keys[:-1]])
+            ends = np.r_[starts[1:], len(order)] - 1
+            first_rows = order[starts]
+            close_column = self.src_args.src_col_end_price or self.src_args.src_col_start_price
+            labels = np.array([f'{minute // 60:02d}:{minute % 60:02d}'
+                               for minute in range(0, 1440, interval)], dtype=object)
+            data_frame = pd.DataFrame({
+                bars_columns[0]: np.asarray(isins, dtype=object)[isin_codes[first_rows]],
+                bars_columns[1]: np.asarray(dates, dtype=object)[date_codes[first_rows]],
+                bars_columns[2]: labels[minutes[first_rows] // interval],
+                bars_columns[3]: data_frame[self.src_args.src_col_start_price]
+                    .to_numpy(dtype='float64')[first_rows],
+                bars_columns[4]: np.maximum.reduceat(data_frame[self.src_args.src_col_max_price]
+                    .to_numpy(dtype='float64')[order], starts),
+                bars_columns[5]: np.minimum.reduceat(data_frame[self.src_args.src_col_min_price]
+                    .to_numpy(dtype='float64')[order], starts),
+                bars_columns[6]: data_frame[close_column].to_numpy(dtype='float64')[order[ends]],
+                bars_columns[7]: np.add.reduceat(
+                    data_frame[self.src_args.src_col_traded_vol].to_numpy()[order], starts)})
+            metrics.record(rows_out=len(data_frame))
+        return data_frame
+
+    def _bars_columns(self):
+        """
+        Source columns of the bars report
+        """
+        columns = [self.src_args.src_col_isin, self.src_args.src_col_date,
+                   self.src_args.src_col_time, self.src_args.src_col_start_price,
+                   self.src_args.src_col_max_price, self.src_args.src_col_min_price,
+                   self.src_args.src_col_traded_vol]
+        if self.src_args.src_col_end_price:
+            columns.append(self.src_args.src_col_end_price)
+        return columns
+
+    def bars_report(self, bars_args: XetraBarsConfig):
+        """
+        OHLCV bars report for the report registry
+
+        :param bars_args: XetraBarsConfig with the bars configuration
+
+        :returns:
+        report: XetraReport with the bars of bars_interval_minutes per ISIN and day
+        """
+        return XetraReport(
+            name='bars', columns=self._bars_columns(),
+            transform=lambda data_frame: self.transform_bars(data_frame, bars_args),
+            load=lambda data_frame: self.write_report(data_frame, bars_args.bars_trg_key,
+                                                      bars_args.bars_trg_partition_key))
@@ -0,0 +1,249 @@
+"""TestAsyncS3BucketConnectorMethods"""
+
+import asyncio
+import importlib.util
+import os
+import socket
+import unittest
+from io import StringIO, BytesIO
+from urllib.request import Request, urlopen
+
+
+import sys
+sys.path.append("/Users/pashkrof/surfdrive_general/DITTLAB/Courses/Data pipeline/production-ready ETL/venv/xetra/source_code/common")
+
+import boto3
+import pandas as pd
+
+from custom_exceptions import WrongFormatException
+from metrics import MetricsSink
+
+# The async connector and the local s3 server are installed with the async and dev
+# Pipfile categories
+ASYNC_S3_INSTALLED = all(importlib.util.find_spec(module) is not None
+                         for module in ('aiobotocore', 'flask', 'flask_cors'))
+if ASYNC_S3_INSTALLED:
+    from moto.server import ThreadedMotoServer
+    from async_s3 import AsyncS3BucketConnector
+
+
+class ListMetricsSink(MetricsSink):
+    """
+    Metrics sink collecting the records in a list
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def emit(self, record: dict):
+        self.records.append(record)
+
+
+@unittest.skipUnless(ASYNC_S3_INSTALLED, 'aiobotocore, flask and flask-cors are not installed')
+class TestAsyncS3BucketConnectorMethods(unittest.TestCase):
+    """
+    Testing the AsyncS3BucketConnector class against a local moto server,
+    the in-process mock does not intercept the asyncio client
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Starting the local s3 server on a free port
+        """
+        # Moto 5.0 has no lookup of the port the server is bound to
+        with socket.socket() as free_socket:
+            free_socket.bind(('127.0.0.1', 0))
+            cls.port = free_socket.getsockname()[1]
+        cls.server = ThreadedMotoServer(ip_address='127.0.0.1', port=cls.port, verbose=False)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Stopping the local s3 server
+        """
+        cls.server.stop()
+
+    def setUp(self):
+        """
+        Setting up the environment
+        """
+        # Defining the class arguments
+        self.s3_access_key = 'AWS_ACCESS_KEY_ID'
+        self.s3_secret_key = 'AWS_SECRET_ACCESS_KEY'
+        self.s3_endpoint_url = f'http://127.0.0.1:{self.port}'
+        self.s3_bucket_name = 'test-bucket'
+        # Creating s3 access keys as environment variables
+        os.environ[self.s3_access_key] = 'KEY1'
+        os.environ[self.s3_secret_key] = 'KEY2'
+        # Creating a bucket on the local s3 server
+        self.s3 = boto3.resource(service_name='s3', endpoint_url=self.s3_endpoint_url,
+                                 region_name='eu-central-1')
+        self.s3.create_bucket(Bucket=self.s3_bucket_name, CreateBucketConfiguration={
+            'LocationConstraint': 'eu-central-1'
+        })
+        self.s3_bucket = self.s3.Bucket(self.s3_bucket_name)
+        # Creating a testing instance
+        self.metrics = ListMetricsSink()
+        self.s3_bucket_conn = AsyncS3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                                     self.s3_endpoint_url,
+                                                     self.s3_bucket_name,
+                                                     metrics=self.metrics)
+
+    def tearDown(self):
+        """
+        Executing after unittests
+        """
+        # Removing the buckets of the test from the local s3 server
+        urlopen(Request(f'{self.s3_endpoint_url}/moto-api/reset', method='POST'))
+
+    def _run(self, method, *args, **kwargs):
+        """
+        Running one connector method on a new event loop
+        """
+        async def run():
+            async with self.s3_bucket_conn as s3_bucket:
+                return await getattr(s3_bucket, method)(*args, **kwargs)
+        return asyncio.run(run())
+
+    def test_list_files_in_prefix_ok(self):
+        """
+        Tests the list_files_in_prefix method for getting 2 file keys
+        as list on the local s3 bucket
+        """
+        # Expected results
+        prefix_exp = 'prefix/'
+        key1_exp = f'{prefix_exp}test1.csv'
+        key2_exp = f'{prefix_exp}test2.csv'
+        # Test init
+        csv_content = 'col1,col2\nvalA,valB'
+        self.s3_bucket.put_object(Body=csv_content, Key=key1_exp)
+        self.s3_bucket.put_object(Body=csv_content, Key=key2_exp)
+        self.s3_bucket.put_object(Body=csv_content, Key='other/test3.csv')
+        # Method execution
+        list_result = self._run('list_files_in_prefix', prefix_exp)
+        # Tests after method execution
+        self.assertEqual([key1_exp, key2_exp], list_result)
+        self.assertEqual(1, self.s3_bucket_conn.counters()['s3_requests'])
+        self.assertEqual(2, self.metrics.records[0]['files'])
+
+    def test_list_files_in_prefix_wrong_prefix(self):
+        """
+        Tests the list_files_in_prefix method in case of a
+        wrong or not existing prefix
+        """
+        # Expected results
+        prefix_exp = 'no-prefix/'
+        # Method execution
+        list_result = self._run('list_files_in_prefix', prefix_exp)
+        # Tests after method execution
+        self.assertTrue(not list_result)
+
+    def test_read_csv_to_df_ok(self):
+        """
+        Tests the read_csv_to_df method for reading one .csv file
+        from the local s3 bucket with selected columns and data types
+        """
+        # Expected results
+        key_exp = 'test.csv'
+        col1_exp = 'col1'
+        val1_exp = 'val1'
+        # Test init
+        csv_content = f'{col1_exp},col2,col3\n{val1_exp},1.5,x'
+        self.s3_bucket.put_object(Body=csv_content, Key=key_exp)
+        # Method execution
+        df_result = self._run('read_csv_to_df', key_exp, columns=[col1_exp, 'col2'],
+                              dtype={'col2': 'float32'})
+        # Tests after method execution
+        self.assertEqual([col1_exp, 'col2'], list(df_result.columns))
+        self.assertEqual(val1_exp, df_result[col1_exp][0])
+        self.assertEqual('float32', df_result['col2'].dtype)
+        self.assertEqual(len(csv_content), self.s3_bucket_conn.counters()['bytes_read'])
+        self.assertEqual(1, self.metrics.records[0]['rows_out'])
+
+    def test_read_csv_to_df_concurrent(self):
+        """
+        Tests reading many .csv files concurrently with one
+        connector on one event loop
+        """
+        # Expected results
+        keys_exp = [f'prefix/test{number}.csv' for number in range(20)]
+        # Test init
+        for number, key in enumerate(keys_exp):
+            self.s3_bucket.put_object(Body=f'col1\n{number}', Key=key)
+        # Method execution
+        async def read_files():
+            async with self.s3_bucket_conn as s3_bucket:
+                return await asyncio.gather(*(s3_bucket.read_csv_to_df(key)
+                                              for key in keys_exp))
+        frames = asyncio.run(read_files())
+        # Tests after method execution
+        self.assertEqual(list(range(20)), [frame['col1'][0] for frame in frames])
+        self.assertEqual(20, self.s3_bucket_conn.counters()['s3_requests'])
+        self.assertEqual([1] * 20, [record['s3_requests'] for record in self.metrics.records])
+
+    def test_write_df_s3_empty(self):
+        """
+        Tests the write_df_s3 method with
+        an empty DataFrame as input
+        """
+        # Expected results
+        return_exp = None
+        # Test init
+        df_empty = pd.DataFrame()
+        # Method execution
+        result = self._run('write_df_s3', df_empty, 'test.csv', 'csv')
+        # Test after method execution
+        self.assertEqual(return_exp, result)
+        self.assertEqual([], list(self.s3_bucket.objects.all()))
+
+    def test_write_df_s3_csv(self):
+        """
+        Tests the write_df_s3 method
+        if writing csv is successful
+        """
+        # Expected results
+        return_exp = True
+        df_exp = pd.DataFrame([['A', 'B'], ['C', 'D']], columns=['col1', 'col2'])
+        key_exp = 'test.csv'
+        # Method execution
+        result = self._run('write_df_s3', df_exp, key_exp, 'csv')
+        # Test after method execution
+        data = self.s3_bucket.Object(key=key_exp).get().get('Body').read().decode('utf-8')
+        df_result = pd.read_csv(StringIO(data))
+        self.assertEqual(return_exp, result)
+        self.assertTrue(df_exp.equals(df_result))
+        self.assertEqual(len(data), self.s3_bucket_conn.counters()['bytes_written'])
+
+    def test_write_df_s3_parquet(self):
+        """
+        Tests the write_df_s3 method
+        if writing parquet is successful
+        """
+        # Expected results
+        return_exp = True
+        df_exp = pd.DataFrame([['A', 1.5], ['C', 2.5]], columns=['col1', 'col2'])
+        key_exp = 'test.parquet'
+        # Method execution
+        result = self._run('write_df_s3', df_exp, key_exp, 'parquet')
+        # Test after method execution
+        data = self.s3_bucket.Object(key=key_exp).get().get('Body').read()
+        df_result = pd.read_parquet(BytesIO(data))
+        self.assertEqual(return_exp, result)
+        self.assertTrue(df_exp.equals(df_result))
+
+    def test_write_df_s3_wrong_format(self):
+        """
+        Tests the write_df_s3 method
+        if a not supported format is given
+        """
+        # Expected results
+        df_exp = pd.DataFrame([['A', 'B'], ['C', 'D']], columns=['col1', 'col2'])
+        # Method execution
+        with self.assertRaises(WrongFormatException):
+            self._run('write_df_s3', df_exp, 'test.json', 'json')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""TestLocalObjectCacheMethods"""
+
+import os
+import tempfile
+import unittest
+
+import sys
+sys.path.append("/Users/pashkrof/surfdrive_general/DITTLAB/Courses/Data pipeline/production-ready ETL/venv/xetra/source_code/common")
+
+import pyarrow as pa
+
+from cache import LocalObjectCache
+
+
+class TestLocalObjectCacheMethods(unittest.TestCase):
+    """
+    Testing the LocalObjectCache class
+    """
+
+    def setUp(self):
+        """
+        Setting up the environment
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+        self.bucket = 'test-bucket'
+        self.table = pa.table({'col1': ['valA', 'valB'], 'col2': [1.5, 2.5]})
+
+    def tearDown(self):
+        """
+        Executing after unittests
+        """
+        self.tmp_dir.cleanup()
+
+    def test_put_get_table_ok(self):
+        """
+        Tests the put_table and get_table methods for
+        reading a cached object with the same ETag
+        """
+        # Test init
+        cache = LocalObjectCache(self.cache_dir, max_size_mb=10)
+        # Method execution
+        cache.put_table(self.bucket, 'key.csv', '"etag1"', self.table)
+        table_result = cache.get_table(self.bucket, 'key.csv', '"etag1"')
+        # Test after method execution
+        self.assertTrue(self.table.equals(table_result))
+
+    def test_get_table_changed_etag(self):
+        """
+        Tests the get_table method when the object changed
+        or was parsed differently
+        """
+        # Test init
+        cache = LocalObjectCache(self.cache_dir, max_size_mb=10)
+        cache.put_table(self.bucket, 'key.csv', '"etag1"', self.table, variant='a')
+        # Method execution
+        result_etag = cache.get_table(self.bucket, 'key.csv', '"etag2"', variant='a')
+        result_variant = cache.get_table(self.bucket, 'key.csv', '"etag1"', variant='b')
+        # Test after method execution
+        self.assertIsNone(result_etag)
+        self.assertIsNone(result_variant)
+
+    def test_put_table_evicts_least_recently_used(self):
+        """
+        Tests the put_table method for evicting the least recently
+        used entries when the cache is full
+        """
+        # Test init
+        table = pa.table({'col1': list(range(100000))})
+        cache = LocalObjectCache(self.cache_dir, max_size_mb=2)
+        cache.put_table(self.bucket, 'key1.csv', '"etag"', table)
+        cache.put_table(self.bucket, 'key2.csv', '"etag"', table)
+        # Marking key1 as used before key2
+        os.utime(cache._path(self.bucket, 'key2.csv', '"etag"', ''), (1, 1))
+        os.utime(cache._path(self.bucket, 'key1.csv', '"etag"', ''), (2, 2))
+        # Method execution
+        cache.put_table(self.bucket, 'key3.csv', '"etag"', table)
+        # Test after method execution
+        self.assertIsNotNone(cache.get_table(self.bucket, 'key1.csv', '"etag"'))
+        self.assertIsNone(cache.get_table(self.bucket, 'key2.csv', '"etag"'))
+        self.assertIsNotNone(cache.get_table(self.bucket, 'key3.csv', '"etag"'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""TestS3InventoryMethods"""
+
+import os
+import tempfile
+import unittest
+
+import sys
+sys.path.append("/Users/pashkrof/surfdrive_general/DITTLAB/Courses/Data pipeline/production-ready ETL/venv/xetra/source_code/common")
+
+from inventory import S3Inventory
+
+
+class TestS3InventoryMethods(unittest.TestCase):
+    """
+    Testing the S3Inventory class
+    """
+
+    def setUp(self):
+        """
+        Setting up the environment
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'inventory', 'inventory.json')
+        self.bucket = 'test-bucket'
+        self.objects = [
+            {'Key': '2021-04-15/file1.csv', 'ETag': '"etag1"', 'Size': 10},
+            {'Key': '2021-04-15/file2.csv', 'ETag': '"etag2"', 'Size': 20},
+            {'Key': '2021-04-16/file1.csv', 'ETag': '"etag3"', 'Size': 30}]
+
+    def tearDown(self):
+        """
+        Executing after unittests
+        """
+        self.tmp_dir.cleanup()
+
+    def test_update_objects_persisted(self):
+        """
+        Tests the update and objects methods with the inventory
+        read from its file again
+        """
+        # Test init
+        inventory = S3Inventory(self.path)
+        # Method execution
+        inventory.update(self.bucket, ['2021-04-15', '2021-04-16', '2021-04-17'], self.objects)
+        inventory_loaded = S3Inventory(self.path)
+        # Test after method execution
+        self.assertEqual(self.objects[:2], inventory_loaded.objects(self.bucket, '2021-04-15'))
+        self.assertEqual([], inventory_loaded.objects(self.bucket, '2021-04-17'))
+        self.assertIsNone(inventory_loaded.objects(self.bucket, '2021-04-18'))
+
+    def test_update_listed_again(self):
+        """
+        Tests the update method replacing the objects
+        of a prefix that was listed again
+        """
+        # Test init
+        inventory = S3Inventory(self.path)
+        inventory.update(self.bucket, ['2021-04-15', '2021-04-16'], self.objects)
+        # Method execution
+        inventory.update(self.bucket, ['2021-04-15'], self.objects[1:2])
+        # Test after method execution
+        self.assertEqual(self.objects[1:2], inventory.objects(self.bucket, '2021-04-15'))
+        self.assertEqual(self.objects[2:], inventory.objects(self.bucket, '2021-04-16'))
+
+    def test_objects_other_bucket(self):
+        """
+        Tests the objects method for a bucket
+        the inventory does not belong to
+        """
+        # Test init
+        inventory = S3Inventory(self.path)
+        inventory.update(self.bucket, ['2021-04-15'], self.objects[:2])
+        # Method execution
+        result = inventory.objects('other-bucket', '2021-04-15')
+        # Test after method execution
+        self.assertIsNone(result)
+
+
+if __name__ == "__main__":
+    unittest.main()
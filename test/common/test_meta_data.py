@@ -328,5 +328,154 @@ class TestMetaProcessMethods(unittest.TestCase):
     #         }
     #     )
 
+    def test_return_date_list_meta_file_processed_dates(self):
+        """
+        Tests the return_date_list method
+        when the first dates are processed already
+        """
+        # Expected results
+        first_date = '2022-02-16'
+        date_list_exp = [f'2022-02-{day}' for day in range(18, 26)]
+        min_date_exp = '2022-02-18'
+        # Test init
+        meta_key = 'meta.csv'
+        MetaProcess.update_meta_file(['2022-02-15', '2022-02-16', '2022-02-17', '2022-02-20'],
+                                     meta_key, self.s3_bucket_meta)
+        # Method execution
+        min_date_return, date_list_return = MetaProcess.return_date_list(first_date, meta_key,
+                                                                         self.s3_bucket_meta)
+        # Test after method execution
+        self.assertEqual(date_list_exp, date_list_return)
+        self.assertEqual(min_date_exp, min_date_return)
+
+    def test_return_processed_dates(self):
+        """
+        Tests the return_processed_dates method with
+        and without meta file
+        """
+        # Expected results
+        dates_exp = {'2021-04-15', '2021-04-16'}
+        # Test init
+        meta_key = 'meta.csv'
+        # Method execution
+        dates_no_meta = MetaProcess.return_processed_dates(meta_key, self.s3_bucket_meta)
+        MetaProcess.update_meta_file(sorted(dates_exp), meta_key, self.s3_bucket_meta)
+        dates = MetaProcess.return_processed_dates(meta_key, self.s3_bucket_meta)
+        # Test after method execution
+        self.assertEqual(set(), dates_no_meta)
+        self.assertEqual(dates_exp, dates)
+
+    def test_update_manifest(self):
+        """
+        Tests the update_manifest and return_manifest methods replacing
+        the source files of dates recorded again
+        """
+        # Expected results
+        manifest_exp = {
+            '2021-04-15': {('2021-04-15/file1.csv', '"etag3"', 30)},
+            '2021-04-16': set(),
+            '2021-04-17': {('2021-04-17/file1.csv', '"etag4"', 40),
+                           ('2021-04-17/file2.csv', '"etag5"', 50)}}
+        # Test init
+        manifest_key = 'manifest.csv'
+        objects = {
+            '2021-04-15': [{'Key': '2021-04-15/file1.csv', 'ETag': '"etag1"', 'Size': 10},
+                           {'Key': '2021-04-15/file2.csv', 'ETag': '"etag2"', 'Size': 20}],
+            '2021-04-16': []}
+        objects_next = {
+            '2021-04-15': [{'Key': '2021-04-15/file1.csv', 'ETag': '"etag3"', 'Size': 30}],
+            '2021-04-17': [{'Key': '2021-04-17/file1.csv', 'ETag': '"etag4"', 'Size': 40},
+                           {'Key': '2021-04-17/file2.csv', 'ETag': '"etag5"', 'Size': 50}]}
+        # Method execution
+        manifest_no_file = MetaProcess.return_manifest(manifest_key, self.s3_bucket_meta)
+        MetaProcess.update_manifest(objects, manifest_key, self.s3_bucket_meta)
+        MetaProcess.update_manifest(objects_next, manifest_key, self.s3_bucket_meta)
+        manifest = MetaProcess.return_manifest(manifest_key, self.s3_bucket_meta)
+        # Test after method execution
+        self.assertEqual({}, manifest_no_file)
+        self.assertEqual(manifest_exp, manifest)
+
+    def test_update_manifest_wrong_file(self):
+        """
+        Tests the update_manifest method
+        when there is a wrong manifest file
+        """
+        # Test init
+        manifest_key = 'manifest.csv'
+        self.s3_bucket.put_object(Body='col1,col2\nvalA,valB', Key=manifest_key)
+        # Method execution
+        with self.assertRaises(WrongMetaFileException):
+            MetaProcess.update_manifest({'2021-04-15': []}, manifest_key, self.s3_bucket_meta)
+
+    def test_update_meta_file_parquet(self):
+        """
+        Tests the update_meta_file and return_date_list methods
+        with a parquet meta file written as part files
+        """
+        # Expected results
+        date_list_exp = ['2022-02-17', '2022-02-18', '2022-02-19', '2022-02-20', '2022-02-21',
+                         '2022-02-22', '2022-02-23', '2022-02-24', '2022-02-25']
+        # Test init
+        meta_key = 'meta'
+        # Method execution
+        MetaProcess.update_meta_file(['2022-02-15'], meta_key, self.s3_bucket_meta, 'parquet')
+        MetaProcess.update_meta_file([datetime(2022, 2, 16).date()], meta_key,
+                                     self.s3_bucket_meta, 'parquet')
+        part_keys = [obj.key for obj in self.s3_bucket.objects.filter(Prefix='meta/')]
+        min_date_return, date_list_return = MetaProcess.return_date_list(
+            '2022-02-16', meta_key, self.s3_bucket_meta, 'parquet')
+        MetaProcess.compact_meta_file(meta_key, self.s3_bucket_meta)
+        compacted_keys = [obj.key for obj in self.s3_bucket.objects.filter(Prefix='meta/')]
+        df_meta_result = MetaProcess.return_meta_data(meta_key, self.s3_bucket_meta, 'parquet')
+        # Test after method execution
+        self.assertEqual(2, len(part_keys))
+        self.assertEqual(date_list_exp, date_list_return)
+        self.assertEqual(date_list_exp[0], min_date_return)
+        self.assertEqual([part_keys[-1]], compacted_keys)
+        self.assertEqual(
+            [datetime(2022, 2, 15), datetime(2022, 2, 16)],
+            list(df_meta_result[MetaProcessFormat.META_SOURCE_DATE_COL.value]))
+
+    def test_update_last_close_ok(self):
+        """
+        Tests the update_last_close and return_last_close methods
+        keeping the most recent trading day per ISIN
+        """
+        # Expected results
+        last_close_exp = pd.DataFrame({
+            'ISIN': ['AT0000A0E9W5', 'DE000A0DJ6J9'],
+            'Date': ['2024-01-03', '2024-01-02'],
+            'closing_price_eur': [21.5, 45.0]})
+        # Test init
+        last_close_key = 'last_close.csv'
+        last_close_old = pd.DataFrame({
+            'ISIN': ['AT0000A0E9W5', 'DE000A0DJ6J9'],
+            'Date': ['2024-01-02', '2024-01-02'],
+            'closing_price_eur': [20.0, 45.0]})
+        last_close_new = pd.DataFrame({
+            'ISIN': ['AT0000A0E9W5'],
+            'Date': ['2024-01-03'],
+            'closing_price_eur': [21.5]})
+        # Method execution
+        result_empty = MetaProcess.return_last_close(last_close_key, self.s3_bucket_meta)
+        MetaProcess.update_last_close(last_close_old, 'ISIN', 'Date', last_close_key,
+                                      self.s3_bucket_meta)
+        MetaProcess.update_last_close(last_close_new, 'ISIN', 'Date', last_close_key,
+                                      self.s3_bucket_meta)
+        last_close_result = MetaProcess.return_last_close(last_close_key, self.s3_bucket_meta)
+        # Test after method execution
+        self.assertTrue(result_empty.empty)
+        pd.testing.assert_frame_equal(last_close_exp, last_close_result, check_dtype=False)
+        # Cleanup after test
+        self.s3_bucket.delete_objects(
+            Delete={
+                'Objects': [
+                    {
+                        'Key': last_close_key
+                    }
+                ]
+            }
+        )
+
 if __name__ == '__main__':
     unittest.main()
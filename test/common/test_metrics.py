@@ -0,0 +1,72 @@
+"""TestMetricsMethods"""
+
+import json
+import os
+import tempfile
+import unittest
+
+import sys
+sys.path.append("/Users/pashkrof/surfdrive_general/DITTLAB/Courses/Data pipeline/production-ready ETL/venv/xetra/source_code/common")
+
+from metrics import JsonLinesMetricsSink, StageMetrics
+
+
+class TestMetricsMethods(unittest.TestCase):
+    """
+    Testing the metrics sinks and the StageMetrics class
+    """
+
+    def setUp(self):
+        """
+        Setting up the environment
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.metrics_path = os.path.join(self.tmp_dir.name, 'metrics.jsonl')
+
+    def tearDown(self):
+        """
+        Executing after unittests
+        """
+        self.tmp_dir.cleanup()
+
+    def test_stage_metrics_ok(self):
+        """
+        Tests the StageMetrics class emitting the recorded values,
+        the duration and the counter increase of a stage
+        """
+        # Test init
+        sink = JsonLinesMetricsSink(self.metrics_path)
+        counters = {'s3_requests': 3}
+        # Method execution
+        with StageMetrics(sink, 'extract', lambda: counters, key='key.csv') as metrics:
+            counters['s3_requests'] += 2
+            metrics.record(rows_out=10)
+        # Test after method execution
+        with open(self.metrics_path, encoding='utf-8') as metrics_file:
+            records = [json.loads(line) for line in metrics_file]
+        self.assertEqual(1, len(records))
+        self.assertEqual('extract', records[0]['stage'])
+        self.assertEqual('key.csv', records[0]['key'])
+        self.assertEqual(10, records[0]['rows_out'])
+        self.assertEqual(2, records[0]['s3_requests'])
+        self.assertEqual('ok', records[0]['status'])
+        self.assertGreaterEqual(records[0]['duration_s'], 0)
+
+    def test_stage_metrics_failed(self):
+        """
+        Tests the StageMetrics class when the stage raises an exception
+        """
+        # Test init
+        sink = JsonLinesMetricsSink(self.metrics_path)
+        # Method execution
+        with self.assertRaises(ValueError):
+            with StageMetrics(sink, 'load'):
+                raise ValueError
+        # Test after method execution
+        with open(self.metrics_path, encoding='utf-8') as metrics_file:
+            records = [json.loads(line) for line in metrics_file]
+        self.assertEqual('failed', records[0]['status'])
+
+
+if __name__ == "__main__":
+    unittest.main()
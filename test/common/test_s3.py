@@ -1,19 +1,26 @@
 """TestS3BucketConnectorMethods"""
 
 import os
+import tempfile
 import unittest
 from io import StringIO, BytesIO
+from unittest.mock import patch
 
 
 import sys
 sys.path.append("/Users/pashkrof/surfdrive_general/DITTLAB/Courses/Data pipeline/production-ready ETL/venv/xetra/source_code/common")
 
 import boto3
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from moto import mock_aws
 
-from s3 import S3BucketConnector
+from s3 import S3BucketConnector, S3ClientConfig
+from cache import LocalObjectCache
+from inventory import S3Inventory
 from custom_exceptions import WrongFormatException
+from metrics import MetricsSink
 
 
 class TestS3BucketConnectorMethods(unittest.TestCase):
@@ -52,6 +59,26 @@ class TestS3BucketConnectorMethods(unittest.TestCase):
         # mocking s3 connection stop
         self.mock_s3.stop()
     
+    def test_shared_s3_client(self):
+        """
+        Tests that connectors with the same endpoint, credentials
+        and client configuration share one s3 client
+        """
+        # Test init
+        client_config = S3ClientConfig(max_pool_connections=20, retry_mode='adaptive')
+        # Method execution
+        s3_bucket_conn_other = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                                 self.s3_endpoint_url, 'other_bucket')
+        s3_bucket_conn_config = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                                  self.s3_endpoint_url, self.s3_bucket_name,
+                                                  client_config=client_config)
+        # Test after method execution
+        self.assertIs(self.s3_bucket_conn.s3_client, s3_bucket_conn_other.s3_client)
+        self.assertIsNot(self.s3_bucket_conn.s3_client, s3_bucket_conn_config.s3_client)
+        config = s3_bucket_conn_config.s3_client.meta.config
+        self.assertEqual(20, config.max_pool_connections)
+        self.assertEqual('adaptive', config.retries['mode'])
+
     def test_list_files_in_prefix_ok(self):
         """
         Tests the list_files_in_prefix method for getting 2 file keys
@@ -100,6 +127,49 @@ class TestS3BucketConnectorMethods(unittest.TestCase):
         self.assertTrue(not list_result)
 
 
+    def test_list_objects_in_prefixes_inventory(self):
+        """
+        Tests the list_objects_in_prefixes method listing several dates with
+        one request and only the dates after the inventory later on
+        """
+        # Test init
+        keys = ['2021-04-14/file.csv', '2021-04-15/file1.csv', '2021-04-15/file2.csv',
+                '2021-04-17/file.csv', '2021-04-18/file.csv', 'report1/file.csv']
+        for key in keys:
+            self.s3_bucket.put_object(Body='col1\nvalA', Key=key)
+        dates = ['2021-04-15', '2021-04-16', '2021-04-17']
+        with tempfile.TemporaryDirectory() as inventory_dir:
+            inventory_path = os.path.join(inventory_dir, 'inventory.json')
+            s3_bucket_conn = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                               self.s3_endpoint_url, self.s3_bucket_name,
+                                               inventory=S3Inventory(inventory_path))
+            # Method execution
+            objects = s3_bucket_conn.list_objects_in_prefixes(dates,
+                                                              complete_until='2021-04-16')
+            requests = s3_bucket_conn.counters()['s3_requests']
+            s3_bucket_conn_next = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                                    self.s3_endpoint_url, self.s3_bucket_name,
+                                                    inventory=S3Inventory(inventory_path))
+            self.s3_bucket.put_object(Body='col1\nvalA', Key='2021-04-17/file2.csv')
+            objects_next = s3_bucket_conn_next.list_objects_in_prefixes(
+                dates, complete_until='2021-04-17')
+            requests_next = s3_bucket_conn_next.counters()['s3_requests']
+            objects_cached = s3_bucket_conn_next.list_objects_in_prefixes(dates)
+        # Test after method execution
+        self.assertEqual(1, requests)
+        self.assertEqual(1, requests_next)
+        self.assertEqual(1, s3_bucket_conn_next.counters()['s3_requests'])
+        self.assertEqual({'2021-04-15': keys[1:3], '2021-04-16': [], '2021-04-17': keys[3:4]},
+                         {date: [obj['Key'] for obj in date_objects]
+                          for date, date_objects in objects.items()})
+        self.assertEqual(objects['2021-04-15'], objects_next['2021-04-15'])
+        self.assertEqual(['2021-04-17/file.csv', '2021-04-17/file2.csv'],
+                         [obj['Key'] for obj in objects_next['2021-04-17']])
+        self.assertEqual(objects_next, objects_cached)
+        self.assertEqual(9, objects['2021-04-15'][0]['Size'])
+        self.assertEqual(objects['2021-04-15'][0]['ETag'],
+                         s3_bucket_conn_next._etag('2021-04-15/file1.csv'))
+
     def test_read_csv_to_df_ok(self):
         """
         Tests the read_csv_to_df method for
@@ -136,6 +206,155 @@ class TestS3BucketConnectorMethods(unittest.TestCase):
             }
         )
     
+    def test_read_csv_to_df_typed(self):
+        """
+        Tests the read_csv_to_df method for reading selected
+        columns with given data types
+        """
+        # Expected results
+        key_exp = 'test.csv'
+        columns_exp = ['col1', 'col3']
+        # Test init
+        csv_content = 'col1,col2,col3\nvalA,valB,1.5\nvalC,valD,2.5'
+        self.s3_bucket.put_object(Body=csv_content, Key=key_exp)
+        # Method execution
+        df_result = self.s3_bucket_conn.read_csv_to_df(
+            key_exp, columns=columns_exp, dtype={'col1': 'category', 'col3': 'float32'})
+        # Test after method execution
+        self.assertEqual(columns_exp, list(df_result.columns))
+        self.assertIsInstance(df_result['col1'].dtype, pd.CategoricalDtype)
+        self.assertEqual('float32', df_result['col3'].dtype)
+        self.assertEqual(['valA', 'valC'], list(df_result['col1']))
+        # Cleanup after test
+        self.s3_bucket.delete_objects(
+            Delete={
+                'Objects': [
+                    {
+                        'Key': key_exp
+                    }
+                ]
+            }
+        )
+
+    def test_read_csv_to_table_ok(self):
+        """
+        Tests the read_csv_to_table method for reading
+        1 .csv file as Arrow table from the mocked s3 bucket
+        """
+        # Expected results
+        key_exp = 'test.csv'
+        log_exp = f'Reading file {self.s3_endpoint_url}/{self.s3_bucket_name}/{key_exp}'
+        # Test init
+        csv_content = 'col1,col2,col3\nvalA,valB,1\nvalC,valD,2'
+        self.s3_bucket.put_object(Body=csv_content, Key=key_exp)
+        # Method execution
+        with self.assertLogs() as logm:
+            table_result = self.s3_bucket_conn.read_csv_to_table(
+                key_exp, columns=['col1', 'col3'], column_types={'col3': pa.float64()})
+            # Log test after method execution
+            self.assertIn(log_exp, logm.output[0])
+        # Test after method execution
+        self.assertEqual(['col1', 'col3'], table_result.column_names)
+        self.assertEqual(pa.float64(), table_result.schema.field('col3').type)
+        self.assertEqual(['valA', 'valC'], table_result.column('col1').to_pylist())
+        # Cleanup after test
+        self.s3_bucket.delete_objects(
+            Delete={
+                'Objects': [
+                    {
+                        'Key': key_exp
+                    }
+                ]
+            }
+        )
+
+    def test_read_csv_to_df_cached(self):
+        """
+        Tests the read_csv_to_df method with a local cache
+        for reading a listed file without downloading it again
+        """
+        # Expected results
+        key_exp = 'prefix/test.csv'
+        # Test init
+        csv_content = 'col1,col2\nvalA,1\nvalB,2'
+        self.s3_bucket.put_object(Body=csv_content, Key=key_exp)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            s3_bucket_conn = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                               self.s3_endpoint_url, self.s3_bucket_name,
+                                               cache=LocalObjectCache(cache_dir, 10))
+            s3_bucket_conn.list_files_in_prefix('prefix/')
+            df_exp = s3_bucket_conn.read_csv_to_df(key_exp)
+            # Method execution
+            requests = s3_bucket_conn.counters()['s3_requests']
+            df_result = s3_bucket_conn.read_csv_to_df(key_exp)
+            # Test after method execution
+            self.assertEqual(requests, s3_bucket_conn.counters()['s3_requests'])
+            pd.testing.assert_frame_equal(df_exp, df_result)
+        # Cleanup after test
+        self.s3_bucket.delete_objects(
+            Delete={
+                'Objects': [
+                    {
+                        'Key': key_exp
+                    }
+                ]
+            }
+        )
+
+    def test_read_csv_to_df_cached_missing_key(self):
+        """
+        Tests the read_csv_to_df method with a local cache raising
+        NoSuchKey for a key that does not exist, like without cache
+        """
+        # Test init
+        with tempfile.TemporaryDirectory() as cache_dir:
+            s3_bucket_conn = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                               self.s3_endpoint_url, self.s3_bucket_name,
+                                               cache=LocalObjectCache(cache_dir, 10))
+            # Method execution and test after method execution
+            with self.assertRaises(s3_bucket_conn.s3_client.exceptions.NoSuchKey):
+                s3_bucket_conn.read_csv_to_df('missing.csv')
+            with self.assertRaises(s3_bucket_conn.s3_client.exceptions.NoSuchKey):
+                s3_bucket_conn.read_csv_to_table('missing.csv')
+
+    def test_read_parquet_to_df_and_delete_files(self):
+        """
+        Tests the read_parquet_to_df method for reading selected columns
+        of a parquet file and the delete_files method for deleting it
+        """
+        # Expected results
+        key_exp = 'test.parquet'
+        df_exp = pd.DataFrame({'col1': ['valA', 'valB'], 'col2': [1, 2]})
+        # Test init
+        out_buffer = BytesIO()
+        df_exp.assign(col3=0.5).to_parquet(out_buffer, index=False)
+        self.s3_bucket.put_object(Body=out_buffer.getvalue(), Key=key_exp)
+        # Method execution
+        df_result = self.s3_bucket_conn.read_parquet_to_df(key_exp, columns=['col1', 'col2'])
+        self.s3_bucket_conn.delete_files([key_exp])
+        # Test after method execution
+        pd.testing.assert_frame_equal(df_exp, df_result)
+        self.assertFalse(self.s3_bucket_conn.list_files_in_prefix(key_exp))
+
+    def test_write_table_s3_and_read_parquet_to_table(self):
+        """
+        Tests the write_table_s3 and read_parquet_to_table methods
+        with column projection and predicate pushdown
+        """
+        # Expected results
+        table_exp = pa.table({'col1': ['valA', 'valB', 'valC'], 'col2': [1, 2, 3]})
+        key_exp = 'test.parquet'
+        # Method execution
+        result = self.s3_bucket_conn.write_table_s3(table_exp, key_exp, row_group_size=1)
+        table_result = self.s3_bucket_conn.read_parquet_to_table(key_exp)
+        table_filtered = self.s3_bucket_conn.read_parquet_to_table(
+            key_exp, columns=['col1'], filters=[('col2', '>', 1)])
+        # Test after method execution
+        self.assertTrue(result)
+        self.assertTrue(table_exp.equals(table_result))
+        self.assertEqual(['valB', 'valC'], table_filtered['col1'].to_pylist())
+        self.assertEqual(['col1'], table_filtered.column_names)
+
     def test_write_df_to_s3_empty(self):
         """
         Test the write_df_to_s3 method for an empty dataframe 
@@ -223,6 +442,91 @@ class TestS3BucketConnectorMethods(unittest.TestCase):
         )
 
 
+    def test_write_df_to_s3_multipart(self):
+        """
+        Test the write_df_to_s3 method with outputs
+        larger than one part of the multipart upload
+        """
+        # Expected results
+        rows = 400000
+        df_exp = pd.DataFrame({'col1': np.arange(rows),
+                               'col2': np.linspace(0, 1, rows),
+                               'col3': [f'value_{i % 1000}' for i in range(rows)]})
+        # Test init
+        s3_bucket_conn = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                           self.s3_endpoint_url, self.s3_bucket_name,
+                                           part_size_mb=5, max_part_concurrency=2)
+        # Method execution
+        with patch('s3._WRITE_CHUNK_ROWS', 150000):
+            result_csv = s3_bucket_conn.write_df_s3(df_exp, 'test.csv', 'csv')
+            result_parquet = s3_bucket_conn.write_df_s3(df_exp, 'test.parquet', 'parquet')
+        # Test after method execution
+        self.assertTrue(result_csv)
+        self.assertTrue(result_parquet)
+        csv_object = self.s3_bucket.Object(key='test.csv')
+        data = csv_object.get().get('Body').read()
+        self.assertEqual(df_exp.to_csv(index=False).encode('utf-8'), data)
+        # The ETag of a multipart upload ends with the number of parts
+        self.assertEqual(len(data) // (5 * 1024 ** 2) + 1,
+                         int(csv_object.e_tag.strip('"').split('-')[1]))
+        df_result = pd.read_parquet(BytesIO(
+            self.s3_bucket.Object(key='test.parquet').get().get('Body').read()))
+        pd.testing.assert_frame_equal(df_exp, df_result)
+        self.assertEqual(len(data), s3_bucket_conn.counters()['bytes_written']\
+            - self.s3_bucket.Object(key='test.parquet').content_length)
+
+    def test_write_df_to_s3_multipart_metrics(self):
+        """
+        Test that the metrics of the write_df_to_s3 method count the
+        part uploads sent from the threads of the multipart upload
+        """
+        # Test init
+        rows = 400000
+        df_exp = pd.DataFrame({'col1': np.arange(rows),
+                               'col2': np.linspace(0, 1, rows),
+                               'col3': [f'value_{i % 1000}' for i in range(rows)]})
+        records = []
+        metrics = MetricsSink()
+        metrics.emit = records.append
+        s3_bucket_conn = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                           self.s3_endpoint_url, self.s3_bucket_name,
+                                           metrics=metrics, part_size_mb=5,
+                                           max_part_concurrency=2)
+        # Method execution
+        s3_bucket_conn.write_df_s3(df_exp, 'test.csv', 'csv')
+        # Test after method execution
+        parts = int(self.s3_bucket.Object(key='test.csv').e_tag.strip('"').split('-')[1])
+        # Creating and completing the upload plus one request per part
+        self.assertEqual(parts + 2, records[0]['s3_requests'])
+        self.assertEqual(parts + 2, s3_bucket_conn.counters()['s3_requests'])
+
+    def test_write_df_to_s3_multipart_aborted(self):
+        """
+        Test the write_df_to_s3 method aborting the multipart
+        upload when the serialization fails
+        """
+        # Test init
+        df_exp = pd.DataFrame({'col1': np.arange(400000)})
+        s3_bucket_conn = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                           self.s3_endpoint_url, self.s3_bucket_name,
+                                           part_size_mb=5)
+        to_csv = pd.DataFrame.to_csv
+        calls = []
+        def to_csv_failing(df, *args, **kwargs):
+            calls.append(len(df))
+            if len(calls) == 3:
+                raise MemoryError
+            return to_csv(df, *args, **kwargs) * 20
+        # Method execution
+        with patch('s3._WRITE_CHUNK_ROWS', 100000),\
+                patch.object(pd.DataFrame, 'to_csv', to_csv_failing):
+            with self.assertRaises(MemoryError):
+                s3_bucket_conn.write_df_s3(df_exp, 'test.csv', 'csv')
+        # Test after method execution
+        self.assertEqual([], [obj.key for obj in self.s3_bucket.objects.all()])
+        self.assertNotIn('Uploads', self.s3_bucket_conn.s3_client.list_multipart_uploads(
+            Bucket=self.s3_bucket_name))
+
     def test_write_df_to_s3_wrong_format(self):
         """
         Test the write_df_to_s3 method with a wrong format
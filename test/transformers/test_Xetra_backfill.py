@@ -0,0 +1,291 @@
+"""TestXetraBackfillMethods"""
+
+import os
+import time
+import unittest
+from io import BytesIO
+from unittest.mock import patch
+
+import boto3
+import pandas as pd
+from moto import mock_aws
+
+import sys
+sys.path.append("/Users/pashkrof/surfdrive_general/DITTLAB/Courses/Data pipeline/production-ready ETL/venv/xetra/source_code/common")
+
+
+from s3 import S3BucketConnector
+from meta_process import MetaProcess
+from source_code.transformers.Xetra_transformer import Xetra_ETL, XetraSourceConfig, XetraTargetConfig
+from source_code.transformers.Xetra_backfill import Xetra_Backfill, XetraBackfillConfig
+
+
+class TestXetraBackfillMethods(unittest.TestCase):
+    """
+    Testing the Xetra_Backfill class.
+    """
+
+    def setUp(self):
+        """
+        Setting up the environment
+        """
+        # mocking s3 connection start
+        self.mock_s3 = mock_aws()
+        self.mock_s3.start()
+        # Defining the class arguments
+        self.s3_access_key = 'AWS_ACCESS_KEY_ID'
+        self.s3_secret_key = 'AWS_SECRET_ACCESS_KEY'
+        self.s3_endpoint_url = 'https://s3.eu-central-1.amazonaws.com'
+        self.s3_bucket_name = 'test-bucket'
+        # Creating s3 access keys as environment variables
+        os.environ[self.s3_access_key] = 'KEY1'
+        os.environ[self.s3_secret_key] = 'KEY2'
+        # Creating a bucket on the mocked s3
+        self.s3 = boto3.resource(service_name='s3', endpoint_url=self.s3_endpoint_url)
+        self.s3.create_bucket(Bucket=self.s3_bucket_name,
+                                  CreateBucketConfiguration={
+                                      'LocationConstraint': 'eu-central-1'})
+        self.s3_bucket = self.s3.Bucket(self.s3_bucket_name)
+        # Creating a S3BucketConnector instance
+        self.s3_bucket_meta = S3BucketConnector(self.s3_access_key,
+                                                self.s3_secret_key,
+                                                self.s3_endpoint_url,
+                                                self.s3_bucket_name)
+        # Creating a source bucket with Xetra files on the mocked s3
+        self.s3_src_bucket_name = 'src-bucket'
+        self.s3.create_bucket(Bucket=self.s3_src_bucket_name,
+                                  CreateBucketConfiguration={
+                                      'LocationConstraint': 'eu-central-1'})
+        self.s3_src_bucket = self.s3.Bucket(self.s3_src_bucket_name)
+        self.s3_bucket_src = S3BucketConnector(self.s3_access_key,
+                                               self.s3_secret_key,
+                                               self.s3_endpoint_url,
+                                               self.s3_src_bucket_name)
+        self.meta_key = 'meta.csv'
+        # Source and target configuration
+        conf_dict_src = {
+            'src_first_extract_date': '2021-04-15',
+            'src_columns': ['ISIN', 'Mnemonic', 'Date', 'Time', 'StartPrice',
+                            'EndPrice', 'MinPrice', 'MaxPrice', 'TradedVolume'],
+            'src_col_date': 'Date',
+            'src_col_isin': 'ISIN',
+            'src_col_time': 'Time',
+            'src_col_start_price': 'StartPrice',
+            'src_col_min_price': 'MinPrice',
+            'src_col_max_price': 'MaxPrice',
+            'src_col_traded_vol': 'TradedVolume'
+        }
+        conf_dict_trg = {
+            'trg_col_isin': 'isin',
+            'trg_col_date': 'date',
+            'trg_col_op_price': 'opening_price_eur',
+            'trg_col_clos_price': 'closing_price_eur',
+            'trg_col_min_price': 'minimum_price_eur',
+            'trg_col_max_price': 'maximum_price_eur',
+            'trg_col_dail_trad_vol': 'daily_traded_volume',
+            'trg_col_ch_prev_clos': 'change_prev_closing_%',
+            'trg_key': 'report1/xetra_daily_report1_',
+            'trg_key_date_format': '%Y%m%d_%H%M%S',
+            'trg_format': 'parquet',
+            'trg_write_mode': 'partitioned'
+        }
+        self.source_config = XetraSourceConfig(**conf_dict_src)
+        self.target_config = XetraTargetConfig(**conf_dict_trg)
+        # Source files: two ISINs traded on two days, two hourly files per day
+        columns_src = ['ISIN', 'Mnemonic', 'Date', 'Time', 'StartPrice', 'EndPrice',
+                       'MinPrice', 'MaxPrice', 'TradedVolume']
+        self.src_files = {
+            '2021-04-15/2021-04-15_BINS_XETR12.csv': [
+                ['AT0000A0E9W5', 'SANT', '2021-04-15', '12:00', 20.19, 18.45, 18.20, 21.03, 1000],
+                ['AT0000A0E9W5', 'SANT', '2021-04-15', '12:01', 18.27, 21.19, 18.27, 21.34, 1000]],
+            '2021-04-15/2021-04-15_BINS_XETR13.csv': [
+                ['AT0000A0E9W5', 'SANT', '2021-04-15', '13:00', 20.21, 18.27, 18.21, 21.34, 1000],
+                ['AT0000A0E9W5', 'SANT', '2021-04-15', '13:01', 18.93, 20.17, 18.93, 21.34, 1000],
+                ['DE000A0DJ6J9', 'S92', '2021-04-15', '13:00', 45.33, 45.42, 45.33, 45.72, 300]],
+            '2021-04-16/2021-04-16_BINS_XETR12.csv': [
+                ['AT0000A0E9W5', 'SANT', '2021-04-16', '12:00', 19.16, 19.67, 19.02, 20.11, 2000],
+                ['DE000A0DJ6J9', 'S92', '2021-04-16', '12:00', 46.28, 46.35, 46.15, 46.51, 400]],
+            '2021-04-16/2021-04-16_BINS_XETR13.csv': [
+                ['DE000A0DJ6J9', 'S92', '2021-04-16', '13:01', 46.92, 47.01, 46.55, 47.13, 300],
+                ['AT0000A0E9W5', 'SANT', '2021-04-16', '13:00', 20.55, 20.91, 20.11, 21.03, 500],
+                ['DE000A0DJ6J9', 'S92', '2021-04-16', '13:00', 46.11, 46.88, 46.01, 46.91, 200]]
+        }
+        for key, rows in self.src_files.items():
+            self.s3_src_bucket.put_object(
+                Body=pd.DataFrame(rows, columns=columns_src).to_csv(index=False), Key=key)
+
+    def tearDown(self):
+        # mocking s3 connection stop
+        self.mock_s3.stop()
+
+    def _backfill_config(self, max_parallel_batches: int):
+        """
+        Backfill configuration where the source files of one day
+        use 60 % of the memory of a batch
+        """
+        objects = self.s3_bucket_src.list_objects_in_prefixes(['2021-04-15', '2021-04-16'])
+        day_size = max(sum(obj['Size'] for obj in date_objects)
+                       for date_objects in objects.values())
+        budget_mb = 1
+        return XetraBackfillConfig(
+            bf_memory_budget_mb=budget_mb,
+            bf_memory_factor=0.6 * budget_mb * 1024 ** 2 / max_parallel_batches / day_size,
+            bf_max_parallel_batches=max_parallel_batches)
+
+    def _read_partitions(self):
+        """
+        Reads all partitions of the target bucket
+        """
+        keys = sorted(obj.key for obj in self.s3_bucket.objects.filter(Prefix='report1/'))
+        return pd.concat([pd.read_parquet(BytesIO(
+            self.s3_bucket.Object(key=key).get().get('Body').read())) for key in keys],
+                         ignore_index=True)
+
+    def test_plan_batches(self):
+        """
+        Tests the plan_batches method splitting by memory
+        budget and skipping the processed dates
+        """
+        # Expected results
+        batches_exp = [['2021-04-15'], ['2021-04-16', '2021-04-17', '2021-04-18']]
+        batches_processed_exp = [['2021-04-15'], ['2021-04-17', '2021-04-18']]
+        # Test init
+        xetra_backfill = Xetra_Backfill(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                        self.source_config, self.target_config,
+                                        self._backfill_config(2))
+        # Method execution
+        batches = xetra_backfill.plan_batches('2021-04-15', '2021-04-18')
+        MetaProcess.update_meta_file(['2021-04-16'], self.meta_key, self.s3_bucket_meta)
+        batches_processed = xetra_backfill.plan_batches('2021-04-15', '2021-04-18')
+        # Test after method execution
+        self.assertEqual(batches_exp, batches)
+        self.assertEqual(batches_processed_exp, batches_processed)
+
+    def test_backfill_report1_same_as_etl(self):
+        """
+        Tests the backfill_report1 method with parallel batches
+        against one ETL job over the whole date range
+        """
+        # Expected results
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config, self.target_config)
+        df_exp = xetra_etl.transform_report1(xetra_etl.extract())
+        # Test init
+        xetra_backfill = Xetra_Backfill(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                        self.source_config, self.target_config,
+                                        self._backfill_config(2))
+        # Method execution
+        result = xetra_backfill.backfill_report1('2021-04-15', '2021-04-18')
+        # Test after method execution
+        self.assertTrue(result)
+        df_result = self._read_partitions().sort_values(by=['ISIN', 'Date'], ignore_index=True)
+        pd.testing.assert_frame_equal(df_exp, df_result, check_dtype=False)
+        self.assertEqual({'2021-04-15', '2021-04-16', '2021-04-17', '2021-04-18'},
+                         MetaProcess.return_processed_dates(self.meta_key, self.s3_bucket_meta))
+
+    def test_backfill_report1_last_close(self):
+        """
+        Tests that the backfill_report1 method carries the last prices per ISIN
+        from batch to batch and of the backfilled dates forward to the next run,
+        with the same report as one ETL job over the whole date range
+        """
+        # Test init
+        last_close_key = 'last_close.csv'
+        # 2021-04-19 is the first trading day after the weekend and starts a batch
+        df_monday = pd.read_csv(BytesIO(self.s3_src_bucket.Object(
+            key='2021-04-16/2021-04-16_BINS_XETR12.csv').get().get('Body').read()))
+        df_monday['Date'] = '2021-04-19'
+        df_monday[['StartPrice', 'EndPrice', 'MinPrice', 'MaxPrice']] *= 1.1
+        self.s3_src_bucket.put_object(Body=df_monday.to_csv(index=False),
+                                      Key='2021-04-19/2021-04-19_BINS_XETR12.csv')
+        dates = ['2021-04-15', '2021-04-16', '2021-04-17', '2021-04-18', '2021-04-19']
+        objects = self.s3_bucket_src.list_objects_in_prefixes(dates)
+        day_size = max(sum(obj['Size'] for obj in date_objects)
+                       for date_objects in objects.values())
+        # The source files of one day use 40 % of the memory of a batch
+        backfill_config = XetraBackfillConfig(bf_memory_budget_mb=1,
+                                              bf_memory_factor=0.4 * 1024 ** 2 / day_size,
+                                              bf_max_parallel_batches=2)
+        # Expected results
+        batches_exp = [dates[:4], dates[4:]]
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config, self.target_config, extract_dates=dates)
+        df_exp = xetra_etl.transform_report1(xetra_etl.extract())
+        df_last_close_exp = df_exp.sort_values(by=['Date']).groupby('ISIN').tail(1)[[
+            'ISIN', 'Date', 'opening_price_eur', 'closing_price_eur']]\
+            .sort_values(by=['ISIN'], ignore_index=True)
+        xetra_backfill = Xetra_Backfill(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                        self.source_config, self.target_config,
+                                        backfill_config, last_close_key=last_close_key)
+        batches = xetra_backfill.plan_batches(dates[0], dates[-1])
+        etl_report1 = Xetra_ETL.etl_report1
+
+        def slow_batch(xetra_etl):
+            # The batch of 2021-04-19 would read the last close file before it is written
+            if xetra_etl.extract_date_list[-1] == dates[3]:
+                time.sleep(0.5)
+            return etl_report1(xetra_etl)
+        # Method execution
+        with patch.object(Xetra_ETL, 'etl_report1', autospec=True,
+                          side_effect=slow_batch):
+            xetra_backfill.backfill_report1(dates[0], dates[-1])
+        # Test after method execution
+        df_result = self._read_partitions().sort_values(by=['ISIN', 'Date'], ignore_index=True)
+        pd.testing.assert_frame_equal(df_exp, df_result, check_dtype=False)
+        self.assertEqual(batches_exp, batches)
+        df_last_close = MetaProcess.return_last_close(last_close_key, self.s3_bucket_meta)
+        pd.testing.assert_frame_equal(df_last_close_exp, df_last_close, check_dtype=False)
+
+    def test_backfill_report1_manifest(self):
+        """
+        Tests that the backfill_report1 method records the source
+        files of the backfilled dates in the manifest
+        """
+        # Test init
+        manifest_key = 'manifest.csv'
+        xetra_backfill = Xetra_Backfill(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                        self.source_config, self.target_config,
+                                        self._backfill_config(2), manifest_key=manifest_key)
+        # Method execution
+        xetra_backfill.backfill_report1('2021-04-15', '2021-04-18')
+        # Test after method execution
+        manifest = MetaProcess.return_manifest(manifest_key, self.s3_bucket_meta)
+        self.assertEqual(['2021-04-15', '2021-04-16', '2021-04-17', '2021-04-18'],
+                         sorted(manifest))
+        self.assertEqual({key for key in self.src_files if key.startswith('2021-04-16')},
+                         {file[0] for file in manifest['2021-04-16']})
+        self.assertEqual(set(), manifest['2021-04-17'])
+
+    def test_backfill_report1_resume(self):
+        """
+        Tests the backfill_report1 method resuming
+        after a failed batch
+        """
+        # Test init
+        xetra_backfill = Xetra_Backfill(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                        self.source_config, self.target_config,
+                                        self._backfill_config(1))
+        run_batch = xetra_backfill._run_batch
+        def run_batch_failing(batch):
+            if batch[0] == '2021-04-16':
+                raise ConnectionError
+            run_batch(batch)
+        with patch.object(xetra_backfill, '_run_batch', side_effect=run_batch_failing):
+            with self.assertRaises(ConnectionError):
+                xetra_backfill.backfill_report1('2021-04-15', '2021-04-18')
+        etags = {obj.key: obj.e_tag for obj in self.s3_bucket.objects.filter(Prefix='report1/')}
+        # Method execution
+        with patch.object(xetra_backfill, '_run_batch', side_effect=run_batch) as run_mock:
+            xetra_backfill.backfill_report1('2021-04-15', '2021-04-18')
+        # Test after method execution
+        self.assertEqual(['report1/date=2021-04-15/part.parquet'], list(etags))
+        run_mock.assert_called_once_with(['2021-04-16', '2021-04-17', '2021-04-18'])
+        etags_next = {obj.key: obj.e_tag
+                      for obj in self.s3_bucket.objects.filter(Prefix='report1/')}
+        self.assertEqual(etags['report1/date=2021-04-15/part.parquet'],
+                         etags_next['report1/date=2021-04-15/part.parquet'])
+        self.assertIn('report1/date=2021-04-16/part.parquet', etags_next)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,14 @@
 """TestXetraTransfomerMethods"""
 
 import os
+import tempfile
 import unittest
-from io import StringIO
+from io import StringIO, BytesIO
+from unittest.mock import patch
 from datetime import datetime, timedelta
 
 import boto3
+import numpy as np
 import pandas as pd
 from moto import mock_aws
 
@@ -15,8 +18,24 @@ sys.path.append("/Users/pashkrof/surfdrive_general/DITTLAB/Courses/Data pipeline
 
 from s3 import S3BucketConnector
 from meta_process import MetaProcess
+from metrics import MetricsSink
+from inventory import S3Inventory
 from constants import MetaProcessFormat
 from custom_exceptions import WrongMetaFileException
+from source_code.transformers.Xetra_transformer import Xetra_ETL, XetraBarsConfig, \
+    XetraReport, XetraSourceConfig, XetraTargetConfig
+
+
+class ListMetricsSink(MetricsSink):
+    """
+    Metrics sink collecting the records in a list
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def emit(self, record: dict):
+        self.records.append(record)
 
 
 class TestXetraETLMethods(unittest.TestCase):
@@ -52,7 +71,1008 @@ class TestXetraETLMethods(unittest.TestCase):
                                                 self.s3_bucket_name)
         self.dates = [(datetime.today().date() - timedelta(days=day))\
             .strftime(MetaProcessFormat.META_DATE_FORMAT.value) for day in range(8)]
+        # Creating a source bucket with Xetra files on the mocked s3
+        self.s3_src_bucket_name = 'src-bucket'
+        self.s3.create_bucket(Bucket=self.s3_src_bucket_name,
+                                  CreateBucketConfiguration={
+                                      'LocationConstraint': 'eu-central-1'})
+        self.s3_src_bucket = self.s3.Bucket(self.s3_src_bucket_name)
+        self.s3_bucket_src = S3BucketConnector(self.s3_access_key,
+                                               self.s3_secret_key,
+                                               self.s3_endpoint_url,
+                                               self.s3_src_bucket_name)
+        self.meta_key = 'meta.csv'
+        # Source and target configuration
+        conf_dict_src = {
+            'src_first_extract_date': '2021-04-15',
+            'src_columns': ['ISIN', 'Mnemonic', 'Date', 'Time', 'StartPrice',
+                            'EndPrice', 'MinPrice', 'MaxPrice', 'TradedVolume'],
+            'src_col_date': 'Date',
+            'src_col_isin': 'ISIN',
+            'src_col_time': 'Time',
+            'src_col_start_price': 'StartPrice',
+            'src_col_min_price': 'MinPrice',
+            'src_col_max_price': 'MaxPrice',
+            'src_col_traded_vol': 'TradedVolume'
+        }
+        conf_dict_trg = {
+            'trg_col_isin': 'isin',
+            'trg_col_date': 'date',
+            'trg_col_op_price': 'opening_price_eur',
+            'trg_col_clos_price': 'closing_price_eur',
+            'trg_col_min_price': 'minimum_price_eur',
+            'trg_col_max_price': 'maximum_price_eur',
+            'trg_col_dail_trad_vol': 'daily_traded_volume',
+            'trg_col_ch_prev_clos': 'change_prev_closing_%',
+            'trg_key': 'report1/xetra_daily_report1_',
+            'trg_key_date_format': '%Y%m%d_%H%M%S',
+            'trg_format': 'parquet'
+        }
+        self.source_config = XetraSourceConfig(**conf_dict_src)
+        self.target_config = XetraTargetConfig(**conf_dict_trg)
+        # Source files: two ISINs traded on two days, two hourly files per day
+        columns_src = ['ISIN', 'Mnemonic', 'Date', 'Time', 'StartPrice', 'EndPrice',
+                       'MinPrice', 'MaxPrice', 'TradedVolume']
+        self.src_files = {
+            '2021-04-15/2021-04-15_BINS_XETR12.csv': [
+                ['AT0000A0E9W5', 'SANT', '2021-04-15', '12:00', 20.19, 18.45, 18.20, 21.03, 1000],
+                ['AT0000A0E9W5', 'SANT', '2021-04-15', '12:01', 18.27, 21.19, 18.27, 21.34, 1000]],
+            '2021-04-15/2021-04-15_BINS_XETR13.csv': [
+                ['AT0000A0E9W5', 'SANT', '2021-04-15', '13:00', 20.21, 18.27, 18.21, 21.34, 1000],
+                ['AT0000A0E9W5', 'SANT', '2021-04-15', '13:01', 18.93, 20.17, 18.93, 21.34, 1000],
+                ['DE000A0DJ6J9', 'S92', '2021-04-15', '13:00', 45.33, 45.42, 45.33, 45.72, 300]],
+            '2021-04-16/2021-04-16_BINS_XETR12.csv': [
+                ['AT0000A0E9W5', 'SANT', '2021-04-16', '12:00', 19.16, 19.67, 19.02, 20.11, 2000],
+                ['DE000A0DJ6J9', 'S92', '2021-04-16', '12:00', 46.28, 46.35, 46.15, 46.51, 400]],
+            '2021-04-16/2021-04-16_BINS_XETR13.csv': [
+                ['DE000A0DJ6J9', 'S92', '2021-04-16', '13:01', 46.92, 47.01, 46.55, 47.13, 300],
+                ['AT0000A0E9W5', 'SANT', '2021-04-16', '13:00', 20.55, 20.91, 20.11, 21.03, 500],
+                ['DE000A0DJ6J9', 'S92', '2021-04-16', '13:00', 46.11, 46.88, 46.01, 46.91, 200]]
+        }
+        for key, rows in self.src_files.items():
+            self.s3_src_bucket.put_object(
+                Body=pd.DataFrame(rows, columns=columns_src).to_csv(index=False), Key=key)
 
     def tearDown(self):
         # mocking s3 connection stop
-        self.mock_s3.stop()
\ No newline at end of file
+        self.mock_s3.stop()
+
+    def test_plan_read_once(self):
+        """
+        Tests that the constructor does not access s3 and the
+        plan of the dates is read from the meta file once
+        """
+        # Expected results
+        extract_date_list_exp = [f'2021-04-{day}' for day in range(14, 25)]
+        # Test init
+        MetaProcess.update_meta_file(['2021-04-13'], self.meta_key, self.s3_bucket_meta)
+        requests = self.s3_bucket_meta.counters()['s3_requests']
+        # Method execution
+        with patch('source_code.transformers.Xetra_transformer.MetaProcess.return_date_list',
+                   wraps=MetaProcess.return_date_list) as return_date_list:
+            xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                  self.source_config, self.target_config)
+            requests_init = self.s3_bucket_meta.counters()['s3_requests']
+            xetra_etl.etl_report1()
+        # Test after method execution
+        self.assertEqual(requests, requests_init)
+        return_date_list.assert_called_once()
+        self.assertEqual('2021-04-14', xetra_etl.plan.extract_date)
+        self.assertEqual(extract_date_list_exp, xetra_etl.extract_date_list)
+        self.assertEqual(extract_date_list_exp,
+                         [str(date) for date in xetra_etl.meta_update_list])
+
+    def test_extract_concurrent_same_as_serial(self):
+        """
+        Tests the extract method with several requests in flight
+        against the serial extraction
+        """
+        # Expected results
+        xetra_etl_serial = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                     self.source_config, self.target_config)
+        df_exp = xetra_etl_serial.extract()
+        # Test init
+        source_config = self.source_config._replace(src_max_concurrency=4)
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              source_config, self.target_config)
+        # Method execution
+        df_result = xetra_etl.extract()
+        # Test after method execution
+        self.assertEqual(df_exp.shape[0], sum(len(rows) for rows in self.src_files.values()))
+        self.assertTrue(df_exp.equals(df_result))
+
+    def test_extract_no_files(self):
+        """
+        Tests the extract method when there are no source files
+        in the extraction window
+        """
+        # Test init
+        source_config = self.source_config._replace(src_first_extract_date='2020-01-01',
+                                                    src_max_concurrency=4)
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              source_config, self.target_config)
+        # Method execution
+        df_result = xetra_etl.extract()
+        # Test after method execution
+        self.assertTrue(df_result.empty)
+
+    def test_transform_report1_streaming_same_as_in_memory(self):
+        """
+        Tests the transform_report1_streaming method against the
+        in-memory extraction and transformation
+        """
+        # Test init
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config, self.target_config)
+        # Expected results
+        df_exp = xetra_etl.transform_report1(xetra_etl.extract())
+        # Method execution
+        df_result = xetra_etl.transform_report1_streaming()
+        # Test after method execution
+        self.assertEqual(df_exp.shape, (4, 8))
+        pd.testing.assert_frame_equal(df_exp, df_result)
+
+    def test_merge_report1_partials_in_batches(self):
+        """
+        Tests the merge_report1_partials method when the partials
+        are combined in several batches
+        """
+        # Test init
+        source_config = self.source_config._replace(src_max_concurrency=2)
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              source_config, self.target_config)
+        df_exp = xetra_etl.transform_report1(xetra_etl.extract())
+        partials = [xetra_etl.transform_report1_partial(frame)
+                    for frame in xetra_etl._iter_source_frames()]
+        # Method execution
+        with patch('source_code.transformers.Xetra_transformer._PARTIAL_MERGE_BATCH', 2):
+            df_result = xetra_etl.merge_report1_partials(partials)
+        # Test after method execution
+        pd.testing.assert_frame_equal(df_exp, df_result)
+
+    def test_extract_typed_read(self):
+        """
+        Tests the extract and transform_report1 methods with
+        the typed read of the source files
+        """
+        # Test init
+        xetra_etl_untyped = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                      self.source_config, self.target_config)
+        source_config = self.source_config._replace(src_typed_read=True)
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              source_config, self.target_config)
+        # Expected results
+        df_exp = xetra_etl_untyped.transform_report1(xetra_etl_untyped.extract())
+        # Method execution
+        df_extract = xetra_etl.extract()
+        df_result = xetra_etl.transform_report1(df_extract)
+        df_stream_result = xetra_etl.transform_report1_streaming()
+        # Test after method execution
+        for column in ['ISIN', 'Mnemonic', 'Date', 'Time']:
+            self.assertIsInstance(df_extract[column].dtype, pd.CategoricalDtype)
+        self.assertEqual(['AT0000A0E9W5', 'DE000A0DJ6J9'],
+                         list(df_extract['ISIN'].cat.categories))
+        pd.testing.assert_frame_equal(df_exp, df_result)
+        pd.testing.assert_frame_equal(df_exp, df_stream_result)
+
+    def test_extract_arrow_engine(self):
+        """
+        Tests the extract and transform_report1 methods with
+        the Arrow CSV engine
+        """
+        # Test init
+        xetra_etl_pandas = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                     self.source_config, self.target_config)
+        # Expected results
+        df_exp = xetra_etl_pandas.transform_report1(xetra_etl_pandas.extract())
+        for typed_read in [False, True]:
+            source_config = self.source_config._replace(src_engine='arrow',
+                                                        src_typed_read=typed_read,
+                                                        src_max_concurrency=2)
+            xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                  source_config, self.target_config)
+            # Method execution
+            df_extract = xetra_etl.extract()
+            df_result = xetra_etl.transform_report1(df_extract)
+            df_stream_result = xetra_etl.transform_report1_streaming()
+            # Test after method execution
+            self.assertEqual(self.source_config.src_columns, list(df_extract.columns))
+            pd.testing.assert_frame_equal(df_exp, df_result)
+            pd.testing.assert_frame_equal(df_exp, df_stream_result)
+
+    def test_extract_raw_staging(self):
+        """
+        Tests the extract and transform_report1 methods with the raw staging
+        in a local directory and in the target bucket, reading the staged
+        dates after the source files are gone
+        """
+        # Test init
+        xetra_etl_csv = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                  self.source_config, self.target_config)
+        # Expected results
+        df_exp = xetra_etl_csv.transform_report1(xetra_etl_csv.extract())
+        with tempfile.TemporaryDirectory() as stage_dir:
+            stage_configs = [{'src_stage_dir': stage_dir},
+                             {'src_stage_key': 'staging/xetra/date='}]
+            for stage_config in stage_configs:
+                source_config = self.source_config._replace(src_max_concurrency=2,
+                                                            **stage_config)
+                xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                      source_config, self.target_config)
+                # Method execution
+                df_result = xetra_etl.transform_report1(xetra_etl.extract())
+                # Test after method execution
+                pd.testing.assert_frame_equal(df_exp, df_result)
+                self.assertEqual(
+                    ['AT0000A0E9W5', 'DE000A0DJ6J9'],
+                    xetra_etl.read_staged('2021-04-15', columns=['ISIN'])['ISIN']\
+                        .unique().to_pylist())
+                staged = xetra_etl.read_staged('2021-04-16',
+                                               filters=[('ISIN', '=', 'DE000A0DJ6J9')])
+                self.assertEqual(['12:00', '13:00', '13:01'], staged['Time'].to_pylist())
+            self.assertEqual(['staging/xetra/date=2021-04-15/part.parquet',
+                              'staging/xetra/date=2021-04-16/part.parquet'],
+                             self.s3_bucket_meta.list_files_in_prefix('staging/'))
+            # Reading the staged dates only
+            for key in self.src_files:
+                self.s3_src_bucket.Object(key).delete()
+            for stage_config in stage_configs:
+                for typed_read, engine in [(False, 'pandas'), (True, 'pandas'), (True, 'arrow')]:
+                    source_config = self.source_config._replace(
+                        src_typed_read=typed_read, src_engine=engine, **stage_config)
+                    xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta,
+                                          self.meta_key, source_config, self.target_config)
+                    df_result = xetra_etl.transform_report1(xetra_etl.extract())
+                    df_stream_result = xetra_etl.transform_report1_streaming()
+                    pd.testing.assert_frame_equal(df_exp, df_result)
+                    pd.testing.assert_frame_equal(df_exp, df_stream_result)
+
+    def test_extract_raw_staging_today(self):
+        """
+        Tests the extract method with the raw staging
+        not staging today's source files
+        """
+        # Test init
+        today = datetime.today().strftime(MetaProcessFormat.META_DATE_FORMAT.value)
+        key = f'{today}/{today}_BINS_XETR12.csv'
+        self.s3_src_bucket.put_object(Body=self.s3_src_bucket.Object(
+            '2021-04-15/2021-04-15_BINS_XETR12.csv').get()['Body'].read(), Key=key)
+        source_config = self.source_config._replace(src_stage_key='staging/xetra/date=')
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              source_config, self.target_config, extract_dates=[today])
+        # Method execution
+        df_result = xetra_etl.extract()
+        # Test after method execution
+        self.assertEqual(2, len(df_result))
+        self.assertEqual([], self.s3_bucket_meta.list_files_in_prefix('staging/'))
+
+    def test_etl_report1_full(self):
+        """
+        Tests the etl_report1 method writing the report
+        to one target file and updating the meta file
+        """
+        # Test init
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config, self.target_config)
+        df_exp = xetra_etl.transform_report1(xetra_etl.extract())
+        # Method execution
+        result = xetra_etl.etl_report1()
+        # Test after method execution
+        self.assertTrue(result)
+        keys = [obj.key for obj in self.s3_bucket.objects.filter(Prefix='report1/')]
+        self.assertEqual(1, len(keys))
+        self.assertTrue(keys[0].startswith(self.target_config.trg_key))
+        df_result = pd.read_parquet(BytesIO(
+            self.s3_bucket.Object(key=keys[0]).get().get('Body').read()))
+        pd.testing.assert_frame_equal(df_exp, df_result, check_dtype=False)
+        df_meta = pd.read_csv(StringIO(
+            self.s3_bucket.Object(key=self.meta_key).get().get('Body').read().decode('utf-8')))
+        self.assertIn('2021-04-16', list(df_meta[MetaProcessFormat.META_SOURCE_DATE_COL.value]))
+
+    def test_etl_report1_partitioned(self):
+        """
+        Tests the etl_report1 method writing one partition per trade date
+        and rewriting only the new dates in the next run
+        """
+        # Test init
+        target_config = self.target_config._replace(trg_write_mode='partitioned')
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config, target_config)
+        # Method execution
+        xetra_etl.etl_report1()
+        # Test after method execution
+        keys_exp = ['report1/date=2021-04-15/part.parquet', 'report1/date=2021-04-16/part.parquet']
+        objects = {obj.key: obj.e_tag for obj in self.s3_bucket.objects.filter(Prefix='report1/')}
+        self.assertEqual(keys_exp, sorted(objects))
+        df_result = pd.read_parquet(BytesIO(
+            self.s3_bucket.Object(key=keys_exp[1]).get().get('Body').read()))
+        self.assertEqual(['2021-04-16'] * 2, list(df_result['Date']))
+        # Next run with a new trade date
+        df_new = pd.read_csv(StringIO(self.s3_src_bucket.Object(
+            key='2021-04-16/2021-04-16_BINS_XETR12.csv').get().get('Body').read().decode('utf-8')))
+        df_new['Date'] = '2021-04-26'
+        self.s3_src_bucket.put_object(Body=df_new.to_csv(index=False),
+                                      Key='2021-04-26/2021-04-26_BINS_XETR12.csv')
+        self.s3_bucket.put_object(Body=b'changed', Key=keys_exp[0])
+        source_config = self.source_config._replace(src_first_extract_date='2021-04-25')
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              source_config, target_config)
+        xetra_etl.etl_report1()
+        objects_next = {obj.key: obj.e_tag
+                        for obj in self.s3_bucket.objects.filter(Prefix='report1/')}
+        self.assertEqual(keys_exp + ['report1/date=2021-04-26/part.parquet'],
+                         sorted(objects_next))
+        self.assertEqual(objects[keys_exp[1]], objects_next[keys_exp[1]])
+        self.assertEqual(b'changed',
+                         self.s3_bucket.Object(key=keys_exp[0]).get().get('Body').read())
+
+    def test_etl_report1_manifest_change_detection(self):
+        """
+        Tests the etl_report1 method processing a date again only
+        after its source files changed
+        """
+        # Expected results
+        dates_exp = [f'2021-04-{day}' for day in range(14, 25)]
+        # Test init
+        manifest_key = 'manifest.csv'
+        target_config = self.target_config._replace(trg_write_mode='partitioned')
+        partition_key = 'report1/date=2021-04-15/part.parquet'
+        # Method execution
+        Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key, self.source_config,
+                  target_config, manifest_key=manifest_key, change_lookback_days=10).etl_report1()
+        manifest = MetaProcess.return_manifest(manifest_key, self.s3_bucket_meta)
+        e_tag = self.s3_bucket.Object(key=partition_key).e_tag
+        xetra_etl_unchanged = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                        self.source_config, target_config,
+                                        manifest_key=manifest_key, change_lookback_days=10)
+        xetra_etl_unchanged.etl_report1()
+        e_tag_unchanged = self.s3_bucket.Object(key=partition_key).e_tag
+        # A corrected source file arrives for 2021-04-15
+        key = '2021-04-15/2021-04-15_BINS_XETR13.csv'
+        df_corrected = pd.read_csv(StringIO(self.s3_src_bucket.Object(
+            key=key).get().get('Body').read().decode('utf-8')))
+        df_corrected['StartPrice'] = 30.0
+        self.s3_src_bucket.put_object(Body=df_corrected.to_csv(index=False), Key=key)
+        # 2021-04-15 is before the lookback window of 5 days up to 2021-04-24
+        changed_dates_lookback = Xetra_ETL(
+            self.s3_bucket_src, self.s3_bucket_meta, self.meta_key, self.source_config,
+            target_config, manifest_key=manifest_key, change_lookback_days=5).plan.changed_dates
+        xetra_etl_changed = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                      self.source_config, target_config,
+                                      manifest_key=manifest_key, change_lookback_days=10)
+        xetra_etl_changed.etl_report1()
+        # Test after method execution
+        self.assertEqual(dates_exp, sorted(manifest))
+        self.assertEqual(set(), manifest['2021-04-14'])
+        self.assertEqual({key for key in self.src_files if key.startswith('2021-04-15')},
+                         {file[0] for file in manifest['2021-04-15']})
+        self.assertEqual([], xetra_etl_unchanged.meta_update_list)
+        self.assertEqual([], changed_dates_lookback)
+        self.assertEqual(e_tag, e_tag_unchanged)
+        self.assertEqual(['2021-04-15'], xetra_etl_changed.plan.changed_dates)
+        self.assertEqual(['2021-04-14', '2021-04-15', '2021-04-16'],
+                         xetra_etl_changed.extract_date_list)
+        self.assertEqual(['2021-04-15', '2021-04-16'],
+                         [str(date) for date in xetra_etl_changed.meta_update_list])
+        df_result = pd.read_parquet(BytesIO(
+            self.s3_bucket.Object(key=partition_key).get().get('Body').read()))
+        self.assertEqual([30.0, 30.0], list(df_result['closing_price_eur']))
+        self.assertEqual([], Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                       self.source_config, target_config,
+                                       manifest_key=manifest_key,
+                                       change_lookback_days=10).plan.changed_dates)
+
+    def test_etl_report1_changed_date_after_gap(self):
+        """
+        Tests the etl_report1 method processing a changed date again whose previous
+        day had no trades, with the previous closing price of the previous trading day
+        """
+        # Expected results
+        change_exp = [15.0, 4.35]
+        # Test init
+        manifest_key = 'manifest.csv'
+        last_close_key = 'last_close.csv'
+        source_config = self.source_config._replace(src_first_extract_date='2021-04-16')
+        target_config = self.target_config._replace(trg_write_mode='partitioned')
+        columns_src = ['ISIN', 'Mnemonic', 'Date', 'Time', 'StartPrice', 'EndPrice',
+                       'MinPrice', 'MaxPrice', 'TradedVolume']
+        self.s3_src_bucket.objects.all().delete()
+        # Trades on Friday, Monday and Tuesday, none on the weekend
+        for date, price in [('2021-04-16', 10.0), ('2021-04-19', 11.0), ('2021-04-20', 12.0)]:
+            self.s3_src_bucket.put_object(
+                Body=pd.DataFrame([['AT0000A0E9W5', 'SANT', date, '12:00', price, price,
+                                    price, price, 1000]], columns=columns_src).to_csv(index=False),
+                Key=f'{date}/{date}_BINS_XETR12.csv')
+        Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key, source_config,
+                  target_config, last_close_key=last_close_key, manifest_key=manifest_key,
+                  change_lookback_days=10).etl_report1()
+        # A corrected source file arrives for Monday
+        self.s3_src_bucket.put_object(
+            Body=pd.DataFrame([['AT0000A0E9W5', 'SANT', '2021-04-19', '12:00', 11.5, 11.5,
+                                11.5, 11.5, 1000]], columns=columns_src).to_csv(index=False),
+            Key='2021-04-19/2021-04-19_BINS_XETR12.csv')
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              source_config, target_config, last_close_key=last_close_key,
+                              manifest_key=manifest_key, change_lookback_days=10)
+        # Method execution
+        xetra_etl.etl_report1()
+        # Test after method execution
+        self.assertEqual(['2021-04-19'], xetra_etl.plan.changed_dates)
+        self.assertEqual('2021-04-16', xetra_etl.extract_date_list[0])
+        self.assertEqual(['2021-04-19', '2021-04-20'],
+                         [str(date) for date in xetra_etl.meta_update_list])
+        change_result = []
+        for date in ['2021-04-19', '2021-04-20']:
+            df_result = pd.read_parquet(BytesIO(self.s3_bucket.Object(
+                key=f'report1/date={date}/part.parquet').get().get('Body').read()))
+            change_result.extend(df_result['change_prev_closing_%'])
+        self.assertEqual(change_exp, change_result)
+
+    def test_plan_change_detection_dry_run(self):
+        """
+        Tests that planning a dry run detects changed source files
+        without updating the inventory of the source connector
+        """
+        # Test init
+        manifest_key = 'manifest.csv'
+        MetaProcess.update_meta_file(['2021-04-15'], self.meta_key, self.s3_bucket_meta)
+        MetaProcess.update_manifest({'2021-04-15': []}, manifest_key, self.s3_bucket_meta)
+        with tempfile.TemporaryDirectory() as inventory_dir:
+            inventory_path = os.path.join(inventory_dir, 'inventory.json')
+            s3_bucket_src = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                              self.s3_endpoint_url, self.s3_src_bucket_name,
+                                              inventory=S3Inventory(inventory_path))
+            # Method execution
+            xetra_etl_dry_run = Xetra_ETL(s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                          self.source_config, self.target_config,
+                                          manifest_key=manifest_key, dry_run=True)
+            changed_dates_dry_run = xetra_etl_dry_run.plan.changed_dates
+            inventory_exists_dry_run = os.path.exists(inventory_path)
+            xetra_etl = Xetra_ETL(s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                  self.source_config, self.target_config,
+                                  manifest_key=manifest_key)
+            changed_dates = xetra_etl.plan.changed_dates
+            # Test after method execution
+            self.assertEqual(['2021-04-15'], changed_dates_dry_run)
+            self.assertFalse(inventory_exists_dry_run)
+            self.assertEqual(['2021-04-15'], changed_dates)
+            self.assertEqual(2, len(S3Inventory(inventory_path).objects(
+                self.s3_src_bucket_name, '2021-04-15')))
+
+    def _volume_report(self, xetra_etl: Xetra_ETL, loaded: dict):
+        """
+        Report with the traded volume per Mnemonic for the report registry tests
+        """
+        def transform(data_frame):
+            return data_frame.groupby('Mnemonic', as_index=False, observed=True)\
+                ['TradedVolume'].sum()
+        def load(data_frame):
+            loaded['volume'] = data_frame
+            xetra_etl.write_report(data_frame, 'volume/volume_', 'volume/date=')
+        return XetraReport(name='volume', columns=['Mnemonic', 'TradedVolume'],
+                           transform=transform, load=load)
+
+    def test_etl_reports_one_extraction(self):
+        """
+        Tests the etl_reports method creating report 1 and a second
+        report from one extraction
+        """
+        # Expected results
+        xetra_etl_report1 = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                      self.source_config, self.target_config)
+        df_report1_exp = xetra_etl_report1.transform_report1(xetra_etl_report1.extract())
+        df_volume_exp = pd.DataFrame({'Mnemonic': ['S92', 'SANT'],
+                                      'TradedVolume': [1200, 6500]})
+        # Test init
+        sink = ListMetricsSink()
+        loaded = {}
+        s3_bucket_src = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                          self.s3_endpoint_url, self.s3_src_bucket_name,
+                                          metrics=sink)
+        xetra_etl = Xetra_ETL(s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config, self.target_config, metrics=sink)
+        xetra_etl.register_report(xetra_etl.report1())
+        xetra_etl.register_report(self._volume_report(xetra_etl, loaded))
+        # Method execution
+        xetra_etl.etl_reports()
+        # Test after method execution
+        stages = [record['stage'] for record in sink.records]
+        self.assertEqual(1, stages.count('extract'))
+        self.assertEqual(len(self.src_files), stages.count('read_csv_to_df'))
+        self.assertEqual(2, stages.count('load_report'))
+        self.assertEqual(1, stages.count('meta_update_meta_file'))
+        report1_keys = [obj.key for obj in self.s3_bucket.objects.filter(Prefix='report1/')]
+        volume_keys = [obj.key for obj in self.s3_bucket.objects.filter(Prefix='volume/')]
+        self.assertEqual(1, len(report1_keys))
+        self.assertEqual(1, len(volume_keys))
+        df_report1 = pd.read_parquet(BytesIO(
+            self.s3_bucket.Object(key=report1_keys[0]).get().get('Body').read()))
+        pd.testing.assert_frame_equal(df_report1_exp, df_report1)
+        pd.testing.assert_frame_equal(df_volume_exp, loaded['volume'])
+        self.assertEqual(11, len(MetaProcess.return_meta_data(self.meta_key,
+                                                              self.s3_bucket_meta)))
+
+    def test_etl_reports_streaming(self):
+        """
+        Tests the etl_reports method creating report 1 with the streaming
+        and Arrow-native paths if no report is registered, and refusing
+        these paths for registered reports
+        """
+        # Expected results
+        xetra_etl_report1 = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                      self.source_config, self.target_config)
+        df_report1_exp = xetra_etl_report1.transform_report1(xetra_etl_report1.extract())
+        for option in ['src_streaming', 'src_arrow_native']:
+            with self.subTest(option=option):
+                # Test init
+                self.s3_bucket.objects.all().delete()
+                source_config = self.source_config._replace(**{option: True})
+                xetra_etl_registered = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta,
+                                                 self.meta_key, source_config,
+                                                 self.target_config)
+                xetra_etl_registered.register_report(xetra_etl_registered.report1())
+                xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                      source_config, self.target_config)
+                # Method execution
+                with self.assertRaises(ValueError):
+                    xetra_etl_registered.etl_reports()
+                keys_registered = list(self.s3_bucket.objects.all())
+                with patch.object(Xetra_ETL, 'extract', side_effect=AssertionError):
+                    xetra_etl.etl_reports()
+                # Test after method execution
+                self.assertEqual([], keys_registered)
+                report1_keys = [obj.key
+                                for obj in self.s3_bucket.objects.filter(Prefix='report1/')]
+                self.assertEqual(1, len(report1_keys))
+                df_report1 = pd.read_parquet(BytesIO(
+                    self.s3_bucket.Object(key=report1_keys[0]).get().get('Body').read()))
+                pd.testing.assert_frame_equal(df_report1_exp, df_report1, check_dtype=False)
+
+    def test_etl_reports_column_projection(self):
+        """
+        Tests the extract method reading only the columns
+        of the registered reports
+        """
+        # Test init
+        loaded = {}
+        for engine in ['pandas', 'arrow']:
+            source_config = self.source_config._replace(src_typed_read=True,
+                                                        src_engine=engine)
+            xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                  source_config, self.target_config)
+            xetra_etl.register_report(self._volume_report(xetra_etl, loaded))
+            # Method execution
+            df_result = xetra_etl.extract()
+            # Test after method execution
+            self.assertEqual(['Mnemonic', 'TradedVolume'], list(df_result.columns))
+            self.assertEqual(10, len(df_result))
+
+    def test_register_report_unknown_columns(self):
+        """
+        Tests the register_report method with a column
+        that is not a source column
+        """
+        # Test init
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config, self.target_config)
+        report = XetraReport(name='vwap', columns=['ISIN', 'Turnover'],
+                             transform=lambda data_frame: data_frame, load=lambda data_frame: None)
+        # Method execution
+        with self.assertRaises(ValueError):
+            xetra_etl.register_report(report)
+        # Test after method execution
+        self.assertEqual({}, xetra_etl.reports)
+
+    def _bars_groupby(self, data_frame: pd.DataFrame, interval: int):
+        """
+        Bars of the source data calculated with a sort and a groupby
+        per bar as reference for the bars report tests
+        """
+        data_frame = data_frame.sort_values(by=['ISIN', 'Date', 'Time'], kind='stable')
+        minutes = data_frame['Time'].str[:2].astype(int) * 60 + data_frame['Time'].str[3:].astype(int)
+        bar_minutes = minutes // interval * interval
+        data_frame['bar_start'] = (bar_minutes // 60).map('{:02d}'.format) + ':'\
+            + (bar_minutes % 60).map('{:02d}'.format)
+        return data_frame.groupby(['ISIN', 'Date', 'bar_start'], as_index=False).agg(
+            opening_price_eur=('StartPrice', 'first'),
+            maximum_price_eur=('MaxPrice', 'max'),
+            minimum_price_eur=('MinPrice', 'min'),
+            closing_price_eur=('EndPrice', 'last'),
+            traded_volume=('TradedVolume', 'sum'))
+
+    def test_transform_bars_same_as_groupby(self):
+        """
+        Tests the transform_bars method against a groupby per bar
+        for several bar lengths and typed reads
+        """
+        # Test init
+        source_config = self.source_config._replace(src_col_end_price='EndPrice')
+        for interval in [1, 5, 60]:
+            for typed_read in [False, True]:
+                with self.subTest(interval=interval, typed_read=typed_read):
+                    xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta,
+                                          self.meta_key,
+                                          source_config._replace(src_typed_read=typed_read),
+                                          self.target_config)
+                    df_extract = xetra_etl.extract()
+                    # Expected results
+                    df_exp = self._bars_groupby(pd.DataFrame(
+                        [row for rows in self.src_files.values() for row in rows],
+                        columns=self.source_config.src_columns), interval)
+                    # Method execution
+                    df_result = xetra_etl.transform_bars(
+                        df_extract, XetraBarsConfig(bars_interval_minutes=interval))
+                    # Test after method execution
+                    pd.testing.assert_frame_equal(df_exp, df_result, check_dtype=False)
+
+    def test_transform_bars_hourly(self):
+        """
+        Tests the transform_bars method with hourly bars
+        closing on the last starting price
+        """
+        # Expected results
+        df_exp = pd.DataFrame({
+            'ISIN': ['AT0000A0E9W5'] * 4 + ['DE000A0DJ6J9'] * 3,
+            'Date': ['2021-04-15', '2021-04-15', '2021-04-16', '2021-04-16',
+                     '2021-04-15', '2021-04-16', '2021-04-16'],
+            'bar_start': ['12:00', '13:00', '12:00', '13:00', '13:00', '12:00', '13:00'],
+            'opening_price_eur': [20.19, 20.21, 19.16, 20.55, 45.33, 46.28, 46.11],
+            'maximum_price_eur': [21.34, 21.34, 20.11, 21.03, 45.72, 46.51, 47.13],
+            'minimum_price_eur': [18.20, 18.21, 19.02, 20.11, 45.33, 46.15, 46.01],
+            'closing_price_eur': [18.27, 18.93, 19.16, 20.55, 45.33, 46.28, 46.92],
+            'traded_volume': [2000, 2000, 2000, 500, 300, 400, 500]})
+        # Test init
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config, self.target_config)
+        # Method execution
+        df_result = xetra_etl.transform_bars(xetra_etl.extract(), XetraBarsConfig())
+        df_empty = xetra_etl.transform_bars(pd.DataFrame(), XetraBarsConfig())
+        # Test after method execution
+        pd.testing.assert_frame_equal(df_exp, df_result)
+        self.assertEqual(list(df_exp.columns), list(df_empty.columns))
+        self.assertTrue(df_empty.empty)
+
+    def test_etl_reports_bars_partitioned(self):
+        """
+        Tests the etl_reports method writing report 1 and
+        the bars partitioned per trade date
+        """
+        # Test init
+        target_config = self.target_config._replace(trg_write_mode='partitioned')
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config, target_config)
+        xetra_etl.register_report(xetra_etl.report1())
+        xetra_etl.register_report(xetra_etl.bars_report(XetraBarsConfig()))
+        # Method execution
+        xetra_etl.etl_reports()
+        # Test after method execution
+        keys_exp = ['bars/date=2021-04-15/part.parquet', 'bars/date=2021-04-16/part.parquet',
+                    'report1/date=2021-04-15/part.parquet', 'report1/date=2021-04-16/part.parquet']
+        self.assertEqual(keys_exp, sorted(obj.key for obj in self.s3_bucket.objects.all()
+                                          if obj.key != self.meta_key))
+        df_bars = pd.read_parquet(BytesIO(
+            self.s3_bucket.Object(key=keys_exp[1]).get().get('Body').read()))
+        self.assertEqual(['12:00', '13:00', '12:00', '13:00'], list(df_bars['bar_start']))
+
+    def test_etl_reports_bars_transform_workers(self):
+        """
+        Tests the etl_reports method writing report 1 and the bars with
+        several transform worker processes, the registered reports are not
+        sent to the workers
+        """
+        # Expected results
+        xetra_etl_single = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                     self.source_config, self.target_config)
+        df_exp = xetra_etl_single.transform_report1(xetra_etl_single.extract())
+        # Test init
+        target_config = self.target_config._replace(trg_write_mode='partitioned')
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config._replace(src_transform_workers=2),
+                              target_config)
+        xetra_etl.register_report(xetra_etl.report1())
+        xetra_etl.register_report(xetra_etl.bars_report(XetraBarsConfig()))
+        # Method execution
+        xetra_etl.etl_reports()
+        # Test after method execution
+        df_report1 = pd.concat([pd.read_parquet(BytesIO(
+            self.s3_bucket.Object(key=f'report1/date={date}/part.parquet').get()\
+                .get('Body').read())) for date in ('2021-04-15', '2021-04-16')],
+                               ignore_index=True)
+        self.assertTrue(df_exp.sort_values(['Date', 'ISIN'], ignore_index=True)\
+            .equals(df_report1))
+        self.assertEqual(['bars', 'report1'], sorted(xetra_etl.reports))
+
+    def test_etl_report1_metrics(self):
+        """
+        Tests the etl_report1 method emitting the metrics of
+        the stages and the s3 requests
+        """
+        # Test init
+        sink = ListMetricsSink()
+        s3_bucket_src = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                          self.s3_endpoint_url, self.s3_src_bucket_name,
+                                          metrics=sink)
+        xetra_etl = Xetra_ETL(s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config, self.target_config, metrics=sink)
+        # Method execution
+        xetra_etl.etl_report1()
+        # Test after method execution
+        records = {}
+        for record in sink.records:
+            records.setdefault(record['stage'], []).append(record)
+        self.assertEqual(4, len(records['read_csv_to_df']))
+        bytes_exp = sum(self.s3_src_bucket.Object(key=key).content_length
+                        for key in self.src_files)
+        self.assertEqual(bytes_exp, sum(record['bytes_read']
+                                        for record in records['read_csv_to_df']))
+        self.assertTrue(all(record['s3_requests'] == 1 for record in records['read_csv_to_df']))
+        extract = records['extract'][0]
+        self.assertEqual(10, extract['rows_out'])
+        self.assertEqual(bytes_exp, extract['bytes_read'])
+        self.assertEqual(1, len(records['list_objects_in_prefixes']))
+        self.assertEqual(5, extract['s3_requests'])
+        self.assertEqual(10, records['transform_report1'][0]['rows_in'])
+        self.assertEqual(4, records['transform_report1'][0]['rows_out'])
+        self.assertEqual(4, records['load'][0]['rows_in'])
+        for stage in ['meta_return_date_list', 'meta_update_meta_file']:
+            self.assertEqual('ok', records[stage][0]['status'])
+        self.assertEqual(s3_bucket_src.counters()['bytes_read'], bytes_exp)
+
+    def test_etl_report1_last_close_carried_forward(self):
+        """
+        Tests the etl_report1 method seeding the change to the previous
+        closing price from the last close file instead of extracting
+        the previous day again
+        """
+        # Expected results
+        xetra_etl_full = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                   self.source_config, self.target_config)
+        df_full = xetra_etl_full.transform_report1(xetra_etl_full.extract())
+        df_exp = df_full[df_full['Date'] == '2021-04-16'].reset_index(drop=True)
+        # Test init: 2021-04-15 was processed by the previous run
+        last_close_key = 'last_close.csv'
+        MetaProcess.update_last_close(
+            df_full[df_full['Date'] == '2021-04-15'][
+                ['ISIN', 'Date', 'opening_price_eur', 'closing_price_eur']],
+            'ISIN', 'Date', last_close_key, self.s3_bucket_meta)
+        MetaProcess.update_meta_file(['2021-04-14', '2021-04-15'], self.meta_key,
+                                     self.s3_bucket_meta)
+        source_config = self.source_config._replace(src_first_extract_date='2021-04-16')
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              source_config, self.target_config, last_close_key=last_close_key)
+        # Method execution
+        df_extract = xetra_etl.extract()
+        df_result = xetra_etl.transform_report1(df_extract)
+        xetra_etl.load(df_result)
+        # Test after method execution
+        self.assertEqual({'2021-04-16'}, set(df_extract['Date']))
+        pd.testing.assert_frame_equal(df_exp, df_result)
+        df_last_close = MetaProcess.return_last_close(last_close_key, self.s3_bucket_meta)
+        self.assertEqual(['2021-04-16'] * 2, list(df_last_close['Date']))
+
+    def test_transform_report1_same_as_legacy(self):
+        """
+        Tests the transform_report1 method against the legacy
+        implementation on unsorted source data with missing values
+        """
+        # Test init
+        rng = np.random.default_rng(42)
+        rows = 5000
+        df_src = pd.DataFrame({
+            'ISIN': rng.choice([f'DE000000{i:04d}' for i in range(50)], rows),
+            'Mnemonic': 'MNEM',
+            'Date': rng.choice(['2021-04-14', '2021-04-15', '2021-04-16'], rows),
+            'Time': [f'{hour:02d}:{minute:02d}' for hour, minute in
+                     zip(rng.integers(8, 18, rows), rng.integers(0, 60, rows))],
+            'StartPrice': rng.uniform(10, 100, rows).round(4),
+            'EndPrice': rng.uniform(10, 100, rows).round(4),
+            'MinPrice': rng.uniform(10, 100, rows).round(4),
+            'MaxPrice': rng.uniform(10, 100, rows).round(4),
+            'TradedVolume': rng.integers(0, 10000, rows)
+        }).drop_duplicates(subset=['ISIN', 'Date', 'Time'], ignore_index=True)
+        df_src.loc[rng.choice(len(df_src), 50), 'StartPrice'] = np.nan
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config, self.target_config)
+        # Expected results
+        df_exp = xetra_etl.transform_report1(df_src.copy(), legacy=True)
+        # Method execution
+        df_result = xetra_etl.transform_report1(df_src.copy())
+        # Test after method execution
+        self.assertEqual(df_exp.shape[0], 150)
+        pd.testing.assert_frame_equal(df_exp, df_result)
+
+    def test_transform_report1_end_price(self):
+        """
+        Tests the transform_report1 method taking the closing price from
+        the last end price in all transformation paths
+        """
+        # Expected results
+        closing_exp = [20.17, 20.91, 45.42, 47.01]
+        # Test init
+        source_config = self.source_config._replace(src_col_end_price='EndPrice')
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              source_config, self.target_config)
+        df_extract = xetra_etl.extract()
+        # Method execution
+        df_result = xetra_etl.transform_report1(df_extract)
+        df_legacy = xetra_etl.transform_report1(df_extract, legacy=True)
+        df_streaming = xetra_etl.transform_report1_streaming()
+        df_extract_typed = Xetra_ETL(
+            self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+            source_config._replace(src_typed_read=True), self.target_config).extract()
+        df_typed = xetra_etl.transform_report1(df_extract_typed)
+        # Test after method execution
+        self.assertEqual(closing_exp, list(df_result['closing_price_eur']))
+        pd.testing.assert_frame_equal(df_result, df_legacy)
+        pd.testing.assert_frame_equal(df_result, df_streaming)
+        pd.testing.assert_frame_equal(df_result, df_typed)
+        self.assertEqual('float64', df_extract_typed['EndPrice'].dtype)
+
+    def test_transform_report1_table_same_as_pandas(self):
+        """
+        Tests the transform_report1_table method against transform_report1
+        for plain and typed reads, with and without end price and last close file
+        """
+        # Test init
+        last_close_key = 'last_close.csv'
+        MetaProcess.update_last_close(pd.DataFrame({
+            'ISIN': ['AT0000A0E9W5'], 'Date': ['2021-04-13'],
+            'opening_price_eur': [19.5], 'closing_price_eur': [19.7]}),
+            'ISIN', 'Date', last_close_key, self.s3_bucket_meta)
+        for typed_read in [False, True]:
+            for end_price in [None, 'EndPrice']:
+                for key in [None, last_close_key]:
+                    with self.subTest(typed_read=typed_read, end_price=end_price, key=key):
+                        source_config = self.source_config._replace(
+                            src_engine='arrow', src_typed_read=typed_read,
+                            src_col_end_price=end_price)
+                        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta,
+                                              self.meta_key, source_config, self.target_config,
+                                              last_close_key=key)
+                        # Expected results
+                        df_exp = xetra_etl.transform_report1(xetra_etl.extract())
+                        # Method execution
+                        table_result = xetra_etl.transform_report1_table(
+                            xetra_etl.extract_table())
+                        # Test after method execution
+                        pd.testing.assert_frame_equal(df_exp, table_result.to_pandas())
+                        self.assertEqual(key is None,
+                                         np.isnan(df_exp['change_prev_closing_%'].iloc[0]))
+
+    def test_etl_report1_arrow_native(self):
+        """
+        Tests the etl_report1 method with the arrow native path writing
+        the same report as the pandas path
+        """
+        for write_mode in ['full', 'partitioned']:
+            with self.subTest(write_mode=write_mode):
+                target_config = self.target_config._replace(trg_write_mode=write_mode)
+                reports = {}
+                for arrow_native in [False, True]:
+                    # Test init
+                    for obj in list(self.s3_bucket.objects.all()):
+                        obj.delete()
+                    source_config = self.source_config._replace(
+                        src_arrow_native=arrow_native, src_col_end_price='EndPrice')
+                    xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                          source_config, target_config)
+                    # Method execution
+                    xetra_etl.etl_report1()
+                    keys = sorted(obj.key for obj in self.s3_bucket.objects.filter(
+                        Prefix='report1/'))
+                    reports[arrow_native] = pd.concat([pd.read_parquet(BytesIO(
+                        self.s3_bucket.Object(key=key).get().get('Body').read()))
+                        for key in keys], ignore_index=True)
+                    self.assertEqual(11, len(MetaProcess.return_meta_data(
+                        self.meta_key, self.s3_bucket_meta)))
+                # Test after method execution
+                self.assertEqual(4, len(reports[True]))
+                pd.testing.assert_frame_equal(reports[False], reports[True])
+
+    def test_etl_report1_arrow_native_empty(self):
+        """
+        Tests the etl_report1 method with the arrow native path writing no
+        report, like the pandas path, if the window has no source files or
+        every row misses a price
+        """
+        # Test init
+        source_config_no_files = self.source_config._replace(
+            src_first_extract_date='2020-01-01', src_arrow_native=True)
+        for key in self.src_files:
+            data_frame = pd.read_csv(BytesIO(
+                self.s3_src_bucket.Object(key=key).get().get('Body').read()))
+            data_frame['StartPrice'] = np.nan
+            self.s3_src_bucket.put_object(Body=data_frame.to_csv(index=False), Key=key)
+        source_config_no_prices = self.source_config._replace(src_arrow_native=True)
+        for source_config in [source_config_no_files, source_config_no_prices]:
+            for write_mode in ['full', 'partitioned']:
+                with self.subTest(src_first_extract_date=source_config.src_first_extract_date,
+                                  write_mode=write_mode):
+                    for obj in list(self.s3_bucket.objects.all()):
+                        obj.delete()
+                    target_config = self.target_config._replace(trg_write_mode=write_mode)
+                    xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta,
+                                          self.meta_key, source_config, target_config)
+                    # Method execution
+                    xetra_etl.etl_report1()
+                    # Test after method execution
+                    self.assertEqual([], list(self.s3_bucket.objects.filter(
+                        Prefix='report1/')))
+                    self.assertTrue(MetaProcess.return_meta_data(
+                        self.meta_key, self.s3_bucket_meta) is not None)
+
+    def test_finalize_report1_same_as_groupby_shift(self):
+        """
+        Tests the change to the previous closing price against
+        a grouped shift over the frame sorted by date
+        """
+        # Test init
+        rng = np.random.default_rng(3)
+        isins = [f'DE000000{i:04d}' for i in range(30)]
+        dates = ['2021-04-14', '2021-04-15', '2021-04-16', '2021-04-19']
+        df_agg = pd.DataFrame([(isin, date) for isin in isins for date in dates
+                               if rng.random() > 0.3], columns=['ISIN', 'Date'])
+        for column in ['opening_price_eur', 'closing_price_eur',
+                       'minimum_price_eur', 'maximum_price_eur']:
+            df_agg[column] = rng.uniform(10, 100, len(df_agg))
+        df_agg['daily_traded_volume'] = rng.integers(0, 10000, len(df_agg))
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config, self.target_config)
+        # Expected results
+        df_exp = df_agg.copy()
+        df_exp['change_prev_closing_%'] = df_exp.sort_values(by=['Date'])\
+            .groupby(['ISIN'])['opening_price_eur'].shift(1)
+        df_exp['change_prev_closing_%'] = (df_exp['opening_price_eur']
+                                           - df_exp['change_prev_closing_%'])\
+            / df_exp['change_prev_closing_%'] * 100
+        df_exp = df_exp.round(decimals=2)
+        df_exp = df_exp[df_exp['Date'] >= str(xetra_etl.extract_date)].reset_index(drop=True)
+        # Method execution
+        df_result = xetra_etl._finalize_report1(df_agg.copy())
+        df_result_categorical = xetra_etl._finalize_report1(
+            df_agg.astype({'ISIN': 'category', 'Date': 'category'}))
+        # Test after method execution
+        pd.testing.assert_frame_equal(df_exp, df_result)
+        pd.testing.assert_frame_equal(df_exp, df_result_categorical)
+
+    def test_transform_report1_parallel_same_as_single_process(self):
+        """
+        Tests the transform_report1 method with several worker
+        processes against the single process transformation
+        """
+        # Test init
+        rng = np.random.default_rng(7)
+        rows = 2000
+        df_src = pd.DataFrame({
+            'ISIN': rng.choice([f'DE000000{i:04d}' for i in range(40)], rows),
+            'Mnemonic': 'MNEM',
+            'Date': rng.choice(['2021-04-14', '2021-04-15', '2021-04-16'], rows),
+            'Time': [f'{hour:02d}:{minute:02d}' for hour, minute in
+                     zip(rng.integers(8, 18, rows), rng.integers(0, 60, rows))],
+            'StartPrice': rng.uniform(10, 100, rows).round(4),
+            'EndPrice': rng.uniform(10, 100, rows).round(4),
+            'MinPrice': rng.uniform(10, 100, rows).round(4),
+            'MaxPrice': rng.uniform(10, 100, rows).round(4),
+            'TradedVolume': rng.integers(0, 10000, rows)
+        }).drop_duplicates(subset=['ISIN', 'Date', 'Time'], ignore_index=True)
+        source_config = self.source_config._replace(src_typed_read=True)
+        xetra_etl_single = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                     source_config, self.target_config)
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              source_config._replace(src_transform_workers=3),
+                              self.target_config)
+        df_extract = xetra_etl.extract()
+        # Expected results
+        df_exp = xetra_etl_single.transform_report1(df_src.copy())
+        df_exp_typed = xetra_etl_single.transform_report1(df_extract.copy())
+        # Method execution
+        df_result = xetra_etl.transform_report1(df_src.copy())
+        df_result_typed = xetra_etl.transform_report1(df_extract.copy())
+        # Test after method execution
+        self.assertEqual(df_exp.shape[0], 120)
+        pd.testing.assert_frame_equal(df_exp, df_result)
+        pd.testing.assert_frame_equal(df_exp_typed, df_result_typed)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,238 @@
+"""TestXetraTransfomerAsyncMethods"""
+
+import asyncio
+import importlib.util
+import os
+import socket
+import unittest
+from urllib.request import Request, urlopen
+
+import boto3
+import pandas as pd
+
+import sys
+sys.path.append("/Users/pashkrof/surfdrive_general/DITTLAB/Courses/Data pipeline/production-ready ETL/venv/xetra/source_code/common")
+
+
+from s3 import S3BucketConnector
+from source_code.transformers.Xetra_transformer import Xetra_ETL, XetraSourceConfig, \
+    XetraTargetConfig
+
+# The async connector and the local s3 server are installed with the async and dev
+# Pipfile categories
+ASYNC_S3_INSTALLED = all(importlib.util.find_spec(module) is not None
+                         for module in ('aiobotocore', 'flask', 'flask_cors'))
+if ASYNC_S3_INSTALLED:
+    from moto.server import ThreadedMotoServer
+    from async_s3 import AsyncS3BucketConnector
+
+    class CountingAsyncS3BucketConnector(AsyncS3BucketConnector):
+        """
+        Async connector recording the maximum number of source files read at the same time
+        """
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.started = 0
+
+        async def read_csv_to_df(self, key: str, *args, **kwargs):
+            self.started += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                # Giving the other reads the chance to start
+                await asyncio.sleep(0.01)
+                return await super().read_csv_to_df(key, *args, **kwargs)
+            finally:
+                self.in_flight -= 1
+
+
+@unittest.skipUnless(ASYNC_S3_INSTALLED, 'aiobotocore, flask and flask-cors are not installed')
+class TestXetraETLAsyncMethods(unittest.TestCase):
+    """
+    Testing the XetraETL class with an async source connector
+    against a local moto server
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Starting the local s3 server on a free port
+        """
+        # Moto 5.0 has no lookup of the port the server is bound to
+        with socket.socket() as free_socket:
+            free_socket.bind(('127.0.0.1', 0))
+            cls.port = free_socket.getsockname()[1]
+        cls.server = ThreadedMotoServer(ip_address='127.0.0.1', port=cls.port, verbose=False)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Stopping the local s3 server
+        """
+        cls.server.stop()
+
+    def setUp(self):
+        """
+        Setting up the environment
+        """
+        # Defining the class arguments
+        self.s3_access_key = 'AWS_ACCESS_KEY_ID'
+        self.s3_secret_key = 'AWS_SECRET_ACCESS_KEY'
+        self.s3_endpoint_url = f'http://127.0.0.1:{self.port}'
+        self.s3_bucket_name = 'test-bucket'
+        self.s3_src_bucket_name = 'src-bucket'
+        # Creating s3 access keys as environment variables
+        os.environ[self.s3_access_key] = 'KEY1'
+        os.environ[self.s3_secret_key] = 'KEY2'
+        # Creating the target and source bucket on the local s3 server
+        self.s3 = boto3.resource(service_name='s3', endpoint_url=self.s3_endpoint_url,
+                                 region_name='eu-central-1')
+        for bucket in (self.s3_bucket_name, self.s3_src_bucket_name):
+            self.s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={
+                'LocationConstraint': 'eu-central-1'})
+        self.s3_src_bucket = self.s3.Bucket(self.s3_src_bucket_name)
+        self.s3_bucket_meta = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                                self.s3_endpoint_url, self.s3_bucket_name)
+        self.s3_bucket_src = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                               self.s3_endpoint_url, self.s3_src_bucket_name)
+        self.s3_bucket_src_async = CountingAsyncS3BucketConnector(
+            self.s3_access_key, self.s3_secret_key, self.s3_endpoint_url,
+            self.s3_src_bucket_name)
+        self.meta_key = 'meta.csv'
+        # Source and target configuration
+        conf_dict_src = {
+            'src_first_extract_date': '2021-04-15',
+            'src_columns': ['ISIN', 'Mnemonic', 'Date', 'Time', 'StartPrice',
+                            'EndPrice', 'MinPrice', 'MaxPrice', 'TradedVolume'],
+            'src_col_date': 'Date',
+            'src_col_isin': 'ISIN',
+            'src_col_time': 'Time',
+            'src_col_start_price': 'StartPrice',
+            'src_col_min_price': 'MinPrice',
+            'src_col_max_price': 'MaxPrice',
+            'src_col_traded_vol': 'TradedVolume'
+        }
+        conf_dict_trg = {
+            'trg_col_isin': 'isin',
+            'trg_col_date': 'date',
+            'trg_col_op_price': 'opening_price_eur',
+            'trg_col_clos_price': 'closing_price_eur',
+            'trg_col_min_price': 'minimum_price_eur',
+            'trg_col_max_price': 'maximum_price_eur',
+            'trg_col_dail_trad_vol': 'daily_traded_volume',
+            'trg_col_ch_prev_clos': 'change_prev_closing_%',
+            'trg_key': 'report1/xetra_daily_report1_',
+            'trg_key_date_format': '%Y%m%d_%H%M%S',
+            'trg_format': 'parquet'
+        }
+        self.source_config = XetraSourceConfig(**conf_dict_src)
+        self.target_config = XetraTargetConfig(**conf_dict_trg)
+        # Source files: two ISINs traded on two days, one file per minute
+        columns_src = ['ISIN', 'Mnemonic', 'Date', 'Time', 'StartPrice', 'EndPrice',
+                       'MinPrice', 'MaxPrice', 'TradedVolume']
+        for date in ('2021-04-15', '2021-04-16'):
+            for minute in range(12):
+                rows = [['AT0000A0E9W5', 'SANT', date, f'12:{minute:02d}', 20.0 + minute,
+                         20.5 + minute, 19.5 + minute, 21.0 + minute, 1000 + minute],
+                        ['DE000A0DJ6J9', 'S92', date, f'12:{minute:02d}', 45.0 - minute,
+                         45.5 - minute, 44.5 - minute, 46.0 - minute, 300 + minute]]
+                self.s3_src_bucket.put_object(
+                    Body=pd.DataFrame(rows, columns=columns_src).to_csv(index=False),
+                    Key=f'{date}/{date}_BINS_XETR12{minute:02d}.csv')
+
+    def tearDown(self):
+        """
+        Executing after unittests
+        """
+        # Removing the buckets of the test from the local s3 server
+        urlopen(Request(f'{self.s3_endpoint_url}/moto-api/reset', method='POST'))
+
+    def test_extract_async_same_as_serial(self):
+        """
+        Tests the extract method with the async source connector
+        against the serial extraction, with and without typed read
+        """
+        for typed_read in (False, True):
+            with self.subTest(typed_read=typed_read):
+                # Expected results
+                source_config = self.source_config._replace(src_typed_read=typed_read)
+                xetra_etl_serial = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta,
+                                             self.meta_key, source_config, self.target_config)
+                df_exp = xetra_etl_serial.extract()
+                # Test init
+                xetra_etl = Xetra_ETL(
+                    self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                    source_config._replace(src_max_concurrency=100), self.target_config,
+                    s3_bucket_src_async=self.s3_bucket_src_async)
+                # Method execution
+                df_result = xetra_etl.extract()
+                # Test after method execution
+                self.assertEqual(48, df_result.shape[0])
+                self.assertTrue(df_exp.equals(df_result))
+
+    def test_extract_async_concurrency_limit(self):
+        """
+        Tests that the extract method with the async source connector
+        has at most src_max_concurrency source files in flight
+        """
+        # Test init
+        source_config = self.source_config._replace(src_max_concurrency=5)
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              source_config, self.target_config,
+                              s3_bucket_src_async=self.s3_bucket_src_async)
+        # Method execution
+        xetra_etl.extract()
+        # Test after method execution
+        self.assertEqual(5, self.s3_bucket_src_async.max_in_flight)
+        self.assertEqual(24, self.s3_bucket_src_async.counters()['s3_requests'])
+
+    def test_extract_async_bounded_look_ahead(self):
+        """
+        Tests that the source files read with the async source connector are
+        yielded one by one with at most src_max_concurrency files read ahead,
+        and that the reads ahead are cancelled if the consumer stops
+        """
+        # Test init
+        source_config = self.source_config._replace(src_max_concurrency=5)
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              source_config, self.target_config,
+                              s3_bucket_src_async=self.s3_bucket_src_async)
+        # Method execution
+        frames = xetra_etl._iter_source_frames()
+        df_first = next(frames)
+        started = self.s3_bucket_src_async.started
+        frames.close()
+        # Test after method execution
+        self.assertEqual(2, df_first.shape[0])
+        self.assertEqual(5, started)
+        self.assertEqual(0, self.s3_bucket_src_async.in_flight)
+        self.assertIsNone(self.s3_bucket_src_async.s3_client)
+
+    def test_etl_report1_async(self):
+        """
+        Tests the etl_report1 method with the async source connector
+        against the report of the synchronous connector
+        """
+        # Expected results
+        xetra_etl_sync = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                                   self.source_config, self.target_config)
+        df_exp = xetra_etl_sync.transform_report1(xetra_etl_sync.extract())
+        # Test init
+        xetra_etl = Xetra_ETL(self.s3_bucket_src, self.s3_bucket_meta, self.meta_key,
+                              self.source_config._replace(src_max_concurrency=100),
+                              self.target_config,
+                              s3_bucket_src_async=self.s3_bucket_src_async)
+        # Method execution
+        xetra_etl.etl_report1()
+        # Test after method execution
+        trg_file = self.s3_bucket_meta.list_files_in_prefix(self.target_config.trg_key)[0]
+        df_result = self.s3_bucket_meta.read_parquet_to_df(trg_file)
+        self.assertTrue(df_exp.reset_index(drop=True).equals(df_result))
+
+
+if __name__ == "__main__":
+    unittest.main()